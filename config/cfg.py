@@ -0,0 +1,139 @@
+import json
+import sqlite3
+from pathlib import Path
+
+
+class Config:
+    """Настройки приложения из JSON-файла
+
+    Пример config.json:
+        {
+            "mysql": {"host": "localhost", "user": "root", "password": "", "database": "ligma"},
+            "sqlite": {"profile": "interactive", "pragmas": {"cache_size": -32000}}
+        }
+
+    Отсутствующий файл или раздел заменяется значениями по умолчанию.
+    """
+
+    DEFAULTS = {
+        "mysql": {"host": "localhost", "user": "root", "password": "", "database": "ligma"},
+        "sqlite": {"profile": "interactive", "pragmas": {}}
+    }
+
+    def __init__(self, path="config.json"):
+        self.path = Path(path)
+        self.data = {section: dict(values) for section, values in self.DEFAULTS.items()}
+        self.load()
+
+    def load(self):
+        """Загрузка настроек (разделы файла дополняют значения по умолчанию)"""
+        if not self.path.exists():
+            return
+        try:
+            data = json.loads(self.path.read_text(encoding="utf-8"))
+            for section, values in data.items():
+                if isinstance(values, dict):
+                    self.data.setdefault(section, {}).update(values)
+                else:
+                    self.data[section] = values
+        except (OSError, ValueError) as e:
+            print(f"Ошибка чтения настроек {self.path}: {e}")
+
+    def get(self, section, key=None, default=None):
+        """Значение настройки (или весь раздел, если key не указан)"""
+        values = self.data.get(section, {})
+        if key is None:
+            return values
+        return values.get(key, default)
+
+    def get_connection(self):
+        """Параметры подключения к MySQL: (host, user, password, database)"""
+        mysql = self.get("mysql")
+        return mysql.get("host"), mysql.get("user"), mysql.get("password"), mysql.get("database")
+
+    def connection_profile(self):
+        """Профиль соединений SQLite из раздела "sqlite" """
+        return ConnectionProfile(self.get("sqlite", "profile", "interactive"), self.get("sqlite", "pragmas", {}))
+
+
+class ConnectionProfile:
+    """Набор PRAGMA, применяемый к каждому открываемому соединению SQLite
+
+    Пресеты:
+        interactive — работа из окон приложения: WAL (читатели не блокируют
+            запись, второй экземпляр приложения не получает "database is
+            locked"), synchronous=NORMAL (в WAL это безопасно и без fsync
+            на каждый коммит), кэш 16 МБ, mmap 64 МБ, ожидание блокировки 5 с;
+        bulk — создание и массовое заполнение БД, миграции: synchronous=OFF
+            (сбой питания во время загрузки может испортить файл — загрузку
+            тогда повторяют), кэш 64 МБ, ожидание блокировки 30 с.
+
+    journal_mode и synchronous не применяются к соединениям только для чтения.
+    """
+
+    PRESETS = {
+        "interactive": {
+            "journal_mode": "WAL",
+            "synchronous": "NORMAL",
+            "cache_size": -16000,  # отрицательное значение — в КБ
+            "mmap_size": 64 * 1024 * 1024,
+            "temp_store": "MEMORY",
+            "busy_timeout": 5000
+        },
+        "bulk": {
+            "journal_mode": "WAL",
+            "synchronous": "OFF",
+            "cache_size": -64000,
+            "mmap_size": 256 * 1024 * 1024,
+            "temp_store": "MEMORY",
+            "busy_timeout": 30000
+        }
+    }
+
+    # Порядок важен: режим журнала переключается до остальных настроек
+    ORDER = ["journal_mode", "synchronous", "cache_size", "mmap_size", "temp_store", "busy_timeout"]
+    WRITE_PRAGMAS = ("journal_mode", "synchronous")
+
+    _active = None
+
+    def __init__(self, name="interactive", overrides=None):
+        if name not in self.PRESETS:
+            print(f"Неизвестный профиль соединений '{name}', используется interactive")
+            name = "interactive"
+        self.name = name
+        self.pragmas = dict(self.PRESETS[name])
+        self.pragmas.update({key: value for key, value in (overrides or {}).items() if key in self.ORDER})
+
+    @classmethod
+    def active(cls):
+        """Профиль по умолчанию (из config.json)"""
+        if cls._active is None:
+            cls._active = Config().connection_profile()
+        return cls._active
+
+    @classmethod
+    def bulk(cls):
+        """Профиль массовой загрузки с переопределениями из config.json"""
+        return cls("bulk", Config().get("sqlite", "pragmas", {}))
+
+    def statements(self, read_only=False):
+        """Команды PRAGMA профиля"""
+        return [f"PRAGMA {name} = {self.pragmas[name]}" for name in self.ORDER
+                if name in self.pragmas and not (read_only and name in self.WRITE_PRAGMAS)]
+
+    def apply(self, conn, read_only=False):
+        """Применение к соединению sqlite3 (возвращает его же для цепочек)"""
+        for statement in self.statements(read_only):
+            try:
+                conn.execute(statement).fetchall()
+            except sqlite3.Error as e:
+                print(f"Ошибка применения {statement}: {e}")
+        return conn
+
+    def connect(self, db_path, read_only=False, **kwargs):
+        """Открытие соединения sqlite3 с применением профиля"""
+        if read_only:
+            conn = sqlite3.connect(f"file:{Path(db_path).as_posix()}?mode=ro", uri=True, **kwargs)
+        else:
+            conn = sqlite3.connect(db_path, **kwargs)
+        return self.apply(conn, read_only)
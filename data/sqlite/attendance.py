@@ -0,0 +1,92 @@
+"""Кэш посещаемости игроков
+
+PlayerAttendance хранит для каждого игрока число событий и посещений,
+текущую и самую длинную серию посещений и число пропусков подряд.
+Триггер вставки в EventParticipation обновляет строку за O(1), если новое
+событие не раньше последнего учтенного (обычный случай — отметка
+очередного события). Вставка задним числом, изменение и удаление события
+помечают строку устаревшей (stale): она пересчитывается по истории игрока
+при следующем чтении (см. utils.attendance).
+
+В компактной схеме триггеры ставятся на EventParticipation_data, а
+last_event хранит номер дня вместо строки даты.
+
+Одна отметка на игрока и дату гарантируется уникальным индексом
+(player_id, дата): по нему массовая запись события (utils.event_entry)
+делает upsert, он же служит индексом истории игрока.
+"""
+
+PLAYER_ATTENDANCE = """
+    CREATE TABLE IF NOT EXISTS PlayerAttendance (
+        player_id INTEGER PRIMARY KEY,
+        total INTEGER NOT NULL DEFAULT 0,
+        attended INTEGER NOT NULL DEFAULT 0,
+        current_streak INTEGER NOT NULL DEFAULT 0,
+        longest_streak INTEGER NOT NULL DEFAULT 0,
+        missed_streak INTEGER NOT NULL DEFAULT 0,
+        last_event,
+        stale INTEGER NOT NULL DEFAULT 0
+    )
+"""
+
+
+def events_table(compact):
+    """Физическая таблица событий и колонка даты в ней"""
+    return ("EventParticipation_data", "event_day") if compact else ("EventParticipation", "event_date")
+
+
+def event_key_index(compact):
+    """Уникальный ключ (player_id, дата) таблицы событий
+
+    Повторные отметки игрока за одну дату, накопившиеся до появления
+    ключа, удаляются (остается последняя по id). Прежний неуникальный
+    индекс по тем же колонкам больше не нужен.
+    """
+    events, date = events_table(compact)
+    plain_index = "idx_events_player_day" if compact else "idx_events_player_date"
+    return f"""
+        DELETE FROM {events}
+        WHERE player_id IS NOT NULL AND {date} IS NOT NULL AND id NOT IN (
+            SELECT MAX(id) FROM {events} GROUP BY player_id, {date}
+        );
+        CREATE UNIQUE INDEX IF NOT EXISTS ux_events_player_date ON {events} (player_id, {date});
+        DROP INDEX IF EXISTS {plain_index};
+    """
+
+
+def attendance_triggers(compact):
+    """Триггеры поддержки PlayerAttendance на таблице событий"""
+    events, date = events_table(compact)
+    participated = "COALESCE(NEW.participated, 0)"
+
+    return f"""
+        CREATE TRIGGER IF NOT EXISTS Attendance_{events}_insert AFTER INSERT ON {events}
+        BEGIN
+            INSERT INTO PlayerAttendance
+                (player_id, total, attended, current_streak, longest_streak, missed_streak, last_event, stale)
+            SELECT NEW.player_id, 1, {participated}, {participated}, {participated}, 1 - {participated},
+                   NEW.{date},
+                   -- Первая строка игрока при уже существующей истории: счетчики неполные
+                   EXISTS (SELECT 1 FROM {events} WHERE player_id = NEW.player_id AND id <> NEW.id)
+            WHERE NEW.player_id IS NOT NULL
+            ON CONFLICT(player_id) DO UPDATE SET
+                total = total + 1,
+                attended = attended + {participated},
+                current_streak = CASE WHEN {participated} THEN current_streak + 1 ELSE 0 END,
+                longest_streak = MAX(longest_streak, CASE WHEN {participated} THEN current_streak + 1 ELSE 0 END),
+                missed_streak = CASE WHEN {participated} THEN 0 ELSE missed_streak + 1 END,
+                stale = stale OR NEW.{date} IS NULL OR COALESCE(NEW.{date} < last_event, 1),
+                last_event = MAX(COALESCE(last_event, NEW.{date}), NEW.{date});
+        END;
+
+        CREATE TRIGGER IF NOT EXISTS Attendance_{events}_update AFTER UPDATE OF player_id, {date}, participated
+            ON {events}
+        BEGIN
+            UPDATE PlayerAttendance SET stale = 1 WHERE player_id IN (OLD.player_id, NEW.player_id);
+        END;
+
+        CREATE TRIGGER IF NOT EXISTS Attendance_{events}_delete AFTER DELETE ON {events}
+        BEGIN
+            UPDATE PlayerAttendance SET stale = 1 WHERE player_id = OLD.player_id;
+        END;
+    """
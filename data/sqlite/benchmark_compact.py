@@ -0,0 +1,109 @@
+"""Сравнение размера и скорости диапазонных запросов: обычная и компактная схема
+
+Запуск: python -m data.sqlite.benchmark_compact [количество_игроков] [событий_на_игрока]
+"""
+import os
+import random
+import shutil
+import sys
+import tempfile
+import time
+from datetime import date, timedelta
+
+from config.cfg import ConnectionProfile
+from data.sqlite.create_database import create_db
+from data.sqlite.compact_schema import CompactSchemaMigration, to_day_number
+
+
+STATUSES = ["Активен", "Неактивен", "В отпуске"]
+RANKS = ["Участник", "Офицер", "Заместитель", "Лидер", "Новичок"]
+
+
+def generate(db_path, players, events_per_player):
+    """Заполнение базы синтетическими данными"""
+    create_db(db_path, fill=False)
+    conn = ConnectionProfile.bulk().connect(db_path)
+    conn.executemany("INSERT INTO Classes (name) VALUES (?)", [(f"Класс{i}",) for i in range(5)])
+
+    today = date.today()
+    conn.executemany(
+        "INSERT INTO Players (nickname, tag, class_id, level, joined_date, guild_status) VALUES (?, ?, ?, ?, ?, ?)",
+        ((f"Игрок{i}", f"@user{i:06}", random.randint(1, 5), random.randint(1, 70),
+          (today - timedelta(days=random.randint(0, 3000))).isoformat(), random.choice(STATUSES))
+         for i in range(players))
+    )
+    conn.executemany(
+        "INSERT INTO GuildContribution (player_id, resources_contributed, help_count, leadership_rank) "
+        "VALUES (?, ?, ?, ?)",
+        ((i, random.randint(0, 10000), random.randint(0, 50), random.choice(RANKS)) for i in range(1, players + 1))
+    )
+    conn.executemany(
+        "INSERT INTO EventParticipation (player_id, event_date, participated) VALUES (?, ?, ?)",
+        ((i, (today - timedelta(days=7 * k)).isoformat(), random.randint(0, 1))
+         for i in range(1, players + 1) for k in range(events_per_player))
+    )
+    # Для честного сравнения текстовая схема тоже получает индекс по статусу
+    # (индекс по дате вступления создает create_db)
+    conn.execute("CREATE INDEX idx_players_guild_status ON Players (guild_status)")
+    conn.commit()
+    conn.execute("VACUUM")
+    conn.close()
+
+
+def time_query(db_path, query, params, repeat=20):
+    """Среднее время выполнения запроса, мс"""
+    conn = ConnectionProfile.active().connect(db_path, read_only=True)
+    try:
+        conn.execute(query, params).fetchall()  # прогрев кэша страниц
+        started = time.perf_counter()
+        for _ in range(repeat):
+            conn.execute(query, params).fetchall()
+        return (time.perf_counter() - started) * 1000 / repeat
+    finally:
+        conn.close()
+
+
+def main(players=100000, events_per_player=20):
+    workdir = tempfile.mkdtemp(prefix="ligma_bench_")
+    text_db = os.path.join(workdir, "text.db")
+    compact_db = os.path.join(workdir, "compact.db")
+    try:
+        generate(text_db, players, events_per_player)
+        shutil.copyfile(text_db, compact_db)
+        conn = ConnectionProfile.bulk().connect(compact_db)
+        conn.executescript("DROP INDEX idx_players_joined_date; DROP INDEX idx_players_guild_status;")
+        conn.close()
+        CompactSchemaMigration(compact_db).migrate()
+        create_db(compact_db)  # индексы сортировки по таблицам *_data
+
+        text_size = os.path.getsize(text_db)
+        compact_size = os.path.getsize(compact_db)
+        print(f"Игроков: {players}, событий: {players * events_per_player}")
+        print(f"Размер: {text_size / 2**20:.1f} МБ -> {compact_size / 2**20:.1f} МБ "
+              f"({1 - compact_size / text_size:.0%} меньше)")
+
+        start = (date.today() - timedelta(days=400)).isoformat()
+        end = (date.today() - timedelta(days=300)).isoformat()
+        cases = [
+            ("Диапазон дат + статус",
+             "SELECT id FROM Players WHERE joined_date BETWEEN ? AND ? AND guild_status = ?",
+             (start, end, "Активен"),
+             "SELECT id FROM Players_data WHERE joined_day BETWEEN ? AND ? "
+             "AND status_id = (SELECT id FROM GuildStatuses WHERE name = ?)",
+             (to_day_number(start), to_day_number(end), "Активен")),
+            ("События за период",
+             "SELECT COUNT(*) FROM EventParticipation WHERE player_id = ? AND event_date BETWEEN ? AND ?",
+             (players // 2, start, end),
+             "SELECT COUNT(*) FROM EventParticipation_data WHERE player_id = ? AND event_day BETWEEN ? AND ?",
+             (players // 2, to_day_number(start), to_day_number(end))),
+        ]
+        for title, text_query, text_params, compact_query, compact_params in cases:
+            text_ms = time_query(text_db, text_query, text_params)
+            compact_ms = time_query(compact_db, compact_query, compact_params)
+            print(f"{title}: {text_ms:.3f} мс -> {compact_ms:.3f} мс (x{text_ms / compact_ms:.1f})")
+    finally:
+        shutil.rmtree(workdir, ignore_errors=True)
+
+
+if __name__ == "__main__":
+    main(*(int(arg) for arg in sys.argv[1:3]))
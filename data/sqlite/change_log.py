@@ -0,0 +1,133 @@
+"""Журнал изменений строк
+
+Триггеры на таблицах записывают в ChangeLog каждую вставку, изменение и
+удаление: какая таблица, id строки и id игрока, к которому она относится.
+Другие экземпляры приложения читают журнал с последнего увиденного seq и
+перечитывают только затронутых игроков (см. utils.change_notifier), а
+синхронизация реплик переносит по нему только изменившиеся строки
+(см. utils.replica_sync).
+
+В компактной схеме триггеры ставятся на таблицы *_data: представления
+пишут в них через INSTEAD OF триггеры.
+"""
+
+CHANGE_LOG = """
+    CREATE TABLE IF NOT EXISTS ChangeLog (
+        seq INTEGER PRIMARY KEY AUTOINCREMENT,
+        table_name TEXT NOT NULL,
+        row_id INTEGER NOT NULL,
+        player_id INTEGER,
+        op TEXT NOT NULL CHECK(op IN ('I', 'U', 'D'))
+    )
+"""
+
+# Докуда реплики уже забрали журнал; записи старше минимума можно удалять
+SYNC_CHECKPOINT = """
+    CREATE TABLE IF NOT EXISTS SyncCheckpoint (
+        replica TEXT PRIMARY KEY,
+        seq INTEGER NOT NULL,
+        synced_at TEXT
+    )
+"""
+
+# Последний удаленный при сжатии seq: реплика, отставшая сильнее, копируется заново
+CHANGE_LOG_COMPACTION = """
+    CREATE TABLE IF NOT EXISTS ChangeLogCompaction (
+        id INTEGER PRIMARY KEY CHECK(id = 1),
+        compacted_seq INTEGER NOT NULL
+    )
+"""
+
+# Логическое имя таблицы -> (колонка с id игрока или None, таблица компактной схемы)
+TRACKED_TABLES = {
+    "Classes": (None, None),
+    "Players": ("id", "Players_data"),
+    "Activity": ("player_id", None),
+    "GuildContribution": ("player_id", "GuildContribution_data"),
+    "EventParticipation": ("player_id", "EventParticipation_data")
+}
+
+# Служебные колонки, изменение которых не считается изменением строки
+IGNORED_COLUMNS = ("nickname_key", "tag_key")
+
+
+def physical_table(table, compact):
+    """Таблица, на которую ставятся триггеры (в компактной схеме — *_data)"""
+    compact_table = TRACKED_TABLES[table][1]
+    return compact_table if compact and compact_table else table
+
+
+def change_log_triggers(table, physical, columns):
+    """Триггеры журнала изменений для таблицы
+
+    Args:
+        table: Логическое имя таблицы (пишется в журнал)
+        physical: Таблица, на которую ставятся триггеры
+        columns: Колонки таблицы; триггер изменения срабатывает только на
+            них (без ключей сортировки, которые пересчитывают свои триггеры)
+    """
+    player_column = TRACKED_TABLES[table][0]
+    watched = ", ".join(column for column in columns if column not in IGNORED_COLUMNS and column != "id")
+    insert = "INSERT INTO ChangeLog (table_name, row_id, player_id, op)"
+    new_player = f"NEW.{player_column}" if player_column else "NULL"
+    old_player = f"OLD.{player_column}" if player_column else "NULL"
+
+    # Строка перешла к другому игроку — старый игрок тоже изменился
+    moved = ""
+    if player_column:
+        moved = f"""
+            {insert} SELECT '{table}', OLD.id, {old_player}, 'U'
+                WHERE {old_player} IS NOT {new_player};"""
+
+    return f"""
+        CREATE TRIGGER IF NOT EXISTS ChangeLog_{physical}_insert AFTER INSERT ON {physical}
+        BEGIN
+            {insert} VALUES ('{table}', NEW.id, {new_player}, 'I');
+        END;
+
+        CREATE TRIGGER IF NOT EXISTS ChangeLog_{physical}_update AFTER UPDATE OF {watched} ON {physical}
+        BEGIN
+            {insert} VALUES ('{table}', NEW.id, {new_player}, 'U');{moved}
+        END;
+
+        CREATE TRIGGER IF NOT EXISTS ChangeLog_{physical}_delete AFTER DELETE ON {physical}
+        BEGIN
+            {insert} VALUES ('{table}', OLD.id, {old_player}, 'D');
+        END;
+    """
+
+
+def compact_change_log(conn, keep_last=10000):
+    """Удаление записей журнала, которые уже забрали все реплики
+
+    Последние keep_last записей остаются всегда: их читают другие
+    экземпляры приложения (ChangeNotifier). Реплику, которая давно не
+    синхронизировалась, можно исключить из расчета, удалив ее строку из
+    SyncCheckpoint, — при следующей синхронизации она скопируется заново.
+
+    Args:
+        conn: Соединение sqlite3 с БД гильдии
+
+    Returns:
+        int: Количество удаленных записей
+    """
+    max_seq = conn.execute("SELECT COALESCE(MAX(seq), 0) FROM ChangeLog").fetchone()[0]
+    horizon = max_seq - keep_last
+    min_checkpoint = conn.execute("SELECT MIN(seq) FROM SyncCheckpoint").fetchone()[0]
+    if min_checkpoint is not None:
+        horizon = min(horizon, min_checkpoint)
+    if horizon <= 0:
+        return 0
+
+    conn.execute("BEGIN IMMEDIATE")
+    try:
+        deleted = conn.execute("DELETE FROM ChangeLog WHERE seq <= ?", (horizon,)).rowcount
+        conn.execute("""
+            INSERT INTO ChangeLogCompaction (id, compacted_seq) VALUES (1, ?)
+            ON CONFLICT(id) DO UPDATE SET compacted_seq = MAX(compacted_seq, excluded.compacted_seq)
+        """, (horizon,))
+        conn.commit()
+    except Exception:
+        conn.rollback()
+        raise
+    return deleted
@@ -0,0 +1,313 @@
+import sqlite3
+import sys
+from datetime import date
+
+from data.sqlite.sort_keys import register_collation, sort_key_triggers
+from config.cfg import ConnectionProfile
+
+
+# Дни считаются от 1970-01-01: julianday('1970-01-01') = 2440587.5
+EPOCH = date(1970, 1, 1)
+JULIAN_EPOCH = 2440587.5
+
+
+def to_day_number(iso_date):
+    """ISO-дата (YYYY-MM-DD) -> номер дня от 1970-01-01"""
+    if not iso_date:
+        return None
+    return (date.fromisoformat(str(iso_date)[:10]) - EPOCH).days
+
+
+def day_sql(expression):
+    """SQL-выражение: текстовая дата -> номер дня"""
+    return f"CAST(julianday({expression}) - {JULIAN_EPOCH} AS INTEGER)"
+
+
+def date_sql(expression):
+    """SQL-выражение: номер дня -> текстовая дата YYYY-MM-DD"""
+    return f"date({expression} * 86400, 'unixepoch')"
+
+
+class CompactSchemaMigration:
+    """Перевод базы на компактную схему
+
+    Статусы и роли хранятся целыми кодами со ссылкой на справочники
+    GuildStatuses и LeadershipRanks, даты — номерами дней от 1970-01-01.
+    Данные переезжают в таблицы *_data, а на месте старых таблиц создаются
+    представления Players, GuildContribution и EventParticipation с прежним
+    набором колонок и INSTEAD OF триггерами, поэтому запросы интерфейса
+    продолжают работать без изменений.
+
+    Внешние ключи Activity по-прежнему ссылаются на Players (теперь это
+    представление); приложение не включает PRAGMA foreign_keys, поэтому
+    на работу это не влияет.
+    """
+
+    LOOKUP_TABLES = """
+        CREATE TABLE IF NOT EXISTS GuildStatuses (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            name TEXT NOT NULL UNIQUE
+        );
+
+        CREATE TABLE IF NOT EXISTS LeadershipRanks (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            name TEXT NOT NULL UNIQUE
+        );
+    """
+
+    PLAYERS = f"""
+        CREATE TABLE Players_data (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            nickname TEXT NOT NULL,
+            tag TEXT NOT NULL,
+            class_id INTEGER,
+            level INTEGER,
+            joined_day INTEGER,
+            status_id INTEGER,
+            nickname_key TEXT,
+            tag_key TEXT,
+            FOREIGN KEY (class_id) REFERENCES Classes(id),
+            FOREIGN KEY (status_id) REFERENCES GuildStatuses(id)
+        );
+
+        INSERT INTO Players_data (id, nickname, tag, class_id, level, joined_day, status_id, nickname_key, tag_key)
+        SELECT p.id, p.nickname, p.tag, p.class_id, p.level, {day_sql('p.joined_date')}, s.id,
+               sort_key(p.nickname), sort_key(p.tag)
+        FROM Players p
+        LEFT JOIN GuildStatuses s ON s.name = p.guild_status;
+
+        DROP TABLE Players;
+        {sort_key_triggers('Players_data')}
+        CREATE INDEX IF NOT EXISTS idx_players_joined_day ON Players_data (joined_day);
+        CREATE INDEX IF NOT EXISTS idx_players_status ON Players_data (status_id);
+        CREATE INDEX IF NOT EXISTS idx_players_nickname_key ON Players_data (nickname_key);
+        CREATE INDEX IF NOT EXISTS idx_players_tag_key ON Players_data (tag_key);
+    """
+
+    # Представление Players и его триггеры; ключи сортировки заполняют триггеры Players_data
+    PLAYERS_VIEW = f"""
+        CREATE VIEW Players AS
+        SELECT
+            p.id,
+            p.nickname,
+            p.tag,
+            p.class_id,
+            p.level,
+            {date_sql('p.joined_day')} as joined_date,
+            s.name as guild_status,
+            p.nickname_key,
+            p.tag_key
+        FROM Players_data p
+        LEFT JOIN GuildStatuses s ON s.id = p.status_id;
+
+        CREATE TRIGGER Players_insert INSTEAD OF INSERT ON Players
+        BEGIN
+            INSERT OR IGNORE INTO GuildStatuses (name)
+            SELECT NEW.guild_status WHERE NEW.guild_status IS NOT NULL;
+            INSERT INTO Players_data (id, nickname, tag, class_id, level, joined_day, status_id)
+            VALUES (NEW.id, NEW.nickname, NEW.tag, NEW.class_id, NEW.level, {day_sql('NEW.joined_date')},
+                    (SELECT id FROM GuildStatuses WHERE name = NEW.guild_status));
+        END;
+
+        CREATE TRIGGER Players_update INSTEAD OF UPDATE ON Players
+        BEGIN
+            INSERT OR IGNORE INTO GuildStatuses (name)
+            SELECT NEW.guild_status WHERE NEW.guild_status IS NOT NULL;
+            UPDATE Players_data
+            SET id = NEW.id, nickname = NEW.nickname, tag = NEW.tag, class_id = NEW.class_id,
+                level = NEW.level, joined_day = {day_sql('NEW.joined_date')},
+                status_id = (SELECT id FROM GuildStatuses WHERE name = NEW.guild_status)
+            WHERE id = OLD.id;
+        END;
+
+        CREATE TRIGGER Players_delete INSTEAD OF DELETE ON Players
+        BEGIN
+            DELETE FROM Players_data WHERE id = OLD.id;
+        END;
+    """
+
+    GUILD_CONTRIBUTION = """
+        CREATE TABLE GuildContribution_data (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            player_id INTEGER,
+            resources_contributed INTEGER,
+            help_count INTEGER,
+            rank_id INTEGER,
+            FOREIGN KEY (player_id) REFERENCES Players_data(id),
+            FOREIGN KEY (rank_id) REFERENCES LeadershipRanks(id)
+        );
+
+        INSERT INTO GuildContribution_data (id, player_id, resources_contributed, help_count, rank_id)
+        SELECT gc.id, gc.player_id, gc.resources_contributed, gc.help_count, r.id
+        FROM GuildContribution gc
+        LEFT JOIN LeadershipRanks r ON r.name = gc.leadership_rank;
+
+        DROP TABLE GuildContribution;
+
+        CREATE VIEW GuildContribution AS
+        SELECT
+            gc.id,
+            gc.player_id,
+            gc.resources_contributed,
+            gc.help_count,
+            r.name as leadership_rank
+        FROM GuildContribution_data gc
+        LEFT JOIN LeadershipRanks r ON r.id = gc.rank_id;
+
+        CREATE TRIGGER GuildContribution_insert INSTEAD OF INSERT ON GuildContribution
+        BEGIN
+            INSERT OR IGNORE INTO LeadershipRanks (name)
+            SELECT NEW.leadership_rank WHERE NEW.leadership_rank IS NOT NULL;
+            INSERT INTO GuildContribution_data (id, player_id, resources_contributed, help_count, rank_id)
+            VALUES (NEW.id, NEW.player_id, NEW.resources_contributed, NEW.help_count,
+                    (SELECT id FROM LeadershipRanks WHERE name = NEW.leadership_rank));
+        END;
+
+        CREATE TRIGGER GuildContribution_update INSTEAD OF UPDATE ON GuildContribution
+        BEGIN
+            INSERT OR IGNORE INTO LeadershipRanks (name)
+            SELECT NEW.leadership_rank WHERE NEW.leadership_rank IS NOT NULL;
+            UPDATE GuildContribution_data
+            SET id = NEW.id, player_id = NEW.player_id, resources_contributed = NEW.resources_contributed,
+                help_count = NEW.help_count,
+                rank_id = (SELECT id FROM LeadershipRanks WHERE name = NEW.leadership_rank)
+            WHERE id = OLD.id;
+        END;
+
+        CREATE TRIGGER GuildContribution_delete INSTEAD OF DELETE ON GuildContribution
+        BEGIN
+            DELETE FROM GuildContribution_data WHERE id = OLD.id;
+        END;
+
+        CREATE INDEX IF NOT EXISTS idx_contribution_player ON GuildContribution_data (player_id);
+    """
+
+    EVENT_PARTICIPATION = f"""
+        CREATE TABLE EventParticipation_data (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            player_id INTEGER,
+            event_day INTEGER,
+            participated INTEGER CHECK(participated IN (0, 1)),
+            FOREIGN KEY (player_id) REFERENCES Players_data(id)
+        );
+
+        INSERT INTO EventParticipation_data (id, player_id, event_day, participated)
+        SELECT id, player_id, {day_sql('event_date')}, participated
+        FROM EventParticipation;
+
+        DROP TABLE EventParticipation;
+
+        CREATE VIEW EventParticipation AS
+        SELECT
+            id,
+            player_id,
+            {date_sql('event_day')} as event_date,
+            participated
+        FROM EventParticipation_data;
+
+        CREATE TRIGGER EventParticipation_insert INSTEAD OF INSERT ON EventParticipation
+        BEGIN
+            INSERT INTO EventParticipation_data (id, player_id, event_day, participated)
+            VALUES (NEW.id, NEW.player_id, {day_sql('NEW.event_date')}, NEW.participated);
+        END;
+
+        CREATE TRIGGER EventParticipation_update INSTEAD OF UPDATE ON EventParticipation
+        BEGIN
+            UPDATE EventParticipation_data
+            SET id = NEW.id, player_id = NEW.player_id, event_day = {day_sql('NEW.event_date')},
+                participated = NEW.participated
+            WHERE id = OLD.id;
+        END;
+
+        CREATE TRIGGER EventParticipation_delete INSTEAD OF DELETE ON EventParticipation
+        BEGIN
+            DELETE FROM EventParticipation_data WHERE id = OLD.id;
+        END;
+
+        CREATE INDEX IF NOT EXISTS idx_events_player_day ON EventParticipation_data (player_id, event_day);
+    """
+
+    # Проверка дат перед миграцией: нераспознанная дата превратилась бы в NULL
+    BAD_DATES_QUERY = f"""
+        SELECT 'Players', id, joined_date FROM Players
+        WHERE joined_date IS NOT NULL AND julianday(joined_date) IS NULL
+        UNION ALL
+        SELECT 'EventParticipation', id, event_date FROM EventParticipation
+        WHERE event_date IS NOT NULL AND julianday(event_date) IS NULL
+        LIMIT 10
+    """
+
+    def __init__(self, db_path):
+        self.db_path = db_path
+
+    @staticmethod
+    def is_compact(conn):
+        """Проверка, переведена ли база на компактную схему"""
+        row = conn.execute(
+            "SELECT COUNT(*) FROM sqlite_master WHERE type = 'table' AND name = 'Players_data'"
+        ).fetchone()
+        return row[0] > 0
+
+    def migrate(self, vacuum=True):
+        """Миграция существующей базы (повторный запуск ничего не делает)
+
+        Returns:
+            bool: True, если миграция выполнена
+        """
+        conn = ConnectionProfile.bulk().connect(self.db_path, isolation_level=None)
+        register_collation(conn)
+        try:
+            if self.is_compact(conn):
+                print("База данных уже использует компактную схему.")
+                return False
+
+            bad_dates = conn.execute(self.BAD_DATES_QUERY).fetchall()
+            if bad_dates:
+                raise ValueError(f"Нераспознанные даты, миграция отменена: {bad_dates}")
+
+            conn.execute("BEGIN IMMEDIATE")
+            try:
+                # executescript фиксирует открытую транзакцию, поэтому выполняем по одной команде
+                for statement in self._split_statements(self.LOOKUP_TABLES):
+                    conn.execute(statement)
+                conn.execute("""
+                    INSERT OR IGNORE INTO GuildStatuses (name)
+                    SELECT DISTINCT guild_status FROM Players WHERE guild_status IS NOT NULL
+                """)
+                conn.execute("""
+                    INSERT OR IGNORE INTO LeadershipRanks (name)
+                    SELECT DISTINCT leadership_rank FROM GuildContribution WHERE leadership_rank IS NOT NULL
+                """)
+                conn.execute("DROP INDEX IF EXISTS idx_events_player_date")
+
+                for script in (self.PLAYERS, self.PLAYERS_VIEW, self.GUILD_CONTRIBUTION, self.EVENT_PARTICIPATION):
+                    for statement in self._split_statements(script):
+                        conn.execute(statement)
+                conn.execute("COMMIT")
+            except Exception:
+                conn.execute("ROLLBACK")
+                raise
+
+            if vacuum:
+                conn.execute("VACUUM")
+            print("База данных переведена на компактную схему.")
+            return True
+        finally:
+            conn.close()
+
+    @staticmethod
+    def _split_statements(script):
+        """Разбиение скрипта на отдельные команды с учетом тел триггеров"""
+        statements = []
+        current = ""
+        for line in script.strip().splitlines(keepends=True):
+            current += line
+            if sqlite3.complete_statement(current):
+                if current.strip():
+                    statements.append(current.strip())
+                current = ""
+        return statements
+
+
+if __name__ == "__main__":
+    CompactSchemaMigration(sys.argv[1] if len(sys.argv) > 1 else "data/ligma.db").migrate()
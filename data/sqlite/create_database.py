@@ -2,19 +2,32 @@ import sqlite3
 from pathlib import Path
 from random import choice
 from data.sqlite.fill_database import fill_db
+from data.sqlite.compact_schema import CompactSchemaMigration
+from data.sqlite.sort_keys import register_collation, sort_key_triggers
+from data.sqlite.change_log import (CHANGE_LOG, SYNC_CHECKPOINT, CHANGE_LOG_COMPACTION, TRACKED_TABLES,
+                                   physical_table, change_log_triggers)
+from data.sqlite.scores import PLAYER_SCORES, SCORE_HISTORY, SCORE_STATE
+from data.sqlite.attendance import PLAYER_ATTENDANCE, events_table, event_key_index, attendance_triggers
+from data.sqlite.saved_searches import SAVED_SEARCHES, SAVED_SEARCH_RESULTS
+from config.cfg import ConnectionProfile
 
 
 class create_db:
-    def __init__(self):
-        self.path_file = Path("data/ligma.db")
+    def __init__(self, path_file="data/ligma.db", fill=None, compact=False):
+        self.path_file = Path(path_file)
+        self.fill = fill
+        self.compact = compact
         self.create()
 
     def create(self):
         if self.path_file.exists():
             print("База данных уже существует.")
+            self.upgrade()
         else:
-            print("Создаем базу данных...")
-            self.conn = sqlite3.connect(self.path_file)
+            print(f"Создаем базу данных {self.path_file}...")
+            self.path_file.parent.mkdir(parents=True, exist_ok=True)
+            self.conn = ConnectionProfile.bulk().connect(self.path_file)
+            register_collation(self.conn)
             self.cursor = self.conn.cursor()
 
             self.create_classes()
@@ -22,17 +35,49 @@ class create_db:
             self.create_events()
             self.create_activities()
             self.create_guild_contribution()
+            self.create_sort_keys()
+            self.create_indexes()
 
-            choice = int(input("Необходимо ли заполнить базу данных? \n1 - да \n0 - нет \nОтвет: "))
-            if choice == 1:
+            if self.fill is None:
+                self.fill = int(input("Необходимо ли заполнить базу данных? \n1 - да \n0 - нет \nОтвет: ")) == 1
+            if self.fill:
                 fill_db(self.cursor)
             else:
                 print("База данных не будет заполнена.")
 
+            # Журнал изменений ведется после начального заполнения
+            self.create_change_log()
+            self.create_scores()
+            self.create_attendance()
+            self.create_saved_searches()
+
             self.conn.commit()
             self.conn.close()
+
+            # Компактная схема: целые коды статусов/ролей и даты номерами дней
+            if self.compact:
+                CompactSchemaMigration(self.path_file).migrate()
+                self.upgrade()
             print("База данных создана.")
 
+    def upgrade(self):
+        """Доведение существующей базы до актуальной схемы (индексы и т.п.)"""
+        self.conn = ConnectionProfile.bulk().connect(self.path_file)
+        register_collation(self.conn)
+        self.cursor = self.conn.cursor()
+        try:
+            self.create_sort_keys()
+            self.create_change_log()
+            self.create_scores()
+            self.create_attendance()
+            self.create_saved_searches()
+            self.create_indexes()
+            self.conn.commit()
+        except sqlite3.Error as e:
+            print(f"Ошибка обновления схемы: {e}")
+        finally:
+            self.conn.close()
+
     def drop_tables(self):
         self.cursor.executescript('''
         DROP TABLE IF EXISTS GuildContribution;
@@ -61,6 +106,8 @@ class create_db:
             level INTEGER,
             joined_date TEXT,
             guild_status TEXT,
+            nickname_key TEXT,
+            tag_key TEXT,
             FOREIGN KEY (class_id) REFERENCES Classes(id)
     )
     ''')
@@ -100,5 +147,85 @@ class create_db:
         )
         ''')
 
+    def create_sort_keys(self):
+        """Колонки ключей сортировки ника и тега, триггеры и индексы (см. sort_keys)"""
+        compact = CompactSchemaMigration.is_compact(self.conn)
+        table = "Players_data" if compact else "Players"
+
+        columns = [row[1] for row in self.cursor.execute(f"PRAGMA table_info({table})")]
+        missing = [column for column in ("nickname_key", "tag_key") if column not in columns]
+        for column in missing:
+            self.cursor.execute(f"ALTER TABLE {table} ADD COLUMN {column} TEXT")
+
+        if compact and missing:
+            # Представление Players пересоздается с новыми колонками (вместе с его триггерами)
+            self.cursor.execute("DROP VIEW IF EXISTS Players")
+            for statement in CompactSchemaMigration._split_statements(CompactSchemaMigration.PLAYERS_VIEW):
+                self.cursor.execute(statement)
+
+        self.cursor.executescript(sort_key_triggers(table))
+        self.cursor.execute(f'''
+        UPDATE {table}
+        SET nickname_key = sort_key(nickname), tag_key = sort_key(tag)
+        WHERE nickname_key IS NULL OR tag_key IS NULL
+        ''')
+        self.cursor.executescript(f'''
+        CREATE INDEX IF NOT EXISTS idx_players_nickname_key ON {table} (nickname_key);
+        CREATE INDEX IF NOT EXISTS idx_players_tag_key ON {table} (tag_key);
+        ''')
+
+    def create_change_log(self):
+        """Журнал изменений строк, его триггеры и отметки синхронизации реплик (см. change_log)"""
+        compact = CompactSchemaMigration.is_compact(self.conn)
+        self.cursor.execute(CHANGE_LOG)
+        self.cursor.execute(SYNC_CHECKPOINT)
+        self.cursor.execute(CHANGE_LOG_COMPACTION)
+        for table in TRACKED_TABLES:
+            physical = physical_table(table, compact)
+            columns = [row[1] for row in self.cursor.execute(f"PRAGMA table_info({physical})")]
+            self.cursor.executescript(change_log_triggers(table, physical, columns))
+
+    def create_scores(self):
+        """Кэш рейтинга игроков (заполняется при первом открытии рейтинга, см. scores)"""
+        self.cursor.executescript(PLAYER_SCORES)
+        self.cursor.execute(SCORE_HISTORY)
+        self.cursor.execute(SCORE_STATE)
+
+    def create_attendance(self):
+        """Кэш посещаемости и его триггеры (строки считаются при первом чтении, см. attendance)"""
+        self.cursor.execute(PLAYER_ATTENDANCE)
+        self.cursor.executescript(attendance_triggers(CompactSchemaMigration.is_compact(self.conn)))
+
+    def create_saved_searches(self):
+        """Сохраненные поиски и кэш их результатов (см. saved_searches)"""
+        self.cursor.execute(SAVED_SEARCHES)
+        self.cursor.execute(SAVED_SEARCH_RESULTS)
 
+    def create_indexes(self):
+        compact = CompactSchemaMigration.is_compact(self.conn)
+
+        # В компактной схеме Players и GuildContribution — представления,
+        # индексы строятся по таблицам *_data (даты и события индексирует миграция)
+        players = "Players_data" if compact else "Players"
+        contribution = "GuildContribution_data" if compact else "GuildContribution"
+        events, event_date = events_table(compact)
+
+        # Индексы под сортировку по заголовкам таблицы и под соединения детального режима
+        self.cursor.executescript(f'''
+        CREATE INDEX IF NOT EXISTS idx_players_nickname ON {players} (nickname);
+        CREATE INDEX IF NOT EXISTS idx_players_level ON {players} (level);
+        CREATE INDEX IF NOT EXISTS idx_activity_player ON Activity (player_id);
+        CREATE INDEX IF NOT EXISTS idx_contribution_player ON {contribution} (player_id);
+        CREATE INDEX IF NOT EXISTS idx_events_date_attendance ON {events} ({event_date}, player_id, participated);
+
+        -- Сортировка по урону и ресурсам идет через LEFT JOIN от Players, и эти индексы
+        -- ее не обслуживают, а только замедляют запись (в базах прежних версий удаляются)
+        DROP INDEX IF EXISTS idx_activity_weekly_damage;
+        DROP INDEX IF EXISTS idx_contribution_resources;
+        ''')
+        # Одна отметка на игрока и дату; индекс заодно обслуживает историю игрока
+        self.cursor.executescript(event_key_index(compact))
+        if compact:
+            return
 
+        self.cursor.execute("CREATE INDEX IF NOT EXISTS idx_players_joined_date ON Players (joined_date)")
@@ -0,0 +1,30 @@
+"""Сохраненные поиски
+
+SavedSearches хранит именованные поиски: параметры формы расширенного
+поиска (JSON), скомпилированный по ним запрос id игроков и seq ChangeLog,
+на котором посчитан результат. Сам результат — множество id игроков —
+лежит в SavedSearchResults; по первичному ключу (поиск, игрок) главное
+окно фильтрует таблицу подзапросом, не перечисляя id в SQL
+(см. utils.saved_searches).
+"""
+
+SAVED_SEARCHES = """
+    CREATE TABLE IF NOT EXISTS SavedSearches (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        name TEXT NOT NULL UNIQUE,
+        mode TEXT NOT NULL,
+        params TEXT NOT NULL,
+        query TEXT NOT NULL,
+        result_seq INTEGER,
+        result_count INTEGER,
+        refreshed_at TEXT
+    )
+"""
+
+SAVED_SEARCH_RESULTS = """
+    CREATE TABLE IF NOT EXISTS SavedSearchResults (
+        search_id INTEGER NOT NULL,
+        player_id INTEGER NOT NULL,
+        PRIMARY KEY (search_id, player_id)
+    ) WITHOUT ROWID
+"""
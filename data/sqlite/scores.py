@@ -0,0 +1,44 @@
+"""Таблицы рейтинга игроков
+
+PlayerScores — кэш составного рейтинга: балл, место в гильдии и в классе,
+место на конец прошлой недели (для изменения за неделю). Индекс по месту
+делает выборку топ-K чтением первых K записей индекса.
+
+ScoreHistory хранит места на конец каждой недели, ScoreState — докуда
+прочитан ChangeLog, текущую неделю и веса, с которыми посчитан кэш
+(см. utils.leaderboard).
+"""
+
+PLAYER_SCORES = """
+    CREATE TABLE IF NOT EXISTS PlayerScores (
+        player_id INTEGER PRIMARY KEY,
+        class_id INTEGER,
+        score REAL NOT NULL,
+        rank INTEGER,
+        class_rank INTEGER,
+        previous_rank INTEGER,
+        computed_at TEXT
+    );
+
+    CREATE INDEX IF NOT EXISTS idx_player_scores_rank ON PlayerScores (rank);
+    CREATE INDEX IF NOT EXISTS idx_player_scores_class ON PlayerScores (class_id, class_rank);
+"""
+
+SCORE_HISTORY = """
+    CREATE TABLE IF NOT EXISTS ScoreHistory (
+        week TEXT NOT NULL,
+        player_id INTEGER NOT NULL,
+        score REAL NOT NULL,
+        rank INTEGER,
+        PRIMARY KEY (week, player_id)
+    ) WITHOUT ROWID
+"""
+
+SCORE_STATE = """
+    CREATE TABLE IF NOT EXISTS ScoreState (
+        id INTEGER PRIMARY KEY CHECK(id = 1),
+        seq INTEGER NOT NULL,
+        week TEXT NOT NULL,
+        weights TEXT NOT NULL
+    )
+"""
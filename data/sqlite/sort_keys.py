@@ -0,0 +1,93 @@
+"""Ключи сортировки никнеймов и тегов
+
+Ключ — строка, приведенная к нижнему регистру с учетом кириллицы
+(встроенный lower() SQLite понимает только ASCII), где ё приравнена к е.
+Ключи хранятся в колонках nickname_key и tag_key, поддерживаются
+триггерами при любой записи и индексируются, поэтому сортировка и поиск
+«начинается с» идут по индексу.
+
+Для разовых запросов из Python (sqlite3) регистрируется коллация
+NICKNAME и функция sort_key() с тем же правилом сравнения.
+"""
+
+COLLATION_NAME = "NICKNAME"
+
+# Строчные пары заглавных букв, которые не переводит lower() SQLite
+_UPPER = "АБВГДЕЁЖЗИЙКЛМНОПРСТУФХЦЧШЩЪЫЬЭЮЯІЇЄҐЎ"
+_LOWER = "абвгдеежзийклмнопрстуфхцчшщъыьэюяіїєґў"
+FOLD_MAP = dict(zip(_UPPER, _LOWER))
+FOLD_MAP["ё"] = "е"
+
+_FOLD_TABLE = str.maketrans({**{chr(c): chr(c + 32) for c in range(ord("A"), ord("Z") + 1)}, **FOLD_MAP})
+
+# Верхняя граница диапазона для поиска по префиксу (максимальная кодовая точка)
+PREFIX_END = "\U0010ffff"
+
+
+def sort_key(text):
+    """Ключ сортировки строки (то же правило, что и в триггерах sort_key_triggers)"""
+    if text is None:
+        return None
+    return str(text).translate(_FOLD_TABLE)
+
+
+def _fold_chunks(size=10):
+    """Замены FOLD_MAP порциями: глубокая вложенность replace() переполняет стек парсера SQLite"""
+    items = list(FOLD_MAP.items())
+    return [items[i:i + size] for i in range(0, len(items), size)]
+
+
+def _replace_chain(expression, pairs):
+    for upper, lower in pairs:
+        expression = f"replace({expression}, '{upper}', '{lower}')"
+    return expression
+
+
+def prefix_bounds(prefix):
+    """Границы [начало, конец) ключей, начинающихся с prefix
+
+    Условие key >= ? AND key < ? выполняется поиском по индексу, в отличие
+    от LIKE 'prefix%' с учетом регистра.
+    """
+    key = sort_key(prefix)
+    return key, key + PREFIX_END
+
+
+def collate(left, right):
+    """Функция сравнения для коллации NICKNAME"""
+    left_key, right_key = sort_key(left), sort_key(right)
+    return (left_key > right_key) - (left_key < right_key)
+
+
+def register_collation(conn):
+    """Регистрация коллации NICKNAME и функции sort_key() на соединении sqlite3"""
+    conn.create_collation(COLLATION_NAME, collate)
+    conn.create_function("sort_key", 1, sort_key, deterministic=True)
+
+
+def sort_key_triggers(table):
+    """Триггеры, пересчитывающие ключи при вставке и изменении ника/тега
+
+    Триггеры написаны на чистом SQL (без sort_key()), чтобы работать при
+    записи через любое соединение, включая QtSql, где Python-функции
+    зарегистрировать нельзя.
+    """
+    steps = [f"UPDATE {table} SET nickname_key = lower(NEW.nickname), tag_key = lower(NEW.tag) WHERE id = NEW.id;"]
+    for pairs in _fold_chunks():
+        steps.append(
+            f"UPDATE {table} SET nickname_key = {_replace_chain('nickname_key', pairs)}, "
+            f"tag_key = {_replace_chain('tag_key', pairs)} WHERE id = NEW.id;"
+        )
+    body = "\n            ".join(steps)
+
+    return f"""
+        CREATE TRIGGER IF NOT EXISTS {table}_sort_keys_insert AFTER INSERT ON {table}
+        BEGIN
+            {body}
+        END;
+
+        CREATE TRIGGER IF NOT EXISTS {table}_sort_keys_update AFTER UPDATE OF nickname, tag ON {table}
+        BEGIN
+            {body}
+        END;
+    """
@@ -0,0 +1,98 @@
+from PyQt6.QtWidgets import (QDialog, QVBoxLayout, QHBoxLayout, QTableWidget, QTableWidgetItem,
+                             QPushButton, QComboBox, QLabel)
+
+from utils.analytics import AnalyticsReplica
+
+
+class AnalyticsWindow(QDialog):
+    """Сводные отчеты по снимку БД в памяти (см. AnalyticsReplica)"""
+
+    def __init__(self, parent=None):
+        super().__init__(parent)
+        self.setWindowTitle("Аналитика")
+        self.resize(760, 520)
+
+        self.replica = AnalyticsReplica.instance()
+
+        self._setup_ui()
+        self._connect_events()
+        self._show_snapshot(self.replica.snapshot)
+        self._build()
+
+    def _setup_ui(self):
+        """Построение интерфейса"""
+        layout = QVBoxLayout(self)
+
+        controls = QHBoxLayout()
+        self.reportComboBox = QComboBox()
+        for name, report in AnalyticsReplica.REPORTS.items():
+            self.reportComboBox.addItem(report["title"], name)
+        self.build_button = QPushButton("Построить")
+        self.refresh_button = QPushButton("Обновить снимок")
+        controls.addWidget(self.reportComboBox)
+        controls.addWidget(self.build_button)
+        controls.addStretch()
+        controls.addWidget(self.refresh_button)
+        layout.addLayout(controls)
+
+        self.tableWidget = QTableWidget(0, 0)
+        self.tableWidget.setEditTriggers(QTableWidget.EditTrigger.NoEditTriggers)
+        self.tableWidget.setSelectionBehavior(QTableWidget.SelectionBehavior.SelectRows)
+        layout.addWidget(self.tableWidget)
+
+        self.statusLabel = QLabel()
+        layout.addWidget(self.statusLabel)
+
+    def _connect_events(self):
+        """Подключение событий"""
+        self.build_button.clicked.connect(self._build)
+        self.reportComboBox.currentIndexChanged.connect(self._build)
+        self.refresh_button.clicked.connect(self._refresh_snapshot)
+
+        self.replica.report_ready.connect(self._on_report)
+        self.replica.refreshed.connect(self._show_snapshot)
+        self.replica.failed.connect(self._on_failed)
+
+    def done(self, result):
+        """Отключение от сигналов снимка при закрытии окна"""
+        self.replica.report_ready.disconnect(self._on_report)
+        self.replica.refreshed.disconnect(self._show_snapshot)
+        self.replica.failed.disconnect(self._on_failed)
+        super().done(result)
+
+    def _build(self):
+        self.statusLabel.setText("Отчет строится в фоне...")
+        self.replica.request(self.reportComboBox.currentData())
+
+    def _refresh_snapshot(self):
+        self.statusLabel.setText("Снимок обновляется в фоне...")
+        self.replica.refresh()
+        self.replica.request(self.reportComboBox.currentData())
+
+    def _on_report(self, report, headers, rows):
+        # Ответ на отчет, выбранный раньше, не показываем
+        if report != self.reportComboBox.currentData():
+            return
+        self.tableWidget.clear()
+        self.tableWidget.setColumnCount(len(headers))
+        self.tableWidget.setHorizontalHeaderLabels(headers)
+        self.tableWidget.setRowCount(len(rows))
+        for row, values in enumerate(rows):
+            for column, value in enumerate(values):
+                self.tableWidget.setItem(row, column, QTableWidgetItem("" if value is None else str(value)))
+        self.tableWidget.resizeColumnsToContents()
+        self._show_snapshot(self.replica.snapshot)
+
+    def _show_snapshot(self, snapshot):
+        if snapshot is None:
+            self.statusLabel.setText("Снимок еще не создан")
+            return
+        self.statusLabel.setText(
+            f"Снимок {snapshot.db_path} от {snapshot.taken_at.strftime('%H:%M:%S')}: "
+            f"{snapshot.size_bytes / (1024 * 1024):.1f} МБ за {snapshot.elapsed_ms:.0f} мс, "
+            f"изменений после снимка: {snapshot.pending_changes} "
+            f"(обновление после {self.replica.settings['refresh_after']})"
+        )
+
+    def _on_failed(self, error):
+        self.statusLabel.setText(f"Ошибка: {error}")
@@ -0,0 +1,138 @@
+from PyQt6.QtWidgets import (QDialog, QVBoxLayout, QHBoxLayout, QTableWidget, QTableWidgetItem,
+                             QPushButton, QCheckBox, QSpinBox, QLabel, QProgressBar)
+
+from utils.backup import BackupManager
+from utils.database import DatabaseManager
+
+
+class BackupWindow(QDialog):
+    """Резервные копии: запуск вручную, расписание, хранение и статистика копирования"""
+
+    HEADERS = ["Время", "БД", "Файл", "Размер, МБ", "Длительность, мс", "МБ/с",
+               "Шагов", "Макс. пауза, мс", "Перезапусков", "Проверка"]
+
+    def __init__(self, guild_paths, parent=None):
+        super().__init__(parent)
+        self.setWindowTitle("Резервные копии")
+        self.resize(900, 420)
+
+        self.manager = BackupManager.instance()
+        self.guild_paths = guild_paths
+
+        self._setup_ui()
+        self._connect_events()
+        self._refresh()
+
+    def _setup_ui(self):
+        """Построение интерфейса"""
+        layout = QVBoxLayout(self)
+        settings = self.manager.settings
+
+        controls = QHBoxLayout()
+        self.scheduleCheckBox = QCheckBox("Копировать все гильдии каждые")
+        self.scheduleCheckBox.setChecked(settings["scheduled"])
+        self.intervalSpinBox = QSpinBox()
+        self.intervalSpinBox.setRange(1, 24 * 60)
+        self.intervalSpinBox.setSuffix(" мин")
+        self.intervalSpinBox.setValue(settings["interval_minutes"])
+        self.keepSpinBox = QSpinBox()
+        self.keepSpinBox.setRange(1, 100)
+        self.keepSpinBox.setValue(settings["keep"])
+        controls.addWidget(self.scheduleCheckBox)
+        controls.addWidget(self.intervalSpinBox)
+        controls.addWidget(QLabel("Хранить копий:"))
+        controls.addWidget(self.keepSpinBox)
+        controls.addStretch()
+        layout.addLayout(controls)
+
+        buttons = QHBoxLayout()
+        self.backup_button = QPushButton("Копировать активную гильдию")
+        self.backup_all_button = QPushButton("Копировать все гильдии")
+        self.refresh_button = QPushButton("Обновить")
+        buttons.addWidget(self.backup_button)
+        buttons.addWidget(self.backup_all_button)
+        buttons.addStretch()
+        buttons.addWidget(self.refresh_button)
+        layout.addLayout(buttons)
+
+        self.progressBar = QProgressBar()
+        self.progressBar.setFormat("%v из %m страниц")
+        self.progressBar.setVisible(False)
+        layout.addWidget(self.progressBar)
+
+        self.tableWidget = QTableWidget(0, len(self.HEADERS))
+        self.tableWidget.setHorizontalHeaderLabels(self.HEADERS)
+        self.tableWidget.setEditTriggers(QTableWidget.EditTrigger.NoEditTriggers)
+        self.tableWidget.setSelectionBehavior(QTableWidget.SelectionBehavior.SelectRows)
+        layout.addWidget(self.tableWidget)
+
+        self.statusLabel = QLabel()
+        layout.addWidget(self.statusLabel)
+
+    def _connect_events(self):
+        """Подключение событий"""
+        self.backup_button.clicked.connect(lambda: self._backup([DatabaseManager.active_db_path]))
+        self.backup_all_button.clicked.connect(lambda: self._backup(self.guild_paths))
+        self.refresh_button.clicked.connect(self._refresh)
+        self.scheduleCheckBox.toggled.connect(self._apply_settings)
+        self.intervalSpinBox.valueChanged.connect(self._apply_settings)
+        self.keepSpinBox.valueChanged.connect(self._apply_settings)
+
+        self.manager.progress.connect(self._on_progress)
+        self.manager.finished.connect(self._on_done)
+        self.manager.failed.connect(self._on_done)
+
+    def done(self, result):
+        """Отключение от сигналов менеджера при закрытии окна"""
+        self.manager.progress.disconnect(self._on_progress)
+        self.manager.finished.disconnect(self._on_done)
+        self.manager.failed.disconnect(self._on_done)
+        super().done(result)
+
+    def _apply_settings(self):
+        """Применение и сохранение настроек хранения и расписания"""
+        self.manager.settings["keep"] = self.keepSpinBox.value()
+        if self.scheduleCheckBox.isChecked():
+            self.manager.start_schedule(self.intervalSpinBox.value())
+        else:
+            self.manager.settings["interval_minutes"] = self.intervalSpinBox.value()
+            self.manager.stop_schedule()
+        self.manager.save_settings()
+
+    def _backup(self, db_paths):
+        self.manager.backup_now(db_paths)
+        self.statusLabel.setText("Копирование в фоне, работу с приложением можно продолжать")
+
+    def _on_progress(self, db_path, remaining, total):
+        self.progressBar.setVisible(True)
+        self.progressBar.setMaximum(total)
+        self.progressBar.setValue(total - remaining)
+
+    def _on_done(self, result):
+        self.progressBar.setVisible(False)
+        self._refresh()
+
+    def _refresh(self):
+        """Обновление таблицы последних копирований"""
+        history = list(reversed(self.manager.history))
+        self.tableWidget.setRowCount(len(history))
+        for row, result in enumerate(history):
+            values = [
+                result.started.strftime("%d.%m.%Y %H:%M:%S"),
+                result.source,
+                result.path.name if result.ok else "—",
+                f"{result.size_bytes / (1024 * 1024):.1f}",
+                f"{result.elapsed_ms:.0f}",
+                f"{result.throughput_mb_s:.1f}",
+                result.steps,
+                f"{result.max_pause_ms:.1f}",
+                result.restarts,
+                "ok" if result.ok else (result.error or result.integrity)
+            ]
+            for column, value in enumerate(values):
+                self.tableWidget.setItem(row, column, QTableWidgetItem(str(value)))
+        self.tableWidget.resizeColumnsToContents()
+
+        backups = self.manager.backups_of(DatabaseManager.active_db_path)
+        self.statusLabel.setText(f"Папка копий: {self.manager.settings['backup_dir']}, "
+                                 f"копий активной гильдии: {len(backups)}")
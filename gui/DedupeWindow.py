@@ -0,0 +1,120 @@
+import sqlite3
+
+from PyQt6.QtWidgets import (QDialog, QVBoxLayout, QHBoxLayout, QTableWidget, QTableWidgetItem,
+                             QPushButton, QSpinBox, QLabel, QMessageBox)
+
+from config.cfg import ConnectionProfile
+from utils.database import DatabaseManager
+from utils.dedupe import DuplicateFinder, PlayerMerger
+from utils.ui_helpers import MessageHelper
+
+
+class DedupeWindow(QDialog):
+    """Поиск дублей игроков и их слияние (см. DuplicateFinder, PlayerMerger)"""
+
+    HEADERS = ["Причина", "Расстояние", "Оставить", "Тег", "Влить", "Тег"]
+
+    def __init__(self, parent=None):
+        super().__init__(parent)
+        self.setWindowTitle("Дубли игроков")
+        self.resize(820, 520)
+
+        self.conn = ConnectionProfile.active().connect(DatabaseManager.active_db_path)
+        self.finder = DuplicateFinder(self.conn)
+        self.candidates = []
+
+        self._setup_ui()
+        self._connect_events()
+        self._find()
+
+    def _setup_ui(self):
+        """Построение интерфейса"""
+        layout = QVBoxLayout(self)
+
+        controls = QHBoxLayout()
+        self.distanceSpinBox = QSpinBox()
+        self.distanceSpinBox.setRange(0, 3)
+        self.distanceSpinBox.setValue(2)
+        self.find_button = QPushButton("Найти")
+        controls.addWidget(QLabel("Макс. число правок в нике:"))
+        controls.addWidget(self.distanceSpinBox)
+        controls.addWidget(self.find_button)
+        controls.addStretch()
+        layout.addLayout(controls)
+
+        self.tableWidget = QTableWidget(0, len(self.HEADERS))
+        self.tableWidget.setHorizontalHeaderLabels(self.HEADERS)
+        self.tableWidget.setEditTriggers(QTableWidget.EditTrigger.NoEditTriggers)
+        self.tableWidget.setSelectionBehavior(QTableWidget.SelectionBehavior.SelectRows)
+        layout.addWidget(self.tableWidget)
+
+        buttons = QHBoxLayout()
+        self.swap_button = QPushButton("Поменять местами")
+        self.merge_button = QPushButton("Объединить выбранные")
+        self.close_button = QPushButton("Закрыть")
+        buttons.addWidget(self.swap_button)
+        buttons.addStretch()
+        buttons.addWidget(self.merge_button)
+        buttons.addWidget(self.close_button)
+        layout.addLayout(buttons)
+
+        self.statusLabel = QLabel()
+        layout.addWidget(self.statusLabel)
+
+    def _connect_events(self):
+        """Подключение событий"""
+        self.find_button.clicked.connect(self._find)
+        self.swap_button.clicked.connect(self._swap)
+        self.merge_button.clicked.connect(self._merge)
+        self.close_button.clicked.connect(self.reject)
+
+    def done(self, result):
+        """Закрытие соединения вместе с окном"""
+        self.conn.close()
+        super().done(result)
+
+    def _find(self):
+        self.candidates = self.finder.find(self.distanceSpinBox.value())
+        self._show()
+        self.statusLabel.setText(f"Найдено пар: {len(self.candidates)} "
+                                 f"среди {len(self.finder.players)} игроков ({self.finder.elapsed_ms:.0f} мс)")
+
+    def _show(self):
+        self.tableWidget.setRowCount(len(self.candidates))
+        for row, candidate in enumerate(self.candidates):
+            keep = self.finder.players.get(candidate.keep_id, ("", ""))
+            merge = self.finder.players.get(candidate.merge_id, ("", ""))
+            values = [candidate.reason, candidate.distance or "", f"{keep[0]} (id {candidate.keep_id})", keep[1],
+                      f"{merge[0]} (id {candidate.merge_id})", merge[1]]
+            for column, value in enumerate(values):
+                self.tableWidget.setItem(row, column, QTableWidgetItem(str(value)))
+        self.tableWidget.resizeColumnsToContents()
+
+    def _selected_rows(self):
+        return sorted({index.row() for index in self.tableWidget.selectionModel().selectedRows()})
+
+    def _swap(self):
+        for row in self._selected_rows():
+            self.candidates[row] = self.candidates[row].swapped()
+        self._show()
+
+    def _merge(self):
+        rows = self._selected_rows()
+        if not rows:
+            self.statusLabel.setText("Не выбрано ни одной пары")
+            return
+        reply = MessageHelper.show_question(self, "Объединение игроков",
+                                            f"Объединить выбранные пары ({len(rows)})? Дубли будут удалены.")
+        if reply != QMessageBox.StandardButton.Yes:
+            return
+
+        try:
+            merged = PlayerMerger(self.conn).merge(
+                [(self.candidates[row].keep_id, self.candidates[row].merge_id) for row in rows])
+        except sqlite3.Error as e:
+            print(f"Ошибка объединения игроков: {e}")
+            self.statusLabel.setText(f"Ошибка объединения игроков: {e}")
+            return
+
+        self._find()
+        self.statusLabel.setText(f"Объединено игроков: {merged}. {self.statusLabel.text()}")
@@ -0,0 +1,121 @@
+from PyQt6.QtWidgets import (QDialog, QVBoxLayout, QHBoxLayout, QTableWidget, QTableWidgetItem,
+                             QPushButton, QPlainTextEdit, QComboBox, QLabel)
+
+from utils.query_stats import QueryStats
+from utils.stall_monitor import StallMonitor
+
+
+class DiagnosticsWindow(QDialog):
+    """Панель диагностики: самые затратные запросы и их планы выполнения"""
+
+    HEADERS = ["Запрос", "Вызовов", "Всего, мс", "Среднее, мс", "p95, мс", "Макс, мс", "Строк"]
+
+    SORT_KEYS = {
+        "По общему времени": "total_ms",
+        "По максимальному времени": "max_ms",
+        "По среднему времени": "avg_ms",
+        "По числу вызовов": "count",
+        "По числу строк": "rows"
+    }
+
+    def __init__(self, parent=None):
+        super().__init__(parent)
+        self.setWindowTitle("Диагностика запросов")
+        self.resize(900, 520)
+
+        self.stats = QueryStats.instance()
+        self.items = []
+
+        self._setup_ui()
+        self._connect_events()
+        self._refresh()
+
+    def _setup_ui(self):
+        """Построение интерфейса"""
+        layout = QVBoxLayout(self)
+
+        controls = QHBoxLayout()
+        self.sortComboBox = QComboBox()
+        self.sortComboBox.addItems(self.SORT_KEYS.keys())
+        self.refresh_button = QPushButton("Обновить")
+        self.reset_button = QPushButton("Сбросить")
+        controls.addWidget(self.sortComboBox)
+        controls.addStretch()
+        controls.addWidget(QLabel(f"Порог медленного запроса: {QueryStats.slow_threshold_ms} мс, "
+                                  f"журнал: {QueryStats.log_path}"))
+        controls.addWidget(self.refresh_button)
+        controls.addWidget(self.reset_button)
+        layout.addLayout(controls)
+
+        self.tableWidget = QTableWidget(0, len(self.HEADERS))
+        self.tableWidget.setHorizontalHeaderLabels(self.HEADERS)
+        self.tableWidget.setEditTriggers(QTableWidget.EditTrigger.NoEditTriggers)
+        self.tableWidget.setSelectionBehavior(QTableWidget.SelectionBehavior.SelectRows)
+        self.tableWidget.horizontalHeader().setStretchLastSection(False)
+        layout.addWidget(self.tableWidget)
+
+        self.latencyLabel = QLabel()
+        layout.addWidget(self.latencyLabel)
+
+        self.planEdit = QPlainTextEdit()
+        self.planEdit.setReadOnly(True)
+        self.planEdit.setMaximumHeight(140)
+        self.planEdit.setPlaceholderText("Выберите запрос, чтобы увидеть его текст и план выполнения")
+        layout.addWidget(self.planEdit)
+
+    def _connect_events(self):
+        """Подключение событий"""
+        self.refresh_button.clicked.connect(self._refresh)
+        self.reset_button.clicked.connect(self._reset)
+        self.sortComboBox.currentIndexChanged.connect(self._refresh)
+        self.tableWidget.currentCellChanged.connect(self._show_details)
+
+    def _refresh(self):
+        """Обновление таблицы худших запросов"""
+        key = self.SORT_KEYS[self.sortComboBox.currentText()]
+        self.items = self.stats.top(limit=50, key=key)
+
+        self.tableWidget.setRowCount(len(self.items))
+        for row, item in enumerate(self.items):
+            values = [
+                item.shape,
+                item.count,
+                f"{item.total_ms:.1f}",
+                f"{item.avg_ms:.2f}",
+                f"{item.percentile(0.95):.1f}",
+                f"{item.max_ms:.1f}",
+                item.rows
+            ]
+            for column, value in enumerate(values):
+                self.tableWidget.setItem(row, column, QTableWidgetItem(str(value)))
+
+        self.tableWidget.resizeColumnsToContents()
+        self.tableWidget.setColumnWidth(0, min(self.tableWidget.columnWidth(0), 420))
+
+        # Отзывчивость интерфейса: задержка цикла событий и число зависаний
+        monitor = StallMonitor.instance()
+        latency = monitor.latency
+        self.latencyLabel.setText(
+            f"Задержка цикла событий: среднее {latency.avg_ms:.1f} мс, p95 {latency.percentile(0.95):.0f} мс, "
+            f"макс {latency.max_ms:.0f} мс. Зависаний дольше {monitor.threshold_ms} мс: {monitor.stall_count} "
+            f"(журнал: {monitor.log_path})"
+        )
+
+    def _show_details(self, row, *args):
+        """Текст запроса, гистограмма и план выполнения"""
+        if row < 0 or row >= len(self.items):
+            self.planEdit.clear()
+            return
+
+        item = self.items[row]
+        histogram = ", ".join(
+            f"≤{bound:g}: {hits}" for bound, hits in zip(item.BUCKETS, item.histogram) if hits
+        )
+        plan = item.plan or "план снимается для запросов дольше порога"
+        self.planEdit.setPlainText(f"{item.shape}\n\nГистограмма (мс): {histogram}\n\nПлан:\n{plan}")
+
+    def _reset(self):
+        """Сброс накопленной статистики"""
+        self.stats.reset()
+        self._refresh()
+        self.planEdit.clear()
@@ -0,0 +1,110 @@
+import sqlite3
+
+from PyQt6.QtCore import QDate
+from PyQt6.QtWidgets import (QDialog, QVBoxLayout, QHBoxLayout, QPushButton, QPlainTextEdit,
+                             QCheckBox, QDateEdit, QLabel, QFileDialog)
+
+from config.cfg import ConnectionProfile
+from utils.database import DatabaseManager
+from utils.event_entry import EventRecorder, EventRoster
+
+
+class EventEntryWindow(QDialog):
+    """Запись посещения события списком участников (см. EventRecorder)"""
+
+    def __init__(self, selected_ids=(), parent=None):
+        super().__init__(parent)
+        self.setWindowTitle("Запись события")
+        self.resize(480, 520)
+
+        self.selected_ids = list(selected_ids)
+        self.conn = ConnectionProfile.active().connect(DatabaseManager.active_db_path)
+        self.recorder = EventRecorder(self.conn)
+
+        self._setup_ui()
+        self._connect_events()
+
+    def _setup_ui(self):
+        """Построение интерфейса"""
+        layout = QVBoxLayout(self)
+
+        date_row = QHBoxLayout()
+        self.dateEdit = QDateEdit(QDate.currentDate())
+        self.dateEdit.setCalendarPopup(True)
+        self.dateEdit.setDisplayFormat("yyyy-MM-dd")
+        date_row.addWidget(QLabel("Дата события:"))
+        date_row.addWidget(self.dateEdit)
+        date_row.addStretch()
+        layout.addLayout(date_row)
+
+        layout.addWidget(QLabel("Участники (ники или теги, по одному в строке):"))
+        self.rosterEdit = QPlainTextEdit()
+        layout.addWidget(self.rosterEdit)
+
+        self.selectedCheckBox = QCheckBox(f"Добавить выделенных в таблице ({len(self.selected_ids)})")
+        self.selectedCheckBox.setChecked(bool(self.selected_ids))
+        self.selectedCheckBox.setEnabled(bool(self.selected_ids))
+        self.absentCheckBox = QCheckBox("Отметить остальных игроков как отсутствовавших")
+        layout.addWidget(self.selectedCheckBox)
+        layout.addWidget(self.absentCheckBox)
+
+        buttons = QHBoxLayout()
+        self.file_button = QPushButton("Из файла...")
+        self.record_button = QPushButton("Записать")
+        self.close_button = QPushButton("Закрыть")
+        buttons.addWidget(self.file_button)
+        buttons.addStretch()
+        buttons.addWidget(self.record_button)
+        buttons.addWidget(self.close_button)
+        layout.addLayout(buttons)
+
+        self.statusLabel = QLabel()
+        self.statusLabel.setWordWrap(True)
+        layout.addWidget(self.statusLabel)
+
+    def _connect_events(self):
+        """Подключение событий"""
+        self.file_button.clicked.connect(self._load_file)
+        self.record_button.clicked.connect(self._record)
+        self.close_button.clicked.connect(self.reject)
+
+    def done(self, result):
+        """Закрытие соединения вместе с окном"""
+        self.conn.close()
+        super().done(result)
+
+    def _load_file(self):
+        path, _ = QFileDialog.getOpenFileName(self, "Список участников", "",
+                                              "Списки (*.txt *.csv);;Все файлы (*)")
+        if not path:
+            return
+        try:
+            names = EventRoster.read_file(path)
+        except (OSError, UnicodeDecodeError) as e:
+            print(f"Ошибка чтения списка участников: {e}")
+            self.statusLabel.setText(f"Ошибка чтения файла: {e}")
+            return
+        self.rosterEdit.setPlainText("\n".join(names))
+
+    def _record(self):
+        names = EventRoster.parse(self.rosterEdit.toPlainText())
+        player_ids, unknown = self.recorder.resolve(names)
+        if self.selectedCheckBox.isChecked():
+            player_ids += self.selected_ids
+        if not player_ids:
+            self.statusLabel.setText("Нет ни одного найденного участника")
+            return
+
+        try:
+            result = self.recorder.record(self.dateEdit.date().toString("yyyy-MM-dd"), player_ids,
+                                          mark_absent=self.absentCheckBox.isChecked())
+        except sqlite3.Error as e:
+            print(f"Ошибка записи события: {e}")
+            self.statusLabel.setText(f"Ошибка записи события: {e}")
+            return
+
+        message = (f"Присутствовали: {result.present}, отсутствовали: {result.absent}, "
+                   f"изменено строк: {result.written} ({result.elapsed_ms:.0f} мс)")
+        if unknown:
+            message += f"\nНе найдены или неоднозначны: {', '.join(unknown)}"
+        self.statusLabel.setText(message)
@@ -0,0 +1,115 @@
+from PyQt6.QtWidgets import (QDialog, QVBoxLayout, QHBoxLayout, QLineEdit, QComboBox, QPushButton,
+                             QTableWidget, QTableWidgetItem, QSpinBox, QLabel, QInputDialog)
+
+from utils.guilds import CrossGuildQuery
+from utils.ui_helpers import MessageHelper
+
+
+class CrossGuildWindow(QDialog):
+    """Окно поиска и рейтинга игроков по всем гильдиям"""
+
+    RATING_COLUMNS = {
+        "Урон за неделю": "weekly_damage",
+        "Взносы": "resources_contributed",
+        "Уровень": "level",
+        "Участие в рейдах": "raid_participation"
+    }
+
+    def __init__(self, registry, parent=None):
+        super().__init__(parent)
+        self.setWindowTitle("Все гильдии")
+        self.resize(760, 480)
+
+        self.registry = registry
+        self.cross_query = CrossGuildQuery(registry)
+
+        self._setup_ui()
+        self._connect_events()
+
+    def _setup_ui(self):
+        """Построение интерфейса"""
+        layout = QVBoxLayout(self)
+
+        controls = QHBoxLayout()
+        self.searchEdit = QLineEdit()
+        self.searchEdit.setPlaceholderText("Никнейм или тег во всех гильдиях...")
+        self.search_button = QPushButton("Найти")
+        self.ratingComboBox = QComboBox()
+        self.ratingComboBox.addItems(self.RATING_COLUMNS.keys())
+        self.limitSpinBox = QSpinBox()
+        self.limitSpinBox.setRange(1, 10000)
+        self.limitSpinBox.setValue(50)
+        self.top_button = QPushButton("Топ")
+
+        controls.addWidget(self.searchEdit)
+        controls.addWidget(self.search_button)
+        controls.addWidget(QLabel("Рейтинг:"))
+        controls.addWidget(self.ratingComboBox)
+        controls.addWidget(self.limitSpinBox)
+        controls.addWidget(self.top_button)
+        layout.addLayout(controls)
+
+        self.tableWidget = QTableWidget(0, len(CrossGuildQuery.HEADERS))
+        self.tableWidget.setHorizontalHeaderLabels(CrossGuildQuery.HEADERS)
+        self.tableWidget.setEditTriggers(QTableWidget.EditTrigger.NoEditTriggers)
+        self.tableWidget.setColumnHidden(1, True)
+        layout.addWidget(self.tableWidget)
+
+        self.statusLabel = QLabel(f"Гильдий: {len(self.registry.guilds)}")
+        layout.addWidget(self.statusLabel)
+
+    def _connect_events(self):
+        """Подключение событий"""
+        self.search_button.clicked.connect(self._search)
+        self.searchEdit.returnPressed.connect(self._search)
+        self.top_button.clicked.connect(self._show_top)
+
+    def _search(self):
+        """Поиск игроков во всех гильдиях"""
+        text = self.searchEdit.text().strip()
+        if not text:
+            return
+        try:
+            rows = self.cross_query.search_players(text, self.limitSpinBox.value())
+            self._fill_table(rows, "Уровень")
+        except Exception as e:
+            MessageHelper.show_error(self, "Ошибка", f"Не удалось выполнить поиск: {e}")
+
+    def _show_top(self):
+        """Рейтинг игроков всех гильдий по выбранной колонке"""
+        title = self.ratingComboBox.currentText()
+        try:
+            rows = self.cross_query.top_players(self.RATING_COLUMNS[title], self.limitSpinBox.value())
+            self._fill_table(rows, title)
+        except Exception as e:
+            MessageHelper.show_error(self, "Ошибка", f"Не удалось построить рейтинг: {e}")
+
+    def _fill_table(self, rows, value_header):
+        """Заполнение таблицы результатами"""
+        self.tableWidget.setRowCount(len(rows))
+        self.tableWidget.setHorizontalHeaderItem(7, QTableWidgetItem(value_header))
+        for row_index, row in enumerate(rows):
+            for column, value in enumerate(row):
+                self.tableWidget.setItem(row_index, column, QTableWidgetItem("" if value is None else str(value)))
+        self.tableWidget.resizeColumnsToContents()
+        self.statusLabel.setText(f"Гильдий: {len(self.registry.guilds)}. Найдено: {len(rows)}")
+
+
+class GuildMenuHelper:
+    """Помощник для регистрации новых гильдий"""
+
+    @staticmethod
+    def ask_new_guild(parent, registry):
+        """Запрос названия новой гильдии и её регистрация
+
+        Returns:
+            str или None: Название добавленной гильдии
+        """
+        name, ok = QInputDialog.getText(parent, "Новая гильдия", "Название гильдии:")
+        if not ok or not name.strip():
+            return None
+        if name.strip() in registry.guilds:
+            MessageHelper.show_error(parent, "Ошибка", "Гильдия с таким названием уже существует")
+            return None
+        registry.add_guild(name)
+        return name.strip()
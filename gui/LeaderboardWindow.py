@@ -0,0 +1,101 @@
+import sqlite3
+
+from PyQt6.QtWidgets import (QDialog, QVBoxLayout, QHBoxLayout, QTableWidget, QTableWidgetItem,
+                             QPushButton, QComboBox, QSpinBox, QLabel)
+
+from config.cfg import ConnectionProfile
+from utils.database import DatabaseManager
+from utils.leaderboard import Leaderboard
+
+
+class LeaderboardWindow(QDialog):
+    """Рейтинг игроков по составному баллу (см. Leaderboard)"""
+
+    def __init__(self, parent=None):
+        super().__init__(parent)
+        self.setWindowTitle("Рейтинг игроков")
+        self.resize(760, 560)
+
+        self.leaderboard = Leaderboard()
+        self.conn = ConnectionProfile.active().connect(DatabaseManager.active_db_path)
+        self._status = ""  # итог последнего обновления кэша для строки состояния
+
+        self._setup_ui()
+        self._connect_events()
+        self._update_cache()
+
+    def _setup_ui(self):
+        """Построение интерфейса"""
+        layout = QVBoxLayout(self)
+
+        controls = QHBoxLayout()
+        self.classComboBox = QComboBox()
+        self.classComboBox.addItem("Все классы", None)
+        for class_id, name in self.conn.execute("SELECT id, name FROM Classes ORDER BY name"):
+            self.classComboBox.addItem(name, class_id)
+        self.limitSpinBox = QSpinBox()
+        self.limitSpinBox.setRange(1, 1000)
+        self.limitSpinBox.setValue(20)
+        self.limitSpinBox.setPrefix("Топ ")
+        self.recalculate_button = QPushButton("Пересчитать полностью")
+        controls.addWidget(self.classComboBox)
+        controls.addWidget(self.limitSpinBox)
+        controls.addStretch()
+        controls.addWidget(self.recalculate_button)
+        layout.addLayout(controls)
+
+        weights = ", ".join(f"{Leaderboard.METRICS[metric][1]} — {weight:g}"
+                            for metric, weight in self.leaderboard.weights.items())
+        layout.addWidget(QLabel(f"Веса (нормировка внутри класса): {weights}"))
+
+        self.tableWidget = QTableWidget(0, len(Leaderboard.HEADERS))
+        self.tableWidget.setHorizontalHeaderLabels(Leaderboard.HEADERS)
+        self.tableWidget.setEditTriggers(QTableWidget.EditTrigger.NoEditTriggers)
+        self.tableWidget.setSelectionBehavior(QTableWidget.SelectionBehavior.SelectRows)
+        layout.addWidget(self.tableWidget)
+
+        self.statusLabel = QLabel()
+        layout.addWidget(self.statusLabel)
+
+    def _connect_events(self):
+        """Подключение событий"""
+        self.classComboBox.currentIndexChanged.connect(self._show_top)
+        self.limitSpinBox.valueChanged.connect(self._show_top)
+        self.recalculate_button.clicked.connect(lambda: self._update_cache(full=True))
+
+    def done(self, result):
+        """Закрытие соединения вместе с окном"""
+        self.conn.close()
+        super().done(result)
+
+    def _update_cache(self, full=False):
+        """Обновление кэша рейтинга по журналу изменений и вывод топа"""
+        try:
+            stats = self.leaderboard.refresh(self.conn, full=full)
+        except sqlite3.Error as e:
+            print(f"Ошибка обновления рейтинга: {e}")
+            self.statusLabel.setText(f"Ошибка обновления рейтинга: {e}")
+            return
+
+        if stats.full:
+            message = f"Полный пересчет: {stats.rescored} игроков"
+        elif stats.players:
+            message = f"Изменились {stats.players} игроков, пересчитано классов: {stats.classes}"
+        else:
+            message = "Изменений нет"
+        if stats.week_closed:
+            message += f", зафиксированы места недели {stats.week_closed}"
+        self._status = f"{message} ({stats.elapsed_ms:.0f} мс)"
+        self._show_top()
+
+    def _show_top(self):
+        rows = self.leaderboard.top(self.conn, self.limitSpinBox.value(), self.classComboBox.currentData())
+        self.tableWidget.setRowCount(len(rows))
+        for row, values in enumerate(rows):
+            values = list(values)
+            # Изменение места за неделю: рост со знаком плюс, новичок без прошлого места
+            values[1] = "нов." if values[1] is None else (f"+{values[1]}" if values[1] > 0 else str(values[1]))
+            for column, value in enumerate(values):
+                self.tableWidget.setItem(row, column, QTableWidgetItem("" if value is None else str(value)))
+        self.tableWidget.resizeColumnsToContents()
+        self.statusLabel.setText(self._status)
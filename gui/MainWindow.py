@@ -1,36 +1,130 @@
 from PyQt6 import uic
-from PyQt6.QtWidgets import QMainWindow, QMessageBox, QMainWindow, QDialog
+from PyQt6.QtWidgets import QMainWindow, QMessageBox, QMainWindow, QDialog, QApplication
 from PyQt6.QtCore import Qt, QTimer
-from PyQt6.QtSql import QSqlQuery
 
 from gui.ReferenceWindow import ReferenceWindow
 from gui.SearchWindow import AdvancedSearchWindow
 from gui.PlayerDetailDialog import PlayerDetailDialog
-
+from gui.GuildsWindow import CrossGuildWindow, GuildMenuHelper
+from gui.DiagnosticsWindow import DiagnosticsWindow
+from gui.BackupWindow import BackupWindow
+from gui.AnalyticsWindow import AnalyticsWindow
+from gui.LeaderboardWindow import LeaderboardWindow
+from gui.EventEntryWindow import EventEntryWindow
+from gui.DedupeWindow import DedupeWindow
+from gui.SavedSearchesWindow import SavedSearchesWindow
+
+from data.sqlite.create_database import create_db
+from data.sqlite.compact_schema import to_day_number
 from utils.database import DatabaseManager
+from utils.keyset_model import KeysetQueryModel, SortColumn
+from utils.guilds import GuildRegistry
+from utils.reference_data import ReferenceData
+from utils.player_cache import PlayerDetailsCache, PlayerPrefetcher
+from utils.stall_monitor import StallMonitor, tracked_operation
+from utils.column_sizer import ColumnSizer, ColumnWidthCache
+from utils.write_behind import WriteBehindTableModel
+from utils.roster_snapshot import RosterSnapshot, RosterReconciler
+from utils.backup import BackupManager
+from utils.replica_sync import ReplicaSyncManager
+from utils.analytics import AnalyticsReplica
+from utils.fuzzy_search import FuzzyIndex
+from utils.completion import PrefixCompleter
+from utils.attendance import attendance_below_condition, missed_last_condition
+from utils.change_notifier import ChangeNotifier
 from utils.ui_helpers import TableManager, MessageHelper, MultiFieldFilterProxyModel
 
 
 class MainWindow(QMainWindow):
+    # Выборка детального режима; WHERE, ORDER BY и LIMIT добавляет KeysetQueryModel
+    DETAILED_SELECT = f"""
+        SELECT 
+            p.id,
+            p.nickname,
+            p.tag,
+            c.name as class_name,
+            p.level,
+            p.joined_date,
+            p.guild_status,
+            COALESCE(a.weekly_damage, 0) as weekly_damage,
+            COALESCE(a.raid_participation, 0) as raid_participation,
+            COALESCE(gc.leadership_rank, '{ReferenceData.DEFAULT_RANK}') as leadership_rank,
+            COALESCE(gc.resources_contributed, 0) as resources_contributed,
+            p.nickname_key,
+            p.tag_key
+        FROM Players p
+        LEFT JOIN Classes c ON p.class_id = c.id
+        LEFT JOIN Activity a ON p.id = a.player_id
+        LEFT JOIN GuildContribution gc ON p.id = gc.player_id
+        """
+
+    DETAILED_HEADERS = [
+        "ID", "Никнейм", "Тег", "Класс", "Уровень", "Дата вступления",
+        "Статус", "Урон за неделю", "Участие в рейдах", "Роль", "Взносы"
+    ]
+
+    # Выражения сортировки детального режима по номеру колонки;
+    # ник и тег сортируются по индексированным ключам (регистр и ё не различаются)
+    DETAILED_SORT_COLUMNS = {
+        0: SortColumn("p.id"),
+        1: SortColumn("p.nickname_key", nullable=True, value_column=11),
+        2: SortColumn("p.tag_key", nullable=True, value_column=12),
+        3: SortColumn("c.name", nullable=True),
+        4: SortColumn("p.level", nullable=True),
+        5: SortColumn("p.joined_date", nullable=True),
+        6: SortColumn("p.guild_status", nullable=True),
+        7: SortColumn("COALESCE(a.weekly_damage, 0)"),
+        8: SortColumn("COALESCE(a.raid_participation, 0)"),
+        9: SortColumn(f"COALESCE(gc.leadership_rank, '{ReferenceData.DEFAULT_RANK}')"),
+        10: SortColumn("COALESCE(gc.resources_contributed, 0)")
+    }
+
+    # Служебные колонки, скрытые в таблице
+    DETAILED_HIDDEN_COLUMNS = (0, 11, 12)  # id, nickname_key, tag_key
+    SIMPLE_HIDDEN_FIELDS = ("id", "class_id", "nickname_key", "tag_key")
+
+    # Сколько соседних строк предзагружать и сколько игроков держать в кэше
+    PREFETCH_NEIGHBOURS = 2
+    PREFETCH_CACHE_SIZE = 64
+
     def __init__(self):
         super().__init__()
         uic.loadUi("gui/design/main.ui", self)
 
+        # Реестр гильдий: каждая гильдия — отдельный файл БД
+        self.guild_registry = GuildRegistry()
+        DatabaseManager.set_active_database(self.guild_registry.get_path())
+
         # Подключение к БД и создание модели
         self.db = DatabaseManager.connect()
+        self.compact_schema = DatabaseManager.table_exists(self.db, "Players_data")
+
+        # Параметры последнего расширенного поиска (его можно сохранить, см. SavedSearchesWindow)
+        self.last_search_params = None
+
         self.current_view_mode = "simple"  # "simple" или "detailed"
 
+        # Сортировка по заголовку выполняется в SQL (по умолчанию — по никнейму)
+        self.sort_column = 1
+        self.sort_order = Qt.SortOrder.AscendingOrder
+
+        # Снимок списка с прошлого запуска: строки показываются сразу, без JOIN
+        self._warm_snapshot = self._load_roster_snapshot()
+
         # Создание моделей для разных режимов
         self.simple_model = self._create_simple_model()
-        self.detailed_model = self._create_detailed_model()
+        self.detailed_model = self._create_detailed_model(snapshot=self._warm_snapshot)
 
         # Создание прокси-модели для фильтрации
-        self.filter_model = MultiFieldFilterProxyModel()
-        self.filter_model.setSourceModel(self.simple_model)
+        self.filter_model = MultiFieldFilterProxyModel(server_sort=True)
 
         # Настройка таблицы
         self.tableView.setModel(self.filter_model)
-        TableManager.setup_table_view(self.tableView, self.filter_model)
+        self.tableView.horizontalHeader().sortIndicatorChanged.connect(self._on_sort_changed)
+        self._set_source_model(self.detailed_model if self.current_view_mode == "detailed" else self.simple_model)
+        TableManager.setup_table_view(self.tableView, self.filter_model, sort=(self.sort_column, self.sort_order),
+                                      width_key=self._width_key())
+        self._apply_column_visibility()
 
         # Настройка поиска в реальном времени
         self._setup_realtime_search()
@@ -40,12 +134,42 @@ class MainWindow(QMainWindow):
         self._connect_menu()
         self.tableView.doubleClicked.connect(self._edit_row)
 
+        # Отложенные правки ячеек записываются, когда фокус уходит из таблицы
+        QApplication.instance().focusChanged.connect(self._on_focus_changed)
+
+        # Изменение справочника классов отражается в детальном режиме
+        ReferenceData.instance().changed.connect(self._on_reference_data_changed)
+
+        # Предзагрузка данных игроков вокруг выделенной строки
+        self._setup_prefetch()
+
+        # Детектор зависаний цикла событий (отчеты в logs/stalls.log)
+        StallMonitor.instance().start()
+
+        # Изменения из других экземпляров приложения перечитываются построчно
+        self.change_notifier = ChangeNotifier(self.db, self)
+        self.change_notifier.players_changed.connect(self._on_external_changes)
+        self.change_notifier.reload_required.connect(self._refresh)
+        self.change_notifier.start()
+
+        # Резервное копирование (по расписанию — все гильдии) и синхронизация реплики
+        self._setup_backup()
+        self._setup_replica_sync()
+
+        # Сверка снимка с БД в фоне; в таблицу попадают только отличия
+        self.roster_reconciler = RosterReconciler(self)
+        self.roster_reconciler.reconciled.connect(self._on_roster_reconciled)
+        self.roster_reconciler.failed.connect(self._on_roster_reconcile_failed)
+        self._start_roster_reconcile()
+
         # Обновление статус-бара
         self._update_status_bar()
 
     def _create_simple_model(self):
         """Создание простой модели (менее информативной)"""
-        model = DatabaseManager.create_table_model(self.db, "Players")
+        model = DatabaseManager.create_table_model(self.db, "Players", sort=self._simple_sort(),
+                                                   model_class=WriteBehindTableModel)
+        self._connect_write_behind(model)
 
         # Настройка заголовков для простого режима
         headers = {
@@ -62,41 +186,185 @@ class MainWindow(QMainWindow):
 
         return model
 
-    def _create_detailed_model(self):
-        """Создание детальной модели с JOIN"""
-        query = """
-        SELECT 
-            p.id,
-            p.nickname,
-            p.tag,
-            c.name as class_name,
-            p.level,
-            p.joined_date,
-            p.guild_status,
-            COALESCE(a.weekly_damage, 0) as weekly_damage,
-            COALESCE(a.raid_participation, 0) as raid_participation,
-            COALESCE(gc.leadership_rank, 'Участник') as leadership_rank,
-            COALESCE(gc.resources_contributed, 0) as resources_contributed
-        FROM Players p
-        LEFT JOIN Classes c ON p.class_id = c.id
-        LEFT JOIN Activity a ON p.id = a.player_id
-        LEFT JOIN GuildContribution gc ON p.id = gc.player_id
-        ORDER BY p.nickname
-        """
+    def _create_detailed_model(self, where="", snapshot=None):
+        """Создание детальной модели с JOIN (сортировка и подгрузка страниц в SQL)
 
-        model = DatabaseManager.create_query_model(self.db, query)
+        Args:
+            snapshot: Снимок прошлого запуска; его строки показываются без запроса
+        """
+        # Метка версии снимается до чтения, чтобы снимок не оказался новее своих строк
+        tag = snapshot.tag if snapshot is not None else RosterSnapshot.change_tag(DatabaseManager.active_db_path)
+        model = KeysetQueryModel(
+            self.db, self.DETAILED_SELECT, "p.id", self.DETAILED_SORT_COLUMNS,
+            where=where, sort_column=self.sort_column, sort_order=self.sort_order,
+            initial_rows=snapshot.rows if snapshot is not None else None,
+            column_names=snapshot.column_names if snapshot is not None else None
+        )
+        model.data_tag = tag
+        model.modelReset.connect(
+            lambda: setattr(model, "data_tag", RosterSnapshot.change_tag(DatabaseManager.active_db_path)))
 
         # Настройка заголовков для детального режима
-        headers = [
-            "ID", "Никнейм", "Тег", "Класс", "Уровень", "Дата вступления",
-            "Статус", "Урон за неделю", "Участие в рейдах", "Роль", "Взносы"
-        ]
-
-        for i, header in enumerate(headers):
+        for i, header in enumerate(self.DETAILED_HEADERS):
             model.setHeaderData(i, Qt.Orientation.Horizontal, header)
 
         return model
 
+    def _load_roster_snapshot(self):
+        """Снимок детального списка активной гильдии (окно открывается в детальном режиме)"""
+        snapshot = RosterSnapshot.load(RosterSnapshot.path_for(DatabaseManager.active_db_path))
+        if snapshot is None:
+            return None
+
+        # Снимок другой выборки (после обновления приложения) не подходит
+        if snapshot.mode != "detailed" or snapshot.query_hash != RosterSnapshot.query_hash_of(self.DETAILED_SELECT) \
+                or snapshot.sort_column not in self.DETAILED_SORT_COLUMNS:
+            snapshot.close()
+            return None
+
+        self.current_view_mode = "detailed"
+        self.sort_column = snapshot.sort_column
+        self.sort_order = Qt.SortOrder(snapshot.sort_order)
+        return snapshot
+
+    def _start_roster_reconcile(self):
+        """Запуск фоновой сверки снимка, если БД изменилась после его записи"""
+        snapshot = self._warm_snapshot
+        if snapshot is None:
+            return
+
+        db_path = DatabaseManager.active_db_path
+        if snapshot.tag is not None and snapshot.tag == RosterSnapshot.change_tag(db_path):
+            # БД не менялась: снимок точен, остается только отпустить файл
+            QTimer.singleShot(0, self._finish_warm_start)
+            return
+
+        model = self.detailed_model
+        query_text, params = model.head_query(model.rowCount())
+        self.roster_reconciler.start(db_path, query_text, params, model.rows,
+                                     token=(model, model.generation, model.rowCount()))
+
+    def _on_roster_reconciled(self, changes, tag, token):
+        """Применение отличий снимка от БД к детальной модели"""
+        model, generation, row_count = token
+        if model is self.detailed_model and model.generation == generation:
+            if model.rowCount() == row_count:
+                model.apply_changes(changes)
+                model.data_tag = tag
+                if changes:
+                    self._update_status_bar(f"Список сверен с БД, изменений: {len(changes)}")
+            else:
+                # Пока шла сверка, подгрузились следующие страницы: проще перечитать
+                model.refresh()
+        self._finish_warm_start()
+
+    def _on_roster_reconcile_failed(self, message, token):
+        model = token[0]
+        if model is self.detailed_model and model.generation == token[1]:
+            model.refresh()
+        self._finish_warm_start()
+
+    def _finish_warm_start(self):
+        """Копирование строк снимка в модель и закрытие файла снимка"""
+        if self._warm_snapshot is None:
+            return
+        self.detailed_model.detach_rows()
+        self._warm_snapshot.close()
+        self._warm_snapshot = None
+
+    def _save_roster_snapshot(self):
+        """Сохранение детального списка для быстрого старта (простой режим и фильтры — без снимка)"""
+        path = RosterSnapshot.path_for(DatabaseManager.active_db_path)
+        model = self.detailed_model
+        if self.current_view_mode != "detailed" or model.where or model.rowCount() == 0:
+            RosterSnapshot.remove(path)
+            return
+
+        self._finish_warm_start()
+        RosterSnapshot.save(path, model.data_tag, "detailed", (model.sort_column, model.sort_order.value),
+                            model.column_names, model.rows, self.DETAILED_SELECT)
+
+    def _connect_write_behind(self, model):
+        """Сообщения о записи отложенных правок в статус-баре"""
+        model.flushed.connect(lambda rows: self._update_status_bar(f"Сохранено строк: {rows}"))
+        model.flush_failed.connect(lambda text: self._update_status_bar(f"Ошибка сохранения: {text}"))
+
+    def _flush_pending_edits(self):
+        """Запись отложенных правок простого режима
+
+        Returns:
+            bool: False, если записать не удалось (правки остаются в модели)
+        """
+        if hasattr(self, 'simple_model'):
+            return self.simple_model.flush()
+        return True
+
+    def _ensure_edits_saved(self, action):
+        """Запись отложенных правок перед действием, которое заменяет или перечитывает таблицу
+
+        Если записать не удалось, действие не выполняется: правки остаются
+        в модели (строки отмечены «!»), а пользователь получает сообщение.
+        """
+        if self._flush_pending_edits():
+            return True
+        MessageHelper.show_error(self, "Правки не сохранены",
+                                 f"Не удалось записать изменения в таблице — действие «{action}» отменено. "
+                                 f"Исправьте отмеченные строки и повторите.")
+        return False
+
+    def _on_focus_changed(self, old, new):
+        """Запись правок при переходе фокуса за пределы таблицы (редактор ячейки — внутри)"""
+        if new is None or (new is not self.tableView and not self.tableView.isAncestorOf(new)):
+            self._flush_pending_edits()
+
+    def _width_key(self):
+        """Ключ кэша ширин колонок для текущего режима"""
+        return f"main/{self.current_view_mode}"
+
+    def _on_sort_changed(self, column, order):
+        """Запоминание сортировки, чтобы пересоздаваемые модели ее сохраняли"""
+        self.sort_column = column
+        self.sort_order = order
+
+    def _apply_sort(self, model):
+        """Приведение сортировки модели к текущему индикатору заголовка"""
+        if isinstance(model, KeysetQueryModel):
+            model.sort(self.sort_column, self.sort_order)
+        else:
+            model.sort(*self._simple_sort())
+
+    def _simple_sort_key_columns(self):
+        """Колонки ключей сортировки ника и тега в таблице Players"""
+        record = self.db.record("Players")
+        keys = {1: record.indexOf("nickname_key"), 2: record.indexOf("tag_key")}
+        return {column: key for column, key in keys.items() if key >= 0}
+
+    def _simple_sort(self):
+        """Сортировка простой модели: ник и тег — по их ключам"""
+        return self._simple_sort_key_columns().get(self.sort_column, self.sort_column), self.sort_order
+
+    def _set_source_model(self, model):
+        """Смена исходной модели таблицы с учетом ключей сортировки и скрытых колонок"""
+        self.filter_model.setSourceModel(model)
+        is_detailed = isinstance(model, KeysetQueryModel)
+        self.filter_model.sort_key_columns = {} if is_detailed else self._simple_sort_key_columns()
+        self._apply_column_visibility()
+
+    def _apply_column_visibility(self):
+        """Скрытие служебных колонок текущей модели"""
+        model = self.filter_model.sourceModel()
+        if model is None:
+            return
+
+        if isinstance(model, KeysetQueryModel):
+            hidden = set(self.DETAILED_HIDDEN_COLUMNS)
+        else:
+            record = model.record()
+            hidden = {record.indexOf(name) for name in self.SIMPLE_HIDDEN_FIELDS}
+
+        for column in range(model.columnCount()):
+            self.tableView.setColumnHidden(column, column in hidden)
+
     def _setup_realtime_search(self):
         """Настройка поиска в реальном времени"""
         # Создаем таймер для задержки поиска
@@ -107,16 +375,86 @@ class MainWindow(QMainWindow):
         # Подключаем изменение текста к таймеру
         self.lineEdit.textChanged.connect(self._on_search_text_changed)
 
+        # Подсказки ников и тегов по индексу ключей сортировки
+        self.search_completer = PrefixCompleter(self.lineEdit, self.db, fields=("nickname", "tag"))
+
+        # Нечеткий поиск: индекс строится в фоне при первом включении
+        self._fuzzy_applied = False
+        if hasattr(self, 'fuzzyCheckBox'):
+            self.fuzzyCheckBox.toggled.connect(self._on_fuzzy_toggled)
+
     def _on_search_text_changed(self):
         """Обработчик изменения текста поиска"""
         # Перезапускаем таймер при каждом изменении текста
         self.search_timer.stop()
         self.search_timer.start(300)  # Задержка 300ms
 
+    def _fuzzy_enabled(self):
+        return hasattr(self, 'fuzzyCheckBox') and self.fuzzyCheckBox.isChecked()
+
+    def _on_fuzzy_toggled(self, checked):
+        if checked:
+            FuzzyIndex.instance().build(DatabaseManager.active_db_path)
+        self._perform_search()
+
+    def _perform_fuzzy_search(self, search_text):
+        """Поиск по нику и тегу с опечатками (см. FuzzyIndex)
+
+        Найденные id подставляются в запрос модели, а порядок строк —
+        по расстоянию до запроса — задает прокси.
+
+        Returns:
+            bool: False, если индекс еще строится (True и при отказе из-за
+                несохраненных правок: таблица остается прежней)
+        """
+        matches = FuzzyIndex.instance().search(search_text)
+        if matches is None:
+            return False
+
+        id_column = "id" if self.current_view_mode == "simple" else "p.id"
+        ids = ", ".join(str(match.player_id) for match in matches) or "NULL"
+        self.filter_model.clear_filters()
+        if self.current_view_mode == "simple":
+            if not self._apply_simple_search_filter(f"{id_column} IN ({ids})"):
+                return True
+        else:
+            self._apply_detailed_search_filter(f"{id_column} IN ({ids})")
+        self.filter_model.set_ranking({match.player_id: rank for rank, match in enumerate(matches)})
+        self._fuzzy_applied = True
+        self._update_status_bar("Поиск с опечатками")
+        return True
+
+    def _reset_fuzzy_search(self):
+        """Возврат полной модели после нечеткого поиска
+
+        Returns:
+            bool: False, если модель оставлена из-за несохраненных правок
+        """
+        if self.current_view_mode == "simple" and not self._ensure_edits_saved("сброс поиска"):
+            return False
+        self._fuzzy_applied = False
+        self.filter_model.set_ranking({})
+        if self.current_view_mode == "simple":
+            self.simple_model = self._create_simple_model()
+            self._set_source_model(self.simple_model)
+        else:
+            self.detailed_model = self._create_detailed_model()
+            self._set_source_model(self.detailed_model)
+        return True
+
+    @tracked_operation("_perform_search")
     def _perform_search(self):
         """Выполнение поиска"""
         search_text = self.lineEdit.text().strip()
 
+        message = ""
+        if search_text and self._fuzzy_enabled():
+            if self._perform_fuzzy_search(search_text):
+                return
+            message = "Индекс поиска с опечатками строится, показаны точные совпадения"
+        if self._fuzzy_applied and not self._reset_fuzzy_search():
+            return
+
         if not search_text:
             # Если поиск пустой, убираем все фильтры
             self.filter_model.clear_filters()
@@ -141,7 +479,7 @@ class MainWindow(QMainWindow):
 
             self.filter_model.set_filters(search_filters)
 
-        self._update_status_bar()
+        self._update_status_bar(message)
 
     def _connect_buttons(self):
         try:
@@ -176,41 +514,257 @@ class MainWindow(QMainWindow):
             self.actionEvents: "EventParticipation"
         }
         for action, table in menu_actions.items():
-            action.triggered.connect(lambda checked, t=table: ReferenceWindow(t, self).exec())
+            action.triggered.connect(lambda checked, t=table: self._open_reference(t))
+
+        # Массовая запись посещения события
+        if hasattr(self, 'actionRecordEvent'):
+            self.actionRecordEvent.triggered.connect(self._open_event_entry)
+
+        # Диагностика запросов
+        if hasattr(self, 'actionDiagnostics'):
+            self.actionDiagnostics.triggered.connect(lambda: DiagnosticsWindow(self).exec())
+
+        # Отчеты по снимку БД в памяти
+        if hasattr(self, 'actionAnalytics'):
+            self.actionAnalytics.triggered.connect(lambda: AnalyticsWindow(self).exec())
+        if hasattr(self, 'actionLeaderboard'):
+            self.actionLeaderboard.triggered.connect(lambda: LeaderboardWindow(self).exec())
+        if hasattr(self, 'actionDedupe'):
+            self.actionDedupe.triggered.connect(self._open_dedupe)
+        if hasattr(self, 'actionSavedSearches'):
+            self.actionSavedSearches.triggered.connect(self._open_saved_searches)
+
+        # Резервные копии
+        if hasattr(self, 'actionBackupNow'):
+            self.actionBackupNow.triggered.connect(
+                lambda: BackupManager.instance().backup_now(DatabaseManager.active_db_path))
+        if hasattr(self, 'actionBackups'):
+            self.actionBackups.triggered.connect(
+                lambda: BackupWindow(list(self.guild_registry.guilds.values()), self).exec())
+        if hasattr(self, 'actionSyncReplica'):
+            self.actionSyncReplica.triggered.connect(
+                lambda: ReplicaSyncManager.instance().sync_now(DatabaseManager.active_db_path))
+
+        # Меню гильдий
+        if hasattr(self, 'actionAddGuild'):
+            self.actionAddGuild.triggered.connect(self._add_guild)
+        if hasattr(self, 'actionCrossGuild'):
+            self.actionCrossGuild.triggered.connect(lambda: CrossGuildWindow(self.guild_registry, self).exec())
+        self._populate_guild_menu()
+
+    @tracked_operation("dialog:ReferenceWindow")
+    def _open_reference(self, table_name):
+        """Открытие окна справочника"""
+        ReferenceWindow(table_name, self).exec()
+
+    def _populate_guild_menu(self):
+        """Заполнение меню выбора активной гильдии"""
+        if not hasattr(self, 'menu_guild_switch'):
+            return
+
+        self.menu_guild_switch.clear()
+        for name in self.guild_registry.names():
+            action = self.menu_guild_switch.addAction(name)
+            action.setCheckable(True)
+            action.setChecked(name == self.guild_registry.active)
+            action.triggered.connect(lambda checked, n=name: self._switch_guild(n))
+
+    def _add_guild(self):
+        """Регистрация новой гильдии с отдельным файлом БД"""
+        try:
+            name = GuildMenuHelper.ask_new_guild(self, self.guild_registry)
+            if name:
+                create_db(self.guild_registry.get_path(name), fill=False)
+                self._switch_guild(name)
+        except Exception as e:
+            MessageHelper.show_error(self, "Ошибка", f"Не удалось добавить гильдию: {e}")
+            print(f"Ошибка в _add_guild: {e}")
+
+    def _on_external_changes(self, player_ids):
+        """Перечитывание только тех игроков, которых изменил другой экземпляр приложения"""
+        for player_id in player_ids:
+            self.details_cache.invalidate(player_id)
+
+        self.detailed_model.refresh_rows(player_ids)
+        not_shown = self._refresh_simple_rows(player_ids)
+
+        message = f"Изменения из другого окна: игроков {len(player_ids)}"
+        if not_shown and self.current_view_mode == "simple":
+            message += f", новые и удаленные ({len(not_shown)}) будут видны после обновления"
+        self._update_status_bar(message)
+
+    def _refresh_simple_rows(self, player_ids):
+        """Перечитывание строк простого режима по id
+
+        Returns:
+            set: id, которые не удалось обновить на месте (новые, удаленные или еще не загруженные)
+        """
+        model = self.simple_model
+        id_column = model.record().indexOf("id")
+        refreshed = set()
+        for row in range(model.rowCount()):
+            player_id = model.data(model.index(row, id_column))
+            if player_id in player_ids and model.selectRow(row):
+                refreshed.add(player_id)
+        return set(player_ids) - refreshed
+
+    def _setup_backup(self):
+        """Расписание резервного копирования и сообщения о его результатах"""
+        backup = BackupManager.instance()
+        backup.sources = lambda: list(self.guild_registry.guilds.values())
+        backup.finished.connect(lambda result: self._update_status_bar(
+            f"Резервная копия {result.path.name}: {result.size_bytes / (1024 * 1024):.1f} МБ, "
+            f"{result.throughput_mb_s:.1f} МБ/с, макс. пауза {result.max_pause_ms:.0f} мс"))
+        backup.failed.connect(lambda result: self._update_status_bar(
+            f"Ошибка резервного копирования: {result.error}"))
+        backup.apply_schedule()
+
+    def _setup_replica_sync(self):
+        """Сообщения о результатах синхронизации реплики"""
+        replica = ReplicaSyncManager.instance()
+        replica.finished.connect(lambda result: self._update_status_bar(
+            f"Реплика {result.replica}: {'полная копия, ' if result.full_copy else ''}"
+            f"журнал до {result.to_seq}, записано строк {result.upserted}, удалено {result.deleted}, "
+            f"{result.elapsed_ms:.0f} мс"))
+        replica.failed.connect(lambda result: self._update_status_bar(
+            f"Ошибка синхронизации реплики: "
+            f"{result.error or result.verification.summary()}"))
+
+    def _setup_prefetch(self):
+        """Настройка фоновой предзагрузки данных игроков при смене выделения"""
+        self.details_cache = PlayerDetailsCache(max_size=self.PREFETCH_CACHE_SIZE)
+        self.prefetcher = PlayerPrefetcher(self.details_cache)
+        self._detail_dialog = None
+
+        # Небольшая задержка, чтобы не ставить в очередь каждую строку при быстрой прокрутке
+        self.prefetch_timer = QTimer()
+        self.prefetch_timer.setSingleShot(True)
+        self.prefetch_timer.timeout.connect(self._prefetch_around_selection)
+
+        self.tableView.selectionModel().currentRowChanged.connect(lambda *args: self.prefetch_timer.start(100))
+
+    def _prefetch_around_selection(self):
+        """Предзагрузка выделенной строки и её соседей"""
+        current = self.tableView.currentIndex()
+        if not current.isValid():
+            return
+
+        first = max(0, current.row() - self.PREFETCH_NEIGHBOURS)
+        last = min(self.filter_model.rowCount() - 1, current.row() + self.PREFETCH_NEIGHBOURS)
+
+        # Сначала выделенная строка, затем соседи по удаленности
+        rows = sorted(range(first, last + 1), key=lambda row: abs(row - current.row()))
+        player_ids = [self._player_id_at(row) for row in rows]
+        self.prefetcher.prefetch(player_ids, DatabaseManager.active_db_path)
+
+    def _player_id_at(self, proxy_row):
+        """ID игрока в строке прокси-модели"""
+        source_index = self.filter_model.mapToSource(self.filter_model.index(proxy_row, 0))
+        model = self.filter_model.sourceModel()
+        return model.data(model.index(source_index.row(), 0))
+
+    def _get_detail_dialog(self, player_id):
+        """Переиспользуемый диалог детального просмотра"""
+        details = self.details_cache.get(player_id)
+        if self._detail_dialog is None:
+            self._detail_dialog = PlayerDetailDialog(player_id, self, details=details)
+        else:
+            self._detail_dialog.load_player(player_id, details)
+        return self._detail_dialog
+
+    def closeEvent(self, event):
+        """Запись отложенных правок, остановка фоновых потоков, сохранение ширин колонок и снимка списка"""
+        if not self._flush_pending_edits():
+            reply = MessageHelper.show_question(self, "Правки не сохранены",
+                                                "Не удалось записать изменения в таблице. Закрыть без сохранения?")
+            if reply != QMessageBox.StandardButton.Yes:
+                event.ignore()
+                return
+        ColumnSizer.remember(self.tableView, self._width_key())
+        ColumnWidthCache.instance().save()
+        self.roster_reconciler.shutdown()
+        self.change_notifier.stop()
+        BackupManager.instance().shutdown()
+        ReplicaSyncManager.instance().shutdown()
+        AnalyticsReplica.instance().shutdown()
+        FuzzyIndex.instance().shutdown()
+        self._save_roster_snapshot()
+        self.prefetcher.shutdown()
+        StallMonitor.instance().stop()
+        super().closeEvent(event)
+
+    def _on_reference_data_changed(self):
+        """Обновление детального режима после изменения справочников"""
+        # Комбобоксы переиспользуемого диалога заполнены старыми справочниками
+        self._detail_dialog = None
+        if self.current_view_mode == "detailed":
+            self._refresh()
+
+    @tracked_operation("_switch_guild")
+    def _switch_guild(self, name):
+        """Переключение на другую гильдию (переподключение к её файлу БД)"""
+        try:
+            # Отложенные правки относятся к текущей гильдии: без их записи гильдия не меняется
+            if not self._ensure_edits_saved("переключение гильдии"):
+                self._populate_guild_menu()
+                return
+            self._save_roster_snapshot()
+            self.guild_registry.set_active(name)
+            DatabaseManager.set_active_database(self.guild_registry.get_path())
+            self.db = DatabaseManager.connect()
+            self.compact_schema = DatabaseManager.table_exists(self.db, "Players_data")
+            self.change_notifier.set_database(self.db)
+            self.search_completer.db = self.db
+            ReferenceData.instance().invalidate()
+            if self._fuzzy_enabled():
+                FuzzyIndex.instance().build(DatabaseManager.active_db_path)
+
+            self.simple_model = self._create_simple_model()
+            self.detailed_model = self._create_detailed_model()
+            self._refresh()
 
+            self._populate_guild_menu()
+            self.setWindowTitle(f"Информация - {name}")
+            self._update_status_bar(f"Гильдия: {name}")
+        except Exception as e:
+            MessageHelper.show_error(self, "Ошибка", f"Не удалось переключить гильдию: {e}")
+            print(f"Ошибка в _switch_guild: {e}")
+
+    @tracked_operation("_switch_to_simple_view")
     def _switch_to_simple_view(self):
         """Переключение на простой вид"""
         if self.current_view_mode != "simple":
+            ColumnSizer.remember(self.tableView, self._width_key())
             self.current_view_mode = "simple"
-            self.filter_model.setSourceModel(self.simple_model)
+            self._apply_sort(self.simple_model)
 
-            # Скрываем лишние колонки в простом режиме
-            self.tableView.setColumnHidden(0, True)  # ID
-            self.tableView.setColumnHidden(3, True)  # class_id (скрываем, показываем только в детальном)
+            # Лишние колонки (ID, class_id, ключи сортировки) скрываются
+            self._set_source_model(self.simple_model)
 
-            self.tableView.resizeColumnsToContents()
+            ColumnSizer.fit_columns(self.tableView, self._width_key())
             self._update_status_bar("Переключено на простой вид")
 
             # Очищаем поиск и выполняем заново
             self._perform_search()
 
+    @tracked_operation("_switch_to_detailed_view")
     def _switch_to_detailed_view(self):
         """Переключение на детальный вид"""
         if self.current_view_mode != "detailed":
+            ColumnSizer.remember(self.tableView, self._width_key())
             self.current_view_mode = "detailed"
-            self.filter_model.setSourceModel(self.detailed_model)
+            self._apply_sort(self.detailed_model)
 
-            # В детальном режиме показываем все колонки кроме ID
-            self.tableView.setColumnHidden(0, True)  # ID
-            for i in range(1, self.detailed_model.columnCount()):
-                self.tableView.setColumnHidden(i, False)
+            # В детальном режиме показываем все колонки кроме ID и ключей сортировки
+            self._set_source_model(self.detailed_model)
 
-            self.tableView.resizeColumnsToContents()
+            ColumnSizer.fit_columns(self.tableView, self._width_key())
             self._update_status_bar("Переключено на детальный вид")
 
             # Очищаем поиск и выполняем заново
             self._perform_search()
 
+    @tracked_operation("dialog:PlayerDetailDialog(new)")
     def _add_row(self):
         """Добавление нового игрока через диалог"""
         try:
@@ -225,8 +779,11 @@ class MainWindow(QMainWindow):
             MessageHelper.show_error(self, "Ошибка", f"Не удалось добавить игрока: {e}")
             print(f"Ошибка в _add_row: {e}")
 
+    @tracked_operation("dialog:PlayerDetailDialog")
     def _edit_row(self):
         """Открытие детального просмотра игрока через двойной клик"""
+        if not self._ensure_edits_saved("открытие игрока"):
+            return
         index = self.tableView.currentIndex()
         if not index.isValid():
             MessageHelper.show_error(self, "Ошибка", "Не выбрана строка")
@@ -246,10 +803,11 @@ class MainWindow(QMainWindow):
                 MessageHelper.show_error(self, "Ошибка", "Не удалось получить ID игрока")
                 return
 
-            # Открываем диалог детального просмотра
-            dialog = PlayerDetailDialog(player_id, self)
+            # Открываем диалог детального просмотра (данные берутся из кэша предзагрузки)
+            dialog = self._get_detail_dialog(player_id)
             if dialog.exec() == QDialog.DialogCode.Accepted:
-                # Если данные были сохранены, обновляем таблицу
+                # Если данные были сохранены, сбрасываем кэш и обновляем таблицу
+                self.details_cache.invalidate(player_id)
                 self._refresh()
                 self._update_status_bar("Данные игрока обновлены")
 
@@ -257,29 +815,34 @@ class MainWindow(QMainWindow):
             MessageHelper.show_error(self, "Ошибка", f"Не удалось открыть детали игрока: {e}")
             print(f"Ошибка в _edit_row: {e}")
 
+    @tracked_operation("_refresh")
     def _refresh(self):
         """Обновление данных"""
         try:
+            # Перечитывание без записанных правок их бы потеряло; вызывается и
+            # по внешним изменениям, поэтому без диалога — только статус-бар
+            if not self._flush_pending_edits():
+                self._update_status_bar("Обновление отложено: есть несохраненные правки")
+                return
+
+            # Данные могли измениться вне главного окна
+            self.details_cache.invalidate()
+
             if self.current_view_mode == "simple":
                 # Для простого режима - пересоздаем модель
                 self.simple_model = self._create_simple_model()
-                self.filter_model.setSourceModel(self.simple_model)
+                self._set_source_model(self.simple_model)
             else:
                 # Для детального режима - пересоздаем модель
                 self.detailed_model = self._create_detailed_model()
-                self.filter_model.setSourceModel(self.detailed_model)
-
-                # Настройка видимости колонок для детального режима
-                self.tableView.setColumnHidden(0, True)  # ID
-                for i in range(1, self.detailed_model.columnCount()):
-                    self.tableView.setColumnHidden(i, False)
+                self._set_source_model(self.detailed_model)
 
             # Очищаем фильтры и поисковую строку
             self.filter_model.clear_filters()
             self.lineEdit.clear()
 
-            # Обновляем размеры колонок
-            self.tableView.resizeColumnsToContents()
+            # Обновляем размеры колонок (из кэша, без обхода всех строк)
+            ColumnSizer.fit_columns(self.tableView, self._width_key())
 
             self._update_status_bar("Обновлено")
 
@@ -305,11 +868,13 @@ class MainWindow(QMainWindow):
                 else:
                     self.statusbar.showMessage(f"Всего записей: {total_records}")
 
+    @tracked_operation("dialog:AdvancedSearchWindow")
     def _open_advanced_search(self):
         search_window = AdvancedSearchWindow(self.current_view_mode, self)
         search_window.search_requested.connect(self._apply_advanced_search)
         search_window.exec()
 
+    @tracked_operation("_apply_advanced_search")
     def _apply_advanced_search(self, search_params):
         """Применение параметров расширенного поиска"""
         try:
@@ -318,11 +883,13 @@ class MainWindow(QMainWindow):
 
             # Строим WHERE условие на основе параметров
             where_conditions = self._build_search_conditions(search_params)
+            self.last_search_params = search_params
 
             if where_conditions:
                 if search_params['mode'] == "simple":
                     # Для простого режима применяем фильтр к существующей модели
-                    self._apply_simple_search_filter(where_conditions)
+                    if not self._apply_simple_search_filter(where_conditions):
+                        return
                 else:
                     # Для детального режима модифицируем SQL запрос
                     self._apply_detailed_search_filter(where_conditions)
@@ -336,20 +903,43 @@ class MainWindow(QMainWindow):
         """Построение SQL условий на основе параметров поиска"""
         conditions = []
 
-        # Диапазон дат вступления
-        if params.get('date_range'):
-            start_date, end_date = params['date_range']
-            conditions.append(f"joined_date BETWEEN '{start_date}' AND '{end_date}'")
+        if self.compact_schema:
+            # Компактная схема: даты и статус сравниваются целыми кодами по индексам
+            compact_conditions = []
+            if params.get('date_range'):
+                start_date, end_date = params['date_range']
+                compact_conditions.append(
+                    f"joined_day BETWEEN {to_day_number(start_date)} AND {to_day_number(end_date)}")
+            if params.get('status'):
+                compact_conditions.append(
+                    f"status_id = (SELECT id FROM GuildStatuses WHERE name = '{params['status']}')")
+            if compact_conditions:
+                id_column = "id" if params['mode'] == "simple" else "p.id"
+                conditions.append(f"{id_column} IN (SELECT id FROM Players_data WHERE "
+                                  f"{' AND '.join(compact_conditions)})")
+        else:
+            # Диапазон дат вступления
+            if params.get('date_range'):
+                start_date, end_date = params['date_range']
+                conditions.append(f"joined_date BETWEEN '{start_date}' AND '{end_date}'")
+
+            # Статус
+            if params.get('status'):
+                conditions.append(f"guild_status = '{params['status']}'")
+
+        # Посещаемость событий: подзапросы по индексам таблицы событий
+        attendance_id = "id" if params['mode'] == "simple" else "p.id"
+        if params.get('attendance_below'):
+            percent, weeks = params['attendance_below']
+            conditions.append(attendance_below_condition(percent, weeks, attendance_id, self.compact_schema))
+        if params.get('missed_last'):
+            conditions.append(missed_last_condition(params['missed_last'], attendance_id, self.compact_schema))
 
         # Диапазон уровней
         if params.get('level_range'):
             min_level, max_level = params['level_range']
             conditions.append(f"level BETWEEN {min_level} AND {max_level}")
 
-        # Статус
-        if params.get('status'):
-            conditions.append(f"guild_status = '{params['status']}'")
-
         # Для детального режима добавляем дополнительные условия
         if params['mode'] == "detailed":
             # Диапазон взносов
@@ -373,14 +963,47 @@ class MainWindow(QMainWindow):
 
             # Роль
             if params.get('role'):
-                conditions.append(f"COALESCE(gc.leadership_rank, 'Участник') = '{params['role']}'")
+                conditions.append(f"COALESCE(gc.leadership_rank, '{ReferenceData.DEFAULT_RANK}') = '{params['role']}'")
 
         return " AND ".join(conditions)
 
+    def _compile_search(self, params):
+        """Запрос id игроков по параметрам расширенного поиска (для сохраненных поисков)"""
+        conditions = self._build_search_conditions(params)
+        where = f" WHERE {conditions}" if conditions else ""
+        if params['mode'] == "simple":
+            return f"SELECT id FROM Players{where}"
+        return f"SELECT id FROM ({self.DETAILED_SELECT}{where})"
+
+    def _apply_saved_search(self, search_id, message):
+        """Фильтр таблицы по кэшу результата сохраненного поиска"""
+        try:
+            self.filter_model.clear_filters()
+            id_column = "id" if self.current_view_mode == "simple" else "p.id"
+            where = f"{id_column} IN (SELECT player_id FROM SavedSearchResults WHERE search_id = {int(search_id)})"
+            if self.current_view_mode == "simple":
+                if not self._apply_simple_search_filter(where):
+                    return
+            else:
+                self._apply_detailed_search_filter(where)
+            self._update_status_bar(message)
+        except Exception as e:
+            MessageHelper.show_error(self, "Ошибка поиска", f"Не удалось применить сохраненный поиск: {e}")
+
     def _apply_simple_search_filter(self, where_conditions):
-        """Применение фильтра для простого режима"""
+        """Применение фильтра для простого режима
+
+        Returns:
+            bool: False, если фильтр не применен из-за несохраненных правок
+        """
+        if not self._ensure_edits_saved("поиск"):
+            return False
+
         # Создаем новую модель с фильтром
-        model = DatabaseManager.create_table_model(self.db, "Players", where_conditions)
+        model = DatabaseManager.create_table_model(self.db, "Players", where_conditions,
+                                                   sort=self._simple_sort(),
+                                                   model_class=WriteBehindTableModel)
+        self._connect_write_behind(model)
 
         # Настройка заголовков
         headers = {
@@ -397,61 +1020,31 @@ class MainWindow(QMainWindow):
         # Обновляем модель
         self.simple_model = model
         if self.current_view_mode == "simple":
-            self.filter_model.setSourceModel(self.simple_model)
+            self._set_source_model(self.simple_model)
+        return True
 
     def _apply_detailed_search_filter(self, where_conditions):
         """Применение фильтра для детального режима"""
         try:
-            # Модифицируем базовый запрос добавив WHERE условие
-            base_query = """
-            SELECT 
-                p.id,
-                p.nickname,
-                p.tag,
-                c.name as class_name,
-                p.level,
-                p.joined_date,
-                p.guild_status,
-                COALESCE(a.weekly_damage, 0) as weekly_damage,
-                COALESCE(a.raid_participation, 0) as raid_participation,
-                COALESCE(gc.leadership_rank, 'Участник') as leadership_rank,
-                COALESCE(gc.resources_contributed, 0) as resources_contributed
-            FROM Players p
-            LEFT JOIN Classes c ON p.class_id = c.id
-            LEFT JOIN Activity a ON p.id = a.player_id
-            LEFT JOIN GuildContribution gc ON p.id = gc.player_id
-            WHERE {where_conditions}
-            ORDER BY p.nickname
-            """.format(where_conditions=where_conditions)
-
-            # Создаем новую модель с модифицированным запросом
-            model = DatabaseManager.create_query_model(self.db, base_query)
+            # Создаем новую модель с WHERE условием
+            model = self._create_detailed_model(where_conditions)
 
             # Проверяем, что модель создалась успешно
             if not model or model.lastError().isValid():
                 error_text = model.lastError().text() if model else "Неизвестная ошибка"
                 raise Exception(f"Ошибка создания модели: {error_text}")
 
-            # Настройка заголовков
-            headers = [
-                "ID", "Никнейм", "Тег", "Класс", "Уровень", "Дата вступления",
-                "Статус", "Урон за неделю", "Участие в рейдах", "Роль", "Взносы"
-            ]
-
-            for i, header in enumerate(headers):
-                model.setHeaderData(i, Qt.Orientation.Horizontal, header)
-
             # Обновляем модель
             self.detailed_model = model
             if self.current_view_mode == "detailed":
-                self.filter_model.setSourceModel(self.detailed_model)
+                self._set_source_model(self.detailed_model)
 
         except Exception as e:
             print(f"Ошибка в _apply_detailed_search_filter: {e}")
             # В случае ошибки возвращаемся к исходной модели
             self.detailed_model = self._create_detailed_model()
             if self.current_view_mode == "detailed":
-                self.filter_model.setSourceModel(self.detailed_model)
+                self._set_source_model(self.detailed_model)
             raise e
 
     def _clear_advanced_search(self):
@@ -464,8 +1057,44 @@ class MainWindow(QMainWindow):
             MessageHelper.show_error(self, "Ошибка", f"Не удалось очистить поиск: {e}")
             print(f"Ошибка при очистке поиска: {e}")
 
+    def _selected_player_ids(self):
+        """id игроков в выделенных строках таблицы"""
+        model = self.simple_model if self.current_view_mode == "simple" else self.detailed_model
+        # Выделенными считаются строки, в которых выбрана хотя бы одна ячейка
+        rows = {self.filter_model.mapToSource(index).row()
+                for index in self.tableView.selectionModel().selectedIndexes()}
+        player_ids = [model.data(model.index(row, 0)) for row in sorted(rows)]
+        return [player_id for player_id in player_ids if player_id]
+
+    def _open_event_entry(self):
+        """Окно записи события с выделенными игроками"""
+        if not self._ensure_edits_saved("запись события"):
+            return
+        EventEntryWindow(self._selected_player_ids(), self).exec()
+        # Строки событий изменены другим соединением: кэш деталей игроков устарел
+        self.details_cache.invalidate()
+
+    def _open_saved_searches(self):
+        """Окно сохраненных поисков"""
+        if not self._ensure_edits_saved("поиск"):
+            return
+        window = SavedSearchesWindow(self._compile_search, self.last_search_params, self)
+        window.search_applied.connect(self._apply_saved_search)
+        window.exec()
+
+    def _open_dedupe(self):
+        """Окно поиска и слияния дублей игроков"""
+        if not self._ensure_edits_saved("поиск дублей"):
+            return
+        DedupeWindow(self).exec()
+        # Слияние удаляет игроков и переносит их строки другим соединением
+        self.details_cache.invalidate()
+
+    @tracked_operation("_delete_row")
     def _delete_row(self):
         """Удаление выбранной записи"""
+        if not self._ensure_edits_saved("удаление"):
+            return
         index = self.tableView.currentIndex()
         if not index.isValid():
             MessageHelper.show_error(self, "Ошибка", "Не выбрана строка для удаления")
@@ -506,6 +1135,7 @@ class MainWindow(QMainWindow):
                 success = self._delete_player_with_relations(player_id)
 
                 if success:
+                    self.details_cache.invalidate(player_id)
                     # Обновляем таблицу
                     self._refresh()
                     self._update_status_bar(f"Игрок '{nickname}' удален")
@@ -520,12 +1150,21 @@ class MainWindow(QMainWindow):
     def _delete_player_with_relations(self, player_id):
         """Удаление игрока со всеми связанными данными"""
         try:
-            # Используем QSqlQuery для PyQt6
-            query = QSqlQuery(self.db)
+            # Запрос через общий инструментированный путь
+            query = DatabaseManager.query(self.db)
 
             # Начинаем транзакцию
             self.db.transaction()
 
+            # Проверяем, что игрок существует (numRowsAffected не годится:
+            # в компактной схеме удаление идет через триггер представления)
+            query.prepare("SELECT COUNT(*) FROM Players WHERE id = ?")
+            query.addBindValue(player_id)
+            if not query.exec() or not query.next() or query.value(0) == 0:
+                self.db.rollback()
+                print(f"Игрок с ID {player_id} не найден")
+                return False
+
             # Удаляем связанные данные в правильном порядке
             # (сначала зависимые таблицы, потом основную)
 
@@ -555,12 +1194,6 @@ class MainWindow(QMainWindow):
                 print(f"Ошибка удаления игрока: {query.lastError().text()}")
                 return False
 
-            # Проверяем, что игрок был удален
-            if query.numRowsAffected() == 0:
-                self.db.rollback()
-                print(f"Игрок с ID {player_id} не найден")
-                return False
-
             # Подтверждаем транзакцию
             self.db.commit()
             return True
@@ -1,61 +1,98 @@
 from PyQt6 import uic
 from PyQt6.QtWidgets import QDialog, QMessageBox
 from PyQt6.QtCore import Qt, QDate
-from PyQt6.QtSql import QSqlQuery
 
 from utils.database import DatabaseManager
 from utils.ui_helpers import MessageHelper
+from utils.event_history import EventHistoryModel
+from utils.attendance import PlayerAttendance
+from utils.completion import PrefixCompleter
+from data.sqlite.sort_keys import sort_key
+from utils.reference_data import ReferenceData
+from utils.player_cache import PLAYER_DETAILS_QUERY, PLAYER_DETAILS_FIELDS
 
 
 class PlayerDetailDialog(QDialog):
-    def __init__(self, player_id=None, parent=None):
+    def __init__(self, player_id=None, parent=None, details=None):
         super().__init__(parent)
         uic.loadUi("gui/design/about_player.ui", self)
 
-        self.player_id = player_id
-        self.is_new_player = player_id is None
-        self.db = DatabaseManager.connect()
+        self.db = DatabaseManager.get_connection()
+        self.history_model = None
 
         # Настройка UI
         self._setup_ui()
 
+        # Подключение событий
+        self.buttonBox.accepted.connect(self._save_changes)
+
+        self.load_player(player_id, details)
+
+    def load_player(self, player_id=None, details=None):
+        """Загрузка игрока в диалог (позволяет переиспользовать один экземпляр)
+
+        Args:
+            player_id: ID игрока или None для добавления нового
+            details: Заранее загруженные данные (из PlayerDetailsCache)
+        """
+        self.player_id = player_id
+        self.is_new_player = player_id is None
+        self.historyGroup.setVisible(not self.is_new_player)
+        self._reset_fields()
+
         if self.is_new_player:
             # Режим добавления нового игрока
             self._setup_new_player_mode()
         else:
             # Режим редактирования существующего игрока
-            self._load_player_data()
-            self._load_history_data()
-
-        # Подключение событий
-        self.buttonBox.accepted.connect(self._save_changes)
+            if details is None:
+                details = self._query_player_data()
+            self._fill_player_data(details)
+            self._load_history_data(details.get('history') if details else None)
 
     def _setup_ui(self):
         """Настройка интерфейса"""
         # Настройка даты
         self.joinedDateEdit.setDate(QDate.currentDate())
 
-        # Загрузка классов в комбобокс
+        # Загрузка классов, статусов и ролей в комбобоксы
         self._load_classes()
 
+        # Подсказки существующих ников помогают не завести игрока повторно
+        self.nickname_completer = PrefixCompleter(self.nicknameEdit, self.db)
+
         # Настройка таблицы истории
         self.historyTableView.setAlternatingRowColors(True)
         self.historyTableView.setSelectionBehavior(self.historyTableView.SelectionBehavior.SelectRows)
 
     def _load_classes(self):
-        """Загрузка классов в комбобокс"""
+        """Заполнение комбобоксов справочными данными из общего кэша"""
         try:
-            query = QSqlQuery(self.db)
-            query.prepare("SELECT id, name FROM Classes ORDER BY name")
-
-            if query.exec():
-                self.classComboBox.clear()
-                while query.next():
-                    class_id = query.value(0)
-                    class_name = query.value(1)
-                    self.classComboBox.addItem(class_name, class_id)
+            reference = ReferenceData.instance()
+            reference.fill_class_combo(self.classComboBox)
+            reference.fill_status_combo(self.statusComboBox)
+            reference.fill_rank_combo(self.leadershipComboBox)
         except Exception as e:
-            print(f"Ошибка загрузки классов: {e}")
+            print(f"Ошибка загрузки справочников: {e}")
+
+    def _reset_fields(self):
+        """Сброс полей перед загрузкой игрока
+
+        Диалог переиспользуется, поэтому поле, которое у игрока пустое или
+        не найдено в справочнике, не должно сохранить значение предыдущего
+        игрока (и записаться ему при сохранении). Комбобоксы остаются без
+        выбора: такие поля проверяет _validate_data.
+        """
+        self.nicknameEdit.clear()
+        self.tagEdit.clear()
+        self.classComboBox.setCurrentIndex(-1)
+        self.levelSpinBox.setValue(1)
+        self.joinedDateEdit.setDate(QDate.currentDate())
+        self.statusComboBox.setCurrentIndex(-1)
+        self.weeklyDamageSpinBox.setValue(0)
+        self.raidParticipationSpinBox.setValue(0)
+        self.leadershipComboBox.setCurrentIndex(-1)
+        self.resourcesSpinBox.setValue(0)
 
     def _setup_new_player_mode(self):
         """Настройка диалога для добавления нового игрока"""
@@ -67,7 +104,7 @@ class PlayerDetailDialog(QDialog):
         self.tagEdit.setText("@newuser")
         self.levelSpinBox.setValue(1)
         self.joinedDateEdit.setDate(QDate.currentDate())
-        self.statusComboBox.setCurrentText("Активен")
+        self.statusComboBox.setCurrentText(ReferenceData.DEFAULT_STATUS)
 
         # Устанавливаем первый класс по умолчанию
         if self.classComboBox.count() > 0:
@@ -78,121 +115,105 @@ class PlayerDetailDialog(QDialog):
         self.raidParticipationSpinBox.setValue(0)
 
         # Вклад по умолчанию
-        self.leadershipComboBox.setCurrentText("Участник")
+        self.leadershipComboBox.setCurrentText(ReferenceData.DEFAULT_RANK)
         self.resourcesSpinBox.setValue(0)
 
-        # Скрываем группу истории для новых игроков
-        self.historyGroup.setVisible(False)
-
         # Фокус на поле никнейма
         self.nicknameEdit.setFocus()
         self.nicknameEdit.selectAll()
 
-    def _load_player_data(self):
-        """Загрузка данных игрока"""
+    def _query_player_data(self):
+        """Чтение данных игрока из БД
+
+        Returns:
+            dict или None: {поле: значение} в формате PLAYER_DETAILS_FIELDS
+        """
         try:
-            # Основные данные игрока
-            query = QSqlQuery(self.db)
-            query.prepare("""
-                SELECT 
-                    p.nickname,
-                    p.tag,
-                    p.class_id,
-                    c.name as class_name,
-                    p.level,
-                    p.joined_date,
-                    p.guild_status,
-                    COALESCE(a.weekly_damage, 0) as weekly_damage,
-                    COALESCE(a.raid_participation, 0) as raid_participation,
-                    COALESCE(gc.leadership_rank, 'Участник') as leadership_rank,
-                    COALESCE(gc.resources_contributed, 0) as resources_contributed
-                FROM Players p
-                LEFT JOIN Classes c ON p.class_id = c.id
-                LEFT JOIN Activity a ON p.id = a.player_id
-                LEFT JOIN GuildContribution gc ON p.id = gc.player_id
-                WHERE p.id = ?
-            """)
+            query = DatabaseManager.query(self.db)
+            query.prepare(PLAYER_DETAILS_QUERY)
             query.addBindValue(self.player_id)
 
             if query.exec() and query.next():
-                # Заполняем основную информацию
-                self.nicknameEdit.setText(query.value("nickname") or "")
-                self.tagEdit.setText(query.value("tag") or "")
-
-                # Устанавливаем класс
-                class_id = query.value("class_id")
-                if class_id:
-                    index = self.classComboBox.findData(class_id)
-                    if index >= 0:
-                        self.classComboBox.setCurrentIndex(index)
-
-                self.levelSpinBox.setValue(query.value("level") or 1)
-
-                # Устанавливаем дату
-                joined_date = query.value("joined_date")
-                if joined_date:
-                    self.joinedDateEdit.setDate(QDate.fromString(joined_date, Qt.DateFormat.ISODate))
-
-                # Устанавливаем статус
-                status = query.value("guild_status") or "Активен"
-                index = self.statusComboBox.findText(status)
-                if index >= 0:
-                    self.statusComboBox.setCurrentIndex(index)
-
-                # Заполняем активность
-                self.weeklyDamageSpinBox.setValue(query.value("weekly_damage") or 0)
-                self.raidParticipationSpinBox.setValue(query.value("raid_participation") or 0)
-
-                # Заполняем вклад в гильдию
-                leadership = query.value("leadership_rank") or "Участник"
-                index = self.leadershipComboBox.findText(leadership)
-                if index >= 0:
-                    self.leadershipComboBox.setCurrentIndex(index)
-
-                self.resourcesSpinBox.setValue(query.value("resources_contributed") or 0)
-
-                # Обновляем заголовок
-                nickname = query.value("nickname") or "Неизвестный игрок"
-                self.setWindowTitle(f"Детали игрока - {nickname}")
+                return {field: query.value(field) for field in PLAYER_DETAILS_FIELDS}
 
-            else:
-                MessageHelper.show_error(self, "Ошибка", "Не удалось загрузить данные игрока")
-                self.reject()
+        except Exception as e:
+            print(f"Ошибка в _query_player_data: {e}")
+        return None
+
+    def _fill_player_data(self, details):
+        """Заполнение формы данными игрока"""
+        if not details:
+            MessageHelper.show_error(self, "Ошибка", "Не удалось загрузить данные игрока")
+            self.reject()
+            return
+
+        try:
+            # Заполняем основную информацию
+            self.nicknameEdit.setText(details["nickname"] or "")
+            self.tagEdit.setText(details["tag"] or "")
+
+            # Устанавливаем класс
+            class_id = details["class_id"]
+            if class_id:
+                self.classComboBox.setCurrentIndex(self.classComboBox.findData(class_id))
+
+            self.levelSpinBox.setValue(details["level"] or 1)
+
+            # Устанавливаем дату
+            joined_date = details["joined_date"]
+            if joined_date:
+                self.joinedDateEdit.setDate(QDate.fromString(joined_date, Qt.DateFormat.ISODate))
+
+            # Устанавливаем статус
+            status = details["guild_status"] or ReferenceData.DEFAULT_STATUS
+            self.statusComboBox.setCurrentIndex(self.statusComboBox.findText(status))
+
+            # Заполняем активность
+            self.weeklyDamageSpinBox.setValue(details["weekly_damage"] or 0)
+            self.raidParticipationSpinBox.setValue(details["raid_participation"] or 0)
+
+            # Заполняем вклад в гильдию
+            leadership = details["leadership_rank"] or ReferenceData.DEFAULT_RANK
+            self.leadershipComboBox.setCurrentIndex(self.leadershipComboBox.findText(leadership))
+
+            self.resourcesSpinBox.setValue(details["resources_contributed"] or 0)
+
+            # Обновляем заголовок
+            nickname = details["nickname"] or "Неизвестный игрок"
+            self.setWindowTitle(f"Детали игрока - {nickname}")
 
         except Exception as e:
             MessageHelper.show_error(self, "Ошибка", f"Ошибка загрузки данных: {e}")
-            print(f"Ошибка в _load_player_data: {e}")
+            print(f"Ошибка в _fill_player_data: {e}")
 
-    def _load_history_data(self):
-        """Загрузка истории событий"""
+    def _load_history_data(self, first_page=None):
+        """Загрузка истории событий (постранично, с подгрузкой при прокрутке)"""
         try:
-            # Создаем модель для истории событий
-            query_text = """
-                SELECT 
-                    ep.event_date as "Дата",
-                    ep.event_type as "Тип события",
-                    ep.description as "Описание",
-                    ep.reward as "Награда"
-                FROM EventParticipation ep
-                WHERE ep.player_id = ?
-                ORDER BY ep.event_date DESC
-                LIMIT 10
-            """
-
-            model = DatabaseManager.create_query_model(self.db, query_text)
-            if model:
-                # Привязываем параметр
-                query = QSqlQuery(self.db)
-                query.prepare(query_text)
-                query.addBindValue(self.player_id)
-                model.setQuery(query)
-
-                # Устанавливаем модель в таблицу
-                self.historyTableView.setModel(model)
-                self.historyTableView.resizeColumnsToContents()
-
-                # Скрываем вертикальные заголовки
-                self.historyTableView.verticalHeader().setVisible(False)
+            previous_model = self.history_model
+            previous_selection = self.historyTableView.selectionModel()
+            self.history_model = EventHistoryModel(self.db, self.player_id, first_page=first_page, parent=self)
+
+            self.historyTableView.setSortingEnabled(False)
+            self.historyTableView.setModel(self.history_model)
+
+            # Диалог переиспользуется: модель прошлого игрока и ее модель
+            # выделения иначе копились бы до закрытия окна
+            if previous_selection is not None:
+                previous_selection.deleteLater()
+            if previous_model is not None:
+                previous_model.deleteLater()
+            self.historyTableView.resizeColumnsToContents()
+
+            # Скрываем вертикальные заголовки
+            self.historyTableView.verticalHeader().setVisible(False)
+
+            # Сводка посещаемости в заголовке группы
+            title = f"История событий: {self.history_model.summary_text()}"
+            # Серии и посещаемость за последние недели — из кэша PlayerAttendance
+            attendance = PlayerAttendance(self.db, self.player_id,
+                                          DatabaseManager.table_exists(self.db, "EventParticipation_data"))
+            streaks = attendance.summary_text()
+            self.historyGroup.setTitle(f"{title}; {streaks}" if streaks else title)
 
         except Exception as e:
             print(f"Ошибка загрузки истории: {e}")
@@ -249,23 +270,32 @@ class PlayerDetailDialog(QDialog):
             self.classComboBox.setFocus()
             return False
 
-        # Проверяем уникальность никнейма для нового игрока
-        if self.is_new_player:
-            query = QSqlQuery(self.db)
-            query.prepare("SELECT COUNT(*) FROM Players WHERE nickname = ?")
-            query.addBindValue(self.nicknameEdit.text().strip())
-
-            if query.exec() and query.next() and query.value(0) > 0:
-                MessageHelper.show_error(self, "Ошибка валидации",
-                                         "Игрок с таким никнеймом уже существует")
-                self.nicknameEdit.setFocus()
+        for combo, message in ((self.statusComboBox, "Необходимо выбрать статус"),
+                               (self.leadershipComboBox, "Необходимо выбрать роль")):
+            if combo.currentIndex() < 0:
+                MessageHelper.show_error(self, "Ошибка валидации", message)
+                combo.setFocus()
+                return False
+
+        # Уникальность ника и тега: сравнение по индексированным ключам
+        # (без учета регистра и ё/е), для существующего игрока — кроме него самого
+        for edit, column, message in ((self.nicknameEdit, "nickname_key", "Игрок с таким никнеймом уже существует"),
+                                      (self.tagEdit, "tag_key", "Игрок с таким тегом уже существует")):
+            query = DatabaseManager.query(self.db)
+            query.prepare(f"SELECT id FROM Players WHERE {column} = ? AND id IS NOT ? LIMIT 1")
+            query.addBindValue(sort_key(edit.text().strip()))
+            query.addBindValue(None if self.is_new_player else self.player_id)
+
+            if query.exec() and query.next():
+                MessageHelper.show_error(self, "Ошибка валидации", message)
+                edit.setFocus()
                 return False
 
         return True
 
     def _create_new_player(self):
         """Создание нового игрока"""
-        query = QSqlQuery(self.db)
+        query = DatabaseManager.query(self.db)
         query.prepare("""
             INSERT INTO Players (nickname, tag, class_id, level, joined_date, guild_status)
             VALUES (?, ?, ?, ?, ?, ?)
@@ -281,12 +311,20 @@ class PlayerDetailDialog(QDialog):
         if not query.exec():
             raise Exception(f"Ошибка создания игрока: {query.lastError().text()}")
 
-        # Получаем ID созданного игрока
-        return query.lastInsertId()
+        # ID созданного игрока берется из sqlite_sequence в той же транзакции:
+        # при вставке через представление (компактная схема) lastInsertId()
+        # возвращает устаревший last_insert_rowid от прошлых вставок соединения
+        table = "Players_data" if DatabaseManager.table_exists(self.db, "Players_data") else "Players"
+        query = DatabaseManager.query(self.db)
+        query.prepare("SELECT seq FROM sqlite_sequence WHERE name = ?")
+        query.addBindValue(table)
+        if query.exec() and query.next():
+            return query.value(0)
+        raise Exception("Не удалось получить ID созданного игрока")
 
     def _update_existing_player(self):
         """Обновление существующего игрока"""
-        query = QSqlQuery(self.db)
+        query = DatabaseManager.query(self.db)
         query.prepare("""
             UPDATE Players 
             SET nickname = ?, tag = ?, class_id = ?, level = ?, 
@@ -307,7 +345,7 @@ class PlayerDetailDialog(QDialog):
 
     def _save_activity_data(self):
         """Сохранение данных активности"""
-        query = QSqlQuery(self.db)
+        query = DatabaseManager.query(self.db)
 
         # Проверяем, есть ли уже запись
         query.prepare("SELECT COUNT(*) FROM Activity WHERE player_id = ?")
@@ -338,7 +376,7 @@ class PlayerDetailDialog(QDialog):
 
     def _save_contribution_data(self):
         """Сохранение данных вклада в гильдию"""
-        query = QSqlQuery(self.db)
+        query = DatabaseManager.query(self.db)
 
         # Проверяем, есть ли уже запись
         query.prepare("SELECT COUNT(*) FROM GuildContribution WHERE player_id = ?")
@@ -1,23 +1,34 @@
 from PyQt6 import uic
-from PyQt6.QtWidgets import QDialog
+from PyQt6.QtWidgets import QDialog, QMessageBox
+from PyQt6.QtCore import Qt, QDate
 from PyQt6.QtSql import QSqlTableModel, QSqlDatabase
+from utils.database import DatabaseManager
 from utils.ui_helpers import TableManager, MessageHelper
+from utils.reference_data import ReferenceData
+from utils.column_sizer import ColumnSizer, ColumnWidthCache
+from data.sqlite.sort_keys import prefix_bounds
 
 
 class ReferenceWindow(QDialog):
+    # Таблицы со ссылкой на игрока и колонки дат для фильтрации в SQL
+    PLAYER_TABLES = ("Activity", "GuildContribution", "EventParticipation")
+    DATE_COLUMNS = {"EventParticipation": "event_date"}
+
+    # Сколько ошибок по строкам показывать в сообщении
+    MAX_REPORTED_ERRORS = 20
+
     def __init__(self, table_name, parent=None):
         super().__init__(parent)
         uic.loadUi("gui/design/reference.ui", self)
 
-        self.model = QSqlTableModel(self)
-        self.model.setTable(table_name)
-        self.model.select()
-
-        TableManager.setup_table_view(self.tableView, self.model)
+        self.table_name = table_name
+        self.model = self._create_model()
 
         # Настройка UI
         TableManager.setup_table_view(self.tableView, self.model)
+        self._setup_filters()
         self._connect_buttons()
+        self._update_status()
 
         try:
             self._resize_to_contents()
@@ -25,58 +36,254 @@ class ReferenceWindow(QDialog):
         except Exception as e:
             print(e)
 
+    def _create_model(self):
+        """Модель с отложенной записью: изменения копятся до сохранения
+
+        QSqlTableModel подгружает строки порциями по мере прокрутки,
+        поэтому окно открывается быстро даже на больших таблицах.
+        """
+        model = QSqlTableModel(self, QSqlDatabase.database())
+        model.setTable(self.table_name)
+        model.setEditStrategy(QSqlTableModel.EditStrategy.OnManualSubmit)
+        model.setFilter(self._build_filter())
+        DatabaseManager.select_model(model)
+
+        model.dataChanged.connect(lambda *args: self._update_status())
+        model.rowsInserted.connect(lambda *args: self._update_status())
+        return model
+
+    def _setup_filters(self):
+        """Фильтры по игроку и дате доступны только для подходящих таблиц"""
+        has_player = self.table_name in self.PLAYER_TABLES
+        has_date = self.table_name in self.DATE_COLUMNS
+
+        self.playerFilterEdit.setVisible(has_player)
+        for widget in (self.dateFilterCheckBox, self.dateFromEdit, self.dateToEdit):
+            widget.setVisible(has_date)
+        self.filter_frame.setVisible(has_player or has_date)
+
+        today = QDate.currentDate()
+        self.dateFromEdit.setDate(today.addMonths(-1))
+        self.dateToEdit.setDate(today)
+
+    def _build_filter(self):
+        """WHERE-условие из полей фильтра"""
+        if not hasattr(self, 'playerFilterEdit'):
+            return ""
+
+        conditions = []
+        player = self.playerFilterEdit.text().strip()
+        if player and self.table_name in self.PLAYER_TABLES:
+            if player.isdigit():
+                conditions.append(f"player_id = {int(player)}")
+            else:
+                # Ник, начинающийся с введенного текста: поиск по индексу ключа сортировки
+                start, end = (bound.replace("'", "''") for bound in prefix_bounds(player))
+                conditions.append(f"player_id IN (SELECT id FROM Players "
+                                  f"WHERE nickname_key >= '{start}' AND nickname_key < '{end}')")
+
+        date_column = self.DATE_COLUMNS.get(self.table_name)
+        if date_column and self.dateFilterCheckBox.isChecked():
+            date_from = self.dateFromEdit.date().toString("yyyy-MM-dd")
+            date_to = self.dateToEdit.date().toString("yyyy-MM-dd")
+            conditions.append(f"{date_column} BETWEEN '{date_from}' AND '{date_to}'")
+
+        return " AND ".join(conditions)
+
     def _connect_buttons(self):
         """Подключение кнопок"""
         self.add_button.clicked.connect(lambda: self.model.insertRow(self.model.rowCount()))
         self.delete_button.clicked.connect(self._delete_selected)
         self.save_button.clicked.connect(self._save_and_close)
         self.update_button.clicked.connect(self._refresh_model)
+        self.filter_button.clicked.connect(self._apply_filter)
+        self.playerFilterEdit.returnPressed.connect(self._apply_filter)
 
     def _delete_selected(self):
-        """Удаление выбранной записи"""
+        """Пометка выбранной записи на удаление (удаляется при сохранении)"""
         index = self.tableView.currentIndex()
         if not index.isValid():
             MessageHelper.show_error(self, "Ошибка", "Не выбрана строка для удаления")
             return
 
         # Подтверждение удаления
-        from PyQt6.QtWidgets import QMessageBox
         reply = QMessageBox.question(self, "Подтверждение",
                                      "Вы уверены, что хотите удалить выбранную запись?",
                                      QMessageBox.StandardButton.Yes | QMessageBox.StandardButton.No)
 
         if reply == QMessageBox.StandardButton.Yes:
             if self.model.removeRow(index.row()):
-                if self.model.submitAll():
-                    if hasattr(self, 'statusbar'):
-                        self.statusbar.showMessage(f"Запись удалена. Всего записей: {self.model.rowCount()}")
-                else:
-                    MessageHelper.show_error(self, "Ошибка",
-                                             f"Не удалось удалить запись: {self.model.lastError().text()}")
+                self._update_status("Запись помечена на удаление, сохраните изменения")
             else:
                 MessageHelper.show_error(self, "Ошибка", "Не удалось удалить строку")
 
     def _save_and_close(self):
         """Сохранение и закрытие"""
-        if self.model.submitAll():
+        if self._submit_batch():
             self.close()
-        else:
-            MessageHelper.show_error(self, "Ошибка", "Не удалось сохранить изменения")
+
+    def reject(self):
+        """Закрытие окна с предложением сохранить несохраненные изменения"""
+        if self.model.isDirty():
+            reply = MessageHelper.show_question(self, "Несохраненные изменения", "Сохранить изменения?")
+            if reply == QMessageBox.StandardButton.Yes and not self._submit_batch():
+                return
+        super().reject()
+
+    def _submit_batch(self):
+        """Запись всех накопленных изменений одной транзакцией
+
+        Каждая измененная строка превращается в отдельный INSERT/UPDATE/DELETE.
+        Ошибки собираются по всем строкам; если хотя бы одна строка не
+        записалась, транзакция откатывается целиком, а изменения остаются
+        в модели, чтобы их можно было исправить и сохранить повторно.
+
+        Returns:
+            bool: True, если изменения записаны (или их не было)
+        """
+        changes = self._collect_changes()
+        if not changes:
+            return True
+
+        db = self.model.database()
+        if not db.transaction():
+            MessageHelper.show_error(self, "Ошибка", f"Не удалось начать транзакцию: {db.lastError().text()}")
+            return False
+
+        errors = []
+        for row, query_text, params in changes:
+            query = DatabaseManager.query(db)
+            query.prepare(query_text)
+            for value in params:
+                query.addBindValue(value)
+            if not query.exec():
+                errors.append((row, query.lastError().text()))
+
+        if errors or not db.commit():
+            db.rollback()
+            if not errors:
+                errors.append((None, db.lastError().text()))
+            self._show_row_errors(errors)
+            return False
+
+        # select() в режиме OnManualSubmit сбрасывает накопленные изменения
+        DatabaseManager.select_model(self.model)
+        self._notify_reference_changed()
+        self._update_status(f"Сохранено строк: {len(changes)}")
+        return True
+
+    def _collect_changes(self):
+        """Список (строка, запрос, параметры) по измененным строкам модели"""
+        changes = []
+        record = self.model.record()
+        columns = [record.fieldName(i) for i in range(record.count())]
+
+        for row in range(self.model.rowCount()):
+            # QSqlTableModel помечает новые строки "*", удаленные — "!"
+            marker = self.model.headerData(row, Qt.Orientation.Vertical)
+
+            if marker == "!":
+                changes.append((row, f'DELETE FROM "{self.table_name}" WHERE id = ?', [self._row_id(row)]))
+                continue
+
+            values = {}
+            for column, name in enumerate(columns):
+                index = self.model.index(row, column)
+                if self.model.isDirty(index):
+                    value = self.model.data(index, Qt.ItemDataRole.EditRole)
+                    if marker == "*" and value is None:
+                        continue
+                    values[name] = value
+
+            if not values:
+                continue
+
+            if marker == "*":
+                names = ", ".join(f'"{name}"' for name in values)
+                placeholders = ", ".join("?" * len(values))
+                changes.append((row, f'INSERT INTO "{self.table_name}" ({names}) VALUES ({placeholders})',
+                                list(values.values())))
+            else:
+                assignments = ", ".join(f'"{name}" = ?' for name in values)
+                changes.append((row, f'UPDATE "{self.table_name}" SET {assignments} WHERE id = ?',
+                                list(values.values()) + [self._row_id(row)]))
+        return changes
+
+    def _row_id(self, row):
+        """Исходный id строки (до правок пользователя)"""
+        return self.model.primaryValues(row).value("id")
+
+    def _show_row_errors(self, errors):
+        """Сообщение со списком ошибок по строкам"""
+        lines = []
+        for row, text in errors[:self.MAX_REPORTED_ERRORS]:
+            lines.append(f"Строка {row + 1}: {text}" if row is not None else text)
+        if len(errors) > self.MAX_REPORTED_ERRORS:
+            lines.append(f"... и еще {len(errors) - self.MAX_REPORTED_ERRORS}")
+
+        MessageHelper.show_error(self, "Ошибка",
+                                 "Изменения не сохранены, транзакция отменена:\n" + "\n".join(lines))
+        self._update_status(f"Ошибок при сохранении: {len(errors)}")
+
+    def _notify_reference_changed(self):
+        """Сброс кэша справочников после сохранения таблицы Classes"""
+        if self.model.tableName() in ReferenceData.CACHED_TABLES:
+            ReferenceData.instance().invalidate()
+
+    def _apply_filter(self):
+        """Повторная выборка с фильтром по игроку и дате"""
+        if self.model.isDirty():
+            reply = MessageHelper.show_question(self, "Несохраненные изменения",
+                                                "Фильтр сбросит несохраненные изменения. Продолжить?")
+            if reply != QMessageBox.StandardButton.Yes:
+                return
+
+        self.model.setFilter(self._build_filter())
+        if not DatabaseManager.select_model(self.model):
+            MessageHelper.show_error(self, "Ошибка", f"Ошибка фильтра: {self.model.lastError().text()}")
+        self._update_status()
+
+    def _update_status(self, message=""):
+        """Число загруженных строк и наличие несохраненных изменений"""
+        if not hasattr(self, 'status_label'):
+            return
+
+        loaded = f"Загружено строк: {self.model.rowCount()}"
+        if self.model.canFetchMore():
+            loaded += " (остальные подгружаются при прокрутке)"
+        parts = [message, loaded] if message else [loaded]
+        if self.model.isDirty():
+            parts.append("есть несохраненные изменения")
+        self.status_label.setText(". ".join(parts))
 
     def _refresh_model(self):
+        if self.model.isDirty():
+            reply = MessageHelper.show_question(self, "Несохраненные изменения",
+                                                "Обновление сбросит несохраненные изменения. Продолжить?")
+            if reply != QMessageBox.StandardButton.Yes:
+                return
+
         try:
-            table_name = self.model.tableName()
-            self.model = QSqlTableModel(self, QSqlDatabase.database())
-            self.model.setTable(table_name)
-            self.model.select()
+            self.model = self._create_model()
             TableManager.setup_table_view(self.tableView, self.model)
+            self._update_status()
             self._resize_to_contents()  # Добавлено здесь
         except Exception as e:
             MessageHelper.show_error(self, "Ошибка", f"Произошла ошибка: {e}")
 
+    def _width_key(self):
+        """Ключ кэша ширин колонок для таблицы справочника"""
+        return f"reference/{self.table_name}"
+
+    def hideEvent(self, event):
+        """Сохранение ширин колонок при закрытии окна"""
+        ColumnSizer.remember(self.tableView, self._width_key())
+        ColumnWidthCache.instance().save()
+        super().hideEvent(event)
+
     def _resize_to_contents(self):
-        # Подгоняем ширину столбцов под содержимое
-        self.tableView.resizeColumnsToContents()
+        # Подгоняем ширину столбцов по заголовку и выборке строк (с кэшем)
+        ColumnSizer.fit_columns(self.tableView, self._width_key())
 
         # Рассчитываем общую ширину таблицы
         table_width = self.tableView.verticalHeader().width() + 40  # Учет вертикального заголовка
@@ -91,9 +298,9 @@ class ReferenceWindow(QDialog):
 
         # Добавляем отступы для элементов управления
         padding = 20
-        total_width = table_width + padding
+        total_width = max(table_width + padding, self.filter_frame.sizeHint().width())
         total_height = table_height + self.button_frame.height() + padding
 
         # Устанавливаем размеры окна
         self.resize(total_width, total_height)
-        self.setMinimumSize(total_width, total_height)
\ No newline at end of file
+        self.setMinimumSize(total_width, total_height)
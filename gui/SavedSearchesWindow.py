@@ -0,0 +1,147 @@
+import sqlite3
+
+from PyQt6 import QtCore
+from PyQt6.QtWidgets import (QDialog, QVBoxLayout, QHBoxLayout, QTableWidget, QTableWidgetItem,
+                             QPushButton, QLabel, QInputDialog, QMessageBox)
+
+from config.cfg import ConnectionProfile
+from utils.database import DatabaseManager
+from utils.saved_searches import SavedSearchStore
+from utils.ui_helpers import MessageHelper
+
+
+class SavedSearchesWindow(QDialog):
+    """Сохраненные поиски: сохранение последнего расширенного поиска и повторный запуск
+
+    Args:
+        compile_query: Функция (параметры формы) -> запрос id игроков
+        current_params: Параметры последнего расширенного поиска или None
+    """
+    search_applied = QtCore.pyqtSignal(int, str)  # id поиска, текст для статус-бара
+
+    HEADERS = ["Название", "Режим", "Найдено", "Обновлен"]
+    MODES = {"simple": "Простой", "detailed": "Детальный"}
+
+    def __init__(self, compile_query, current_params=None, parent=None):
+        super().__init__(parent)
+        self.setWindowTitle("Сохраненные поиски")
+        self.resize(600, 400)
+
+        self.compile_query = compile_query
+        self.current_params = current_params
+        self.conn = ConnectionProfile.active().connect(DatabaseManager.active_db_path)
+        self.store = SavedSearchStore(self.conn)
+        self.searches = []
+
+        self._setup_ui()
+        self._connect_events()
+        self._load()
+
+    def _setup_ui(self):
+        """Построение интерфейса"""
+        layout = QVBoxLayout(self)
+
+        self.tableWidget = QTableWidget(0, len(self.HEADERS))
+        self.tableWidget.setHorizontalHeaderLabels(self.HEADERS)
+        self.tableWidget.setEditTriggers(QTableWidget.EditTrigger.NoEditTriggers)
+        self.tableWidget.setSelectionBehavior(QTableWidget.SelectionBehavior.SelectRows)
+        self.tableWidget.setSelectionMode(QTableWidget.SelectionMode.SingleSelection)
+        layout.addWidget(self.tableWidget)
+
+        buttons = QHBoxLayout()
+        self.save_button = QPushButton("Сохранить текущий поиск...")
+        self.save_button.setEnabled(self.current_params is not None)
+        self.save_button.setToolTip("Сохраняется последний выполненный расширенный поиск")
+        self.delete_button = QPushButton("Удалить")
+        self.run_button = QPushButton("Показать")
+        self.close_button = QPushButton("Закрыть")
+        buttons.addWidget(self.save_button)
+        buttons.addWidget(self.delete_button)
+        buttons.addStretch()
+        buttons.addWidget(self.run_button)
+        buttons.addWidget(self.close_button)
+        layout.addLayout(buttons)
+
+        self.statusLabel = QLabel()
+        layout.addWidget(self.statusLabel)
+
+    def _connect_events(self):
+        """Подключение событий"""
+        self.save_button.clicked.connect(self._save)
+        self.delete_button.clicked.connect(self._delete)
+        self.run_button.clicked.connect(self._run)
+        self.tableWidget.cellDoubleClicked.connect(lambda row, column: self._run())
+        self.close_button.clicked.connect(self.reject)
+
+    def done(self, result):
+        """Закрытие соединения вместе с окном"""
+        self.conn.close()
+        super().done(result)
+
+    def _load(self):
+        self.searches = self.store.list()
+        self.tableWidget.setRowCount(len(self.searches))
+        for row, search in enumerate(self.searches):
+            count = "" if search.result_count is None else search.result_count
+            values = [search.name, self.MODES.get(search.mode, search.mode), count, search.refreshed_at or ""]
+            for column, value in enumerate(values):
+                self.tableWidget.setItem(row, column, QTableWidgetItem(str(value)))
+        self.tableWidget.resizeColumnsToContents()
+
+    def _selected(self):
+        rows = self.tableWidget.selectionModel().selectedRows()
+        if not rows:
+            self.statusLabel.setText("Не выбран ни один поиск")
+            return None
+        return self.searches[rows[0].row()]
+
+    def _save(self):
+        name, ok = QInputDialog.getText(self, "Сохранить поиск", "Название поиска:")
+        name = name.strip()
+        if not ok or not name:
+            return
+        if any(search.name == name for search in self.searches):
+            reply = MessageHelper.show_question(self, "Сохранить поиск", f"Заменить поиск «{name}»?")
+            if reply != QMessageBox.StandardButton.Yes:
+                return
+
+        try:
+            self.store.save(name, self.current_params, self.compile_query(self.current_params))
+        except sqlite3.Error as e:
+            print(f"Ошибка сохранения поиска: {e}")
+            self.statusLabel.setText(f"Ошибка сохранения поиска: {e}")
+            return
+        self._load()
+        self.statusLabel.setText(f"Поиск «{name}» сохранен")
+
+    def _delete(self):
+        search = self._selected()
+        if search is None:
+            return
+        try:
+            self.store.delete(search.id)
+        except sqlite3.Error as e:
+            print(f"Ошибка удаления поиска: {e}")
+            self.statusLabel.setText(f"Ошибка удаления поиска: {e}")
+            return
+        self._load()
+
+    def _run(self):
+        search = self._selected()
+        if search is None:
+            return
+        try:
+            stats = self.store.run(search.id, self.compile_query)
+        except (sqlite3.Error, ValueError) as e:
+            print(f"Ошибка выполнения поиска: {e}")
+            self.statusLabel.setText(f"Ошибка выполнения поиска: {e}")
+            return
+
+        if stats.cached:
+            how = "из кэша"
+        elif stats.full:
+            how = "полный пересчет"
+        else:
+            how = f"перепроверено игроков: {stats.players}"
+        self.search_applied.emit(search.id, f"Поиск «{search.name}» ({how}, {stats.elapsed_ms:.0f} мс)")
+        self.accept()
@@ -1,8 +1,9 @@
 from PyQt6 import uic, QtCore
 from PyQt6.QtWidgets import QDialog
-from PyQt6.QtSql import QSqlQuery
+from PyQt6.QtSql import QSqlDatabase
 from utils.database import DatabaseManager
 from utils.ui_helpers import FormUtils
+from utils.reference_data import ReferenceData
 import sqlite3
 
 
@@ -21,7 +22,8 @@ class AdvancedSearchWindow(QDialog):
             self.setWindowTitle("Поиск - Детальный режим")
 
         self.search_mode = search_mode
-        self.db = DatabaseManager.connect()
+        # Используем уже открытое соединение главного окна
+        self.db = QSqlDatabase.database()
 
         # Инициализация формы
         self._init_form()
@@ -35,6 +37,13 @@ class AdvancedSearchWindow(QDialog):
         if hasattr(self, 'comboBox_4'):
             self._load_classes()
 
+        # Статусы и роли берем из общего кэша справочников
+        reference = ReferenceData.instance()
+        if hasattr(self, 'comboBox_2'):
+            reference.fill_status_combo(self.comboBox_2, all_item="Все статусы")
+        if hasattr(self, 'comboBox_3'):
+            reference.fill_rank_combo(self.comboBox_3, all_item="Все роли")
+
         # Устанавливаем значения по умолчанию
         FormUtils.reset_datetime_edits(self)
 
@@ -42,29 +51,14 @@ class AdvancedSearchWindow(QDialog):
         self._set_spinbox_ranges()
 
     def _load_classes(self):
-        """Загрузка классов в comboBox"""
+        """Загрузка классов в comboBox из общего кэша справочников"""
         try:
-            # DatabaseManager возвращает QSqlDatabase
-            if self.db.isOpen():
-                query = QSqlQuery(self.db)
-                if query.exec("SELECT name FROM Classes ORDER BY name"):
-                    self.comboBox_4.addItem("Все классы")
-                    while query.next():
-                        class_name = query.value(0)
-                        if class_name:  # Проверяем что значение не пустое
-                            self.comboBox_4.addItem(class_name)
-                else:
-                    print(f"Ошибка выполнения запроса: {query.lastError().text()}")
-                    self.comboBox_4.addItem("Все классы")
-            else:
-                print("База данных не открыта")
-                self.comboBox_4.addItem("Все классы")
-
+            ReferenceData.instance().fill_class_combo(self.comboBox_4, all_item="Все классы", with_ids=False)
         except Exception as e:
             print(f"Ошибка загрузки классов: {e}")
             # Добавляем базовые значения в случае ошибки
+            self.comboBox_4.clear()
             self.comboBox_4.addItem("Все классы")
-            self.comboBox_4.addItem("Ошибка загрузки")
 
     def _set_spinbox_ranges(self):
         """Установка диапазонов для SpinBox элементов"""
@@ -83,7 +77,11 @@ class AdvancedSearchWindow(QDialog):
             'spinBox_8': (0, 100),
             # Если есть дополнительные спинбоксы в детальном режиме
             'spinBox_9': (1, 100),
-            'spinBox_10': (1, 100)
+            'spinBox_10': (1, 100),
+            # Посещаемость: порог в процентах, окно в неделях, пропуски подряд
+            'spinBox_11': (0, 100),
+            'spinBox_12': (1, 52),
+            'spinBox_13': (0, 50)
         }
 
         for spinbox_name, (min_val, max_val) in spinbox_configs.items():
@@ -92,6 +90,9 @@ class AdvancedSearchWindow(QDialog):
                 spinbox.setMinimum(min_val)
                 spinbox.setMaximum(max_val)
 
+        if hasattr(self, 'spinBox_12'):
+            self.spinBox_12.setValue(8)
+
     def _connect_events(self):
         """Подключение событий кнопок"""
         # Кнопки должны быть в том же порядке что и в UI
@@ -112,7 +113,9 @@ class AdvancedSearchWindow(QDialog):
             'date_range': self._get_date_range(),
             'level_range': self._get_level_range(),
             'status': self._get_status(),
-            'role': self._get_role()
+            'role': self._get_role(),
+            'attendance_below': self._get_attendance_below(),
+            'missed_last': self._get_missed_last()
         }
 
         # Дополнительные параметры для детального режима
@@ -170,6 +173,20 @@ class AdvancedSearchWindow(QDialog):
                 return (min_raid, max_raid if max_raid > 0 else 100)
         return None
 
+    def _get_attendance_below(self):
+        """Порог посещаемости событий: (процент, недель) или None"""
+        if hasattr(self, 'spinBox_11') and hasattr(self, 'spinBox_12'):
+            percent = self.spinBox_11.value()
+            if percent > 0:
+                return (percent, self.spinBox_12.value())
+        return None
+
+    def _get_missed_last(self):
+        """Число последних событий, пропущенных подряд, или None"""
+        if hasattr(self, 'spinBox_13') and self.spinBox_13.value() > 0:
+            return self.spinBox_13.value()
+        return None
+
     def _get_status(self):
         """Получение выбранного статуса"""
         if hasattr(self, 'comboBox_2'):
@@ -200,10 +217,12 @@ class AdvancedSearchWindow(QDialog):
             self.dateEdit_2.setDate(self.dateEdit_2.maximumDate())
 
         # Сброс всех SpinBox к 0
-        for i in range(1, 11):
+        for i in range(1, 14):
             spinbox_name = f'spinBox_{i}' if i > 1 else 'spinBox'
             if hasattr(self, spinbox_name):
                 getattr(self, spinbox_name).setValue(0)
+        if hasattr(self, 'spinBox_12'):
+            self.spinBox_12.setValue(8)  # окно посещаемости по умолчанию
 
         # Сброс ComboBox к первому элементу
         for combo_name in ['comboBox_2', 'comboBox_3', 'comboBox_4']:
@@ -2,9 +2,15 @@ from PyQt6.QtWidgets import QApplication
 from gui.MainWindow import MainWindow
 from data.sqlite.create_database import create_db
 from config.cfg import Config
+from utils.database import DatabaseManager
+from utils.guilds import GuildRegistry
 import sys
 
-create_db()
+registry = GuildRegistry()
+for guild_path in registry.guilds.values():
+    create_db(guild_path)
+DatabaseManager.set_active_database(registry.get_path())
+
 app = QApplication(sys.argv)
 window = MainWindow()
 window.show()
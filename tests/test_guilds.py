@@ -0,0 +1,34 @@
+import pytest
+
+from utils.guilds import GuildRegistry
+
+
+@pytest.fixture
+def registry(tmp_path):
+    return GuildRegistry(tmp_path / "guilds.json")
+
+
+def test_default_path_is_slugified(registry):
+    assert registry.add_guild("Тёмные Рыцари!") == "data/темные_рыцари.db"
+
+
+def test_path_of_another_guild_is_not_reused(registry):
+    # "ligma" совпадает с файлом гильдии по умолчанию (data/ligma.db)
+    assert registry.add_guild("ligma") == "data/ligma_2.db"
+    assert registry.add_guild("LIGMA") == "data/ligma_3.db"
+    assert registry.get_path(GuildRegistry.DEFAULT_GUILD) == GuildRegistry.DEFAULT_PATH
+
+
+def test_dots_stay_inside_data(registry):
+    assert registry.add_guild("..") == "data/guild.db"
+
+
+@pytest.mark.parametrize("name", ["../evil", "a\\b", "  "])
+def test_invalid_names_are_rejected(registry, name):
+    with pytest.raises(ValueError):
+        registry.add_guild(name)
+
+
+def test_explicit_path_of_another_guild_is_refused(registry):
+    with pytest.raises(ValueError):
+        registry.add_guild("Копия", GuildRegistry.DEFAULT_PATH)
@@ -0,0 +1,46 @@
+import random
+
+import pytest
+
+pytest.importorskip("PyQt6")
+
+from utils.keyset_model import diff_rows
+
+
+def apply_changes(rows, changes):
+    rows = list(rows)
+    for change in changes:
+        if change[0] == "remove":
+            del rows[change[1]]
+        elif change[0] == "move":
+            rows.insert(change[2], rows.pop(change[1]))
+        elif change[0] == "insert":
+            rows.insert(change[1], change[2])
+        else:
+            rows[change[1]] = change[2]
+    return rows
+
+
+def test_unchanged_rows_produce_no_changes():
+    rows = [(1, "a"), (2, "b"), (3, "c")]
+    assert diff_rows(rows, list(rows)) == []
+
+
+def test_remove_move_update_insert():
+    old = [(1, "a"), (2, "b"), (3, "c"), (4, "d")]
+    new = [(3, "c"), (1, "A"), (5, "e"), (4, "d")]
+
+    assert diff_rows(old, new) == [
+        ("remove", 1),
+        ("move", 1, 0),
+        ("update", 1, (1, "A")),
+        ("insert", 2, (5, "e")),
+    ]
+
+
+def test_random_reorders_reproduce_new_rows():
+    generator = random.Random(7)
+    for _ in range(500):
+        old = [(row_id, generator.randint(0, 2)) for row_id in generator.sample(range(40), generator.randint(0, 25))]
+        new = [(row_id, generator.randint(0, 2)) for row_id in generator.sample(range(40), generator.randint(0, 25))]
+        assert apply_changes(old, diff_rows(old, new)) == new
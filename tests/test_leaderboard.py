@@ -0,0 +1,61 @@
+import sqlite3
+
+import pytest
+
+from data.sqlite.create_database import create_db
+from utils.leaderboard import Leaderboard
+
+
+@pytest.fixture
+def conn(tmp_path):
+    db_path = tmp_path / "guild.db"
+    create_db(db_path, fill=False)
+    conn = sqlite3.connect(db_path)
+    yield conn
+    conn.close()
+
+
+def add_player(conn, nickname, class_id=1, damage=0):
+    player_id = conn.execute("INSERT INTO Players (nickname, tag, class_id) VALUES (?, ?, ?)",
+                             (nickname, f"@{nickname}", class_id)).lastrowid
+    conn.execute("INSERT INTO Activity (player_id, weekly_damage) VALUES (?, ?)", (player_id, damage))
+    conn.commit()
+    return player_id
+
+
+def score_seq(conn):
+    return conn.execute("SELECT seq FROM ScoreState WHERE id = 1").fetchone()[0]
+
+
+def test_player_added_and_deleted_between_refreshes(conn):
+    leaderboard = Leaderboard()
+    add_player(conn, "Alpha", damage=100)
+    leaderboard.refresh(conn, week="2026-W01")
+
+    player_id = add_player(conn, "Ghost", damage=50)
+    conn.execute("DELETE FROM Activity WHERE player_id = ?", (player_id,))
+    conn.execute("DELETE FROM Players WHERE id = ?", (player_id,))
+    conn.commit()
+
+    stats = leaderboard.refresh(conn, week="2026-W01")
+
+    assert not stats.full
+    assert stats.players == 1
+    assert score_seq(conn) == conn.execute("SELECT MAX(seq) FROM ChangeLog").fetchone()[0]
+    assert [row[2] for row in leaderboard.top(conn)] == ["Alpha"]
+    # Следующее обновление не упирается в ту же ошибку
+    assert leaderboard.refresh(conn, week="2026-W01").players == 0
+
+
+def test_deleted_player_leaves_cache(conn):
+    leaderboard = Leaderboard()
+    add_player(conn, "Alpha", damage=100)
+    player_id = add_player(conn, "Beta", damage=50)
+    leaderboard.refresh(conn, week="2026-W01")
+
+    conn.execute("DELETE FROM Activity WHERE player_id = ?", (player_id,))
+    conn.execute("DELETE FROM Players WHERE id = ?", (player_id,))
+    conn.commit()
+    leaderboard.refresh(conn, week="2026-W01")
+
+    assert conn.execute("SELECT player_id FROM PlayerScores").fetchall() == [(1,)]
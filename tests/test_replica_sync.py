@@ -0,0 +1,146 @@
+import sqlite3
+
+import pytest
+
+pytest.importorskip("PyQt6")
+
+from data.sqlite.change_log import compact_change_log
+from data.sqlite.create_database import create_db
+from utils.replica_sync import ReplicaSync, SqliteReplicaTarget
+
+
+@pytest.fixture
+def source(tmp_path):
+    db_path = tmp_path / "guild.db"
+    create_db(db_path, fill=False)
+    conn = sqlite3.connect(db_path)
+    conn.execute("INSERT INTO Classes (name) VALUES ('Воин')")
+    for number in range(1, 21):
+        conn.execute("INSERT INTO Players (nickname, tag, class_id, level) VALUES (?, ?, 1, ?)",
+                     (f"Игрок{number}", f"@p{number}", number))
+        conn.execute("INSERT INTO Activity (player_id, weekly_damage) VALUES (?, ?)", (number, number * 100))
+    conn.commit()
+    yield db_path, conn
+    conn.close()
+
+
+@pytest.fixture
+def target(tmp_path):
+    target = SqliteReplicaTarget(tmp_path / "replicas" / "guild.db")
+    yield target
+    target.close()
+
+
+def replica_rows(target, table):
+    return target.conn.execute(f"SELECT * FROM {table} ORDER BY id").fetchall()
+
+
+def source_rows(conn, table, columns):
+    return conn.execute(f"SELECT {', '.join(columns)} FROM {table} ORDER BY id").fetchall()
+
+
+def test_full_copy(source, target):
+    db_path, conn = source
+    sync = ReplicaSync(db_path, target, batch_size=7)
+
+    result = sync.sync()
+
+    assert result.full_copy
+    assert result.upserted == 41  # класс, 20 игроков, 20 строк активности
+    assert len(replica_rows(target, "Players")) == 20
+    assert target.checkpoint(db_path.name) == conn.execute("SELECT MAX(seq) FROM ChangeLog").fetchone()[0]
+    assert sync.verify().ok
+
+
+def test_incremental_deltas(source, target):
+    db_path, conn = source
+    sync = ReplicaSync(db_path, target, batch_size=3)
+    sync.sync()
+
+    conn.execute("UPDATE Players SET level = 99 WHERE id = 5")
+    conn.execute("UPDATE Players SET level = 98 WHERE id = 5")
+    conn.execute("DELETE FROM Activity WHERE player_id = 6")
+    conn.execute("INSERT INTO Players (nickname, tag, class_id, level) VALUES ('Новый', '@new', 1, 1)")
+    conn.commit()
+
+    result = sync.sync()
+
+    assert not result.full_copy
+    assert result.upserted == 2  # изменения игрока 5 схлопнулись в одну строку
+    assert result.deleted == 1
+    assert target.conn.execute("SELECT level FROM Players WHERE id = 5").fetchone() == (98,)
+    assert target.conn.execute("SELECT COUNT(*) FROM Activity WHERE player_id = 6").fetchone() == (0,)
+    assert sync.verify().ok
+
+
+def test_replayed_batch_is_idempotent(source, target):
+    db_path, conn = source
+    sync = ReplicaSync(db_path, target)
+    sync.sync()
+    checkpoint = target.checkpoint(db_path.name)
+
+    conn.execute("UPDATE Players SET nickname = 'Переименован' WHERE id = 3")
+    conn.execute("DELETE FROM Players WHERE id = 4")
+    conn.commit()
+    sync.sync()
+    expected = replica_rows(target, "Players")
+
+    # Сбой после применения пачки, но до подтверждения: та же пачка приходит снова
+    with target.conn:
+        target._set_checkpoint(db_path.name, checkpoint)
+    result = sync.sync()
+
+    assert not result.full_copy
+    assert result.batches == 1
+    assert replica_rows(target, "Players") == expected
+    assert sync.verify().ok
+
+
+def test_compaction_forces_resync(source, target):
+    db_path, conn = source
+    sync = ReplicaSync(db_path, target)
+    sync.sync()
+
+    conn.execute("UPDATE Players SET level = 50 WHERE id = 1")
+    conn.commit()
+    # Реплика исключена из расчета, и журнал сжат дальше ее отметки
+    conn.execute("DELETE FROM SyncCheckpoint")
+    conn.commit()
+    assert compact_change_log(conn, keep_last=0) > 0
+
+    result = sync.sync()
+
+    assert result.full_copy
+    assert target.conn.execute("SELECT level FROM Players WHERE id = 1").fetchone() == (50,)
+    assert sync.verify().ok
+
+
+def test_verify_detects_missing_extra_and_different_rows(source, target):
+    db_path, conn = source
+    sync = ReplicaSync(db_path, target)
+    sync.sync()
+
+    columns = [row[1] for row in target.conn.execute("PRAGMA table_info(Players)")]
+    extra = dict(zip(columns, source_rows(conn, "Players", columns)[0]), id=1000)
+    with target.conn:
+        target.conn.execute("DELETE FROM Players WHERE id = 2")
+        target.conn.execute(f"INSERT INTO Players ({', '.join(extra)}) VALUES ({', '.join('?' for _ in extra)})",
+                            list(extra.values()))
+        target.conn.execute("UPDATE Players SET level = -1 WHERE id = 7")
+
+    result = sync.verify()
+
+    assert not result.ok
+    assert result.mismatches["Players"] == {"missing": [2], "extra": [1000], "different": [7]}
+    assert "Activity" not in result.mismatches
+
+
+def test_verify_skips_changes_not_yet_shipped(source, target):
+    db_path, conn = source
+    sync = ReplicaSync(db_path, target)
+    sync.sync()
+
+    conn.execute("UPDATE Players SET level = 77 WHERE id = 8")
+    conn.commit()
+
+    assert sync.verify().ok
@@ -0,0 +1,199 @@
+import sqlite3
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+
+from PyQt6.QtCore import QObject, pyqtSignal
+
+from config.cfg import Config, ConnectionProfile
+from data.sqlite.attendance import events_table
+from data.sqlite.change_log import physical_table
+from data.sqlite.compact_schema import CompactSchemaMigration
+from data.sqlite.sort_keys import register_collation
+from utils.attendance import AttendanceReport
+from utils.database import DatabaseManager
+
+
+class AnalyticsSnapshot:
+    """Сведения о текущем снимке БД в памяти"""
+
+    def __init__(self, db_path, seq, elapsed_ms, pages, page_size):
+        self.db_path = db_path
+        self.seq = seq  # последний seq ChangeLog, вошедший в снимок
+        self.taken_at = datetime.now()
+        self.elapsed_ms = elapsed_ms
+        self.size_bytes = pages * page_size
+        self.pending_changes = 0  # записей журнала после снимка (на момент последней проверки)
+
+
+class AnalyticsReplica(QObject):
+    """Снимок БД гильдии в памяти для тяжелых отчетов
+
+    Файл БД копируется в :memory: через backup API одним шагом (в режиме
+    WAL копия читается из одного снимка и не мешает записи), в копии
+    строятся индексы под отчеты, после чего она переводится в query_only.
+    Снимок и все отчеты живут в одном фоновом потоке: агрегаты не занимают
+    ни GUI-поток, ни соединение, через которое идет редактирование.
+
+    Снимок обновляется по запросу (refresh) или перед отчетом, если в
+    ChangeLog источника с момента снимка появилось refresh_after записей
+    (или активной стала другая гильдия).
+    """
+
+    report_ready = pyqtSignal(str, object, object)  # отчет, заголовки, строки
+    refreshed = pyqtSignal(object)  # AnalyticsSnapshot
+    failed = pyqtSignal(str)
+
+    DEFAULT_SETTINGS = {
+        "refresh_after": 500,
+        "attendance_weeks": 8
+    }
+
+    REPORTS = {
+        "class_damage": {
+            "title": "Средний урон по классам",
+            "headers": ["Класс", "Игроков", "Средний урон", "Макс. урон", "Средний уровень"],
+            "query": """
+                SELECT
+                    COALESCE(c.name, '—') as class_name,
+                    COUNT(p.id) as players,
+                    CAST(ROUND(AVG(COALESCE(a.weekly_damage, 0))) AS INTEGER) as avg_damage,
+                    MAX(COALESCE(a.weekly_damage, 0)) as max_damage,
+                    ROUND(AVG(p.level), 1) as avg_level
+                FROM Players p
+                LEFT JOIN Classes c ON c.id = p.class_id
+                LEFT JOIN Activity a ON a.player_id = p.id
+                GROUP BY p.class_id
+                ORDER BY avg_damage DESC
+            """
+        },
+        "attendance": {
+            "title": "Посещаемость событий",
+            "headers": AttendanceReport.HEADERS,
+            # Серии считаются не SQL, а над массивами (см. AttendanceReport)
+            "build": lambda conn, settings: AttendanceReport.build(
+                conn, settings["attendance_weeks"], CompactSchemaMigration.is_compact(conn))
+        },
+        "contribution": {
+            "title": "Рейтинг вклада в гильдию",
+            "headers": ["Место", "Никнейм", "Тег", "Ресурсы", "Помощь", "Ранг"],
+            "query": """
+                SELECT
+                    RANK() OVER (ORDER BY gc.resources_contributed DESC) as place,
+                    p.nickname,
+                    p.tag,
+                    gc.resources_contributed,
+                    gc.help_count,
+                    gc.leadership_rank
+                FROM GuildContribution gc
+                JOIN Players p ON p.id = gc.player_id
+                ORDER BY place
+                LIMIT 100
+            """
+        }
+    }
+
+    _instance = None
+
+    def __init__(self):
+        super().__init__()
+        self.settings = dict(self.DEFAULT_SETTINGS)
+        self.settings.update(Config().get("analytics"))
+        self.snapshot = None
+        self._conn = None
+        self._executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="analytics")
+
+    @classmethod
+    def instance(cls):
+        if cls._instance is None:
+            cls._instance = cls()
+        return cls._instance
+
+    def refresh(self):
+        """Пересоздание снимка активной БД в фоне"""
+        self._executor.submit(self._guarded, self._refresh, DatabaseManager.active_db_path)
+
+    def request(self, report):
+        """Постановка отчета в очередь; результат придет сигналом report_ready"""
+        self._executor.submit(self._guarded, self._run_report, report, DatabaseManager.active_db_path)
+
+    def shutdown(self):
+        """Остановка потока и освобождение памяти снимка"""
+        self._executor.submit(self._close)
+        self._executor.shutdown(wait=False, cancel_futures=True)
+
+    def _guarded(self, function, *args):
+        try:
+            function(*args)
+        except Exception as e:
+            print(f"Ошибка аналитики: {e}")
+            self.failed.emit(str(e))
+
+    def _run_report(self, report, db_path):
+        if self._is_stale(db_path):
+            self._refresh(db_path)
+        definition = self.REPORTS[report]
+        if "build" in definition:
+            rows = definition["build"](self._conn, self.settings)
+        else:
+            rows = self._conn.execute(definition["query"]).fetchall()
+        self.report_ready.emit(report, definition["headers"], rows)
+
+    def _is_stale(self, db_path):
+        """Нет снимка, сменилась гильдия или накопилось refresh_after изменений"""
+        if self._conn is None or self.snapshot.db_path != db_path:
+            return True
+        self.snapshot.pending_changes = self._source_seq(db_path) - self.snapshot.seq
+        return self.snapshot.pending_changes >= self.settings["refresh_after"]
+
+    @staticmethod
+    def _source_seq(db_path):
+        # Чтение по первичному ключу журнала: мгновенно и без блокировки писателя в WAL
+        source = ConnectionProfile.active().connect(db_path, read_only=True)
+        try:
+            return source.execute("SELECT COALESCE(MAX(seq), 0) FROM ChangeLog").fetchone()[0]
+        finally:
+            source.close()
+
+    def _refresh(self, db_path):
+        started = time.perf_counter()
+        source = ConnectionProfile.active().connect(db_path, read_only=True)
+        memory = sqlite3.connect(":memory:", check_same_thread=False)
+        try:
+            source.backup(memory)
+        finally:
+            source.close()
+
+        register_collation(memory)
+        self._create_report_indexes(memory)
+        memory.execute("ANALYZE")
+        memory.execute("PRAGMA query_only = ON")
+
+        seq = memory.execute("SELECT COALESCE(MAX(seq), 0) FROM ChangeLog").fetchone()[0]
+        pages = memory.execute("PRAGMA page_count").fetchone()[0]
+        page_size = memory.execute("PRAGMA page_size").fetchone()[0]
+
+        self._close()
+        self._conn = memory
+        self.snapshot = AnalyticsSnapshot(db_path, seq, (time.perf_counter() - started) * 1000, pages, page_size)
+        self.refreshed.emit(self.snapshot)
+
+    @staticmethod
+    def _create_report_indexes(conn):
+        """Индексы, нужные только отчетам (в рабочей БД они замедляли бы запись)"""
+        compact = CompactSchemaMigration.is_compact(conn)
+        players = physical_table("Players", compact)
+        contribution = physical_table("GuildContribution", compact)
+        events, event_date = events_table(compact)
+        conn.executescript(f"""
+            CREATE INDEX IF NOT EXISTS idx_report_players_class ON {players} (class_id);
+            CREATE INDEX IF NOT EXISTS idx_report_activity_damage ON Activity (player_id, weekly_damage);
+            CREATE INDEX IF NOT EXISTS idx_report_events_attendance ON {events} (player_id, {event_date}, participated);
+            CREATE INDEX IF NOT EXISTS idx_report_contribution_rank
+                ON {contribution} (resources_contributed DESC, player_id);
+        """)
+
+    def _close(self):
+        if self._conn is not None:
+            self._conn.close()
+            self._conn = None
@@ -0,0 +1,252 @@
+from datetime import date, timedelta
+
+try:
+    import numpy as np
+except ImportError:  # NumPy необязателен: без него отчет считается циклом по строкам
+    np = None
+
+from data.sqlite.attendance import events_table
+from data.sqlite.compact_schema import to_day_number
+from utils.database import DatabaseManager
+
+
+def window_start(weeks, compact=False, today=None):
+    """Начало окна из weeks последних недель: ISO-дата или номер дня (компактная схема)"""
+    start = ((today or date.today()) - timedelta(weeks=weeks)).isoformat()
+    return to_day_number(start) if compact else start
+
+
+def streaks(flags):
+    """Серии по флагам посещения одного игрока в порядке дат
+
+    Returns:
+        tuple: (текущая серия посещений, самая длинная серия, пропусков подряд в конце)
+    """
+    current = longest = missed = 0
+    for flag in flags:
+        if flag:
+            current += 1
+            missed = 0
+            longest = max(longest, current)
+        else:
+            current = 0
+            missed += 1
+    return current, longest, missed
+
+
+def attendance_below_condition(percent, weeks, id_column="id", compact=False):
+    """SQL-условие расширенного поиска: посещаемость ниже percent % за weeks недель
+
+    Диапазон по дате читается по индексу (дата, player_id, participated)
+    без обращения к самой таблице. Игроки без событий в окне не попадают.
+    """
+    events, date_column = events_table(compact)
+    start = window_start(weeks, compact)
+    start = start if compact else f"'{start}'"
+    return (f"{id_column} IN (SELECT player_id FROM {events} WHERE {date_column} >= {start} "
+            f"GROUP BY player_id HAVING 100.0 * COALESCE(SUM(participated), 0) / COUNT(*) < {float(percent)})")
+
+
+def missed_last_condition(count, id_column="id", compact=False):
+    """SQL-условие расширенного поиска: пропустил последние count событий подряд"""
+    events, date_column = events_table(compact)
+    count = int(count)
+    return (f"{id_column} IN (SELECT player_id FROM ("
+            f"SELECT player_id, participated, ROW_NUMBER() OVER "
+            f"(PARTITION BY player_id ORDER BY {date_column} DESC, id DESC) as position FROM {events}) "
+            f"WHERE position <= {count} GROUP BY player_id "
+            f"HAVING COUNT(*) = {count} AND COALESCE(SUM(participated), 0) = 0)")
+
+
+class AttendanceReport:
+    """Посещаемость всей гильдии за один проход по событиям
+
+    На входе — события, отсортированные по (игрок, дата): id игрока, флаг
+    посещения и признак попадания в окно. С NumPy все считается над
+    массивами: группы игроков находятся по смене id, суммы — через
+    add.reduceat, длина текущей серии в каждой позиции — как расстояние до
+    последнего сброса (пропуска или начала группы), найденного
+    maximum.accumulate. Без NumPy — тот же результат циклом (streaks).
+    """
+
+    HEADERS = ["Никнейм", "Тег", "Событий", "Посетил", "Посещаемость, %", "За окно, %",
+               "Серия", "Лучшая серия", "Пропусков подряд"]
+
+    QUERY = """
+        SELECT e.player_id, COALESCE(e.participated, 0), e.{date} >= ?
+        FROM {events} e
+        WHERE e.player_id IS NOT NULL
+        ORDER BY e.player_id, e.{date}, e.id
+    """
+
+    @classmethod
+    def compute(cls, player_ids, flags, in_window):
+        """Показатели по игрокам
+
+        Returns:
+            dict: id игрока -> (событий, посещений, событий в окне, посещений в окне,
+                  текущая серия, лучшая серия, пропусков подряд)
+        """
+        if not len(player_ids):
+            return {}
+        if np is None:
+            return cls._compute_python(player_ids, flags, in_window)
+
+        players = np.asarray(player_ids, dtype=np.int64)
+        attended = np.asarray(flags, dtype=bool)
+        window = np.asarray(in_window, dtype=bool)
+        positions = np.arange(len(players))
+
+        group_start = np.empty(len(players), dtype=bool)
+        group_start[0] = True
+        group_start[1:] = players[1:] != players[:-1]
+        starts = np.flatnonzero(group_start)
+        ends = np.append(starts[1:], len(players)) - 1
+
+        totals = np.diff(np.append(starts, len(players)))
+        attended_counts = np.add.reduceat(attended.astype(np.int64), starts)
+        window_counts = np.add.reduceat(window.astype(np.int64), starts)
+        window_attended = np.add.reduceat((window & attended).astype(np.int64), starts)
+
+        current = cls._run_lengths(attended, group_start, positions)
+        missed = cls._run_lengths(~attended, group_start, positions)
+        longest = np.maximum.reduceat(current, starts)
+
+        return {
+            int(players[start]): (int(totals[i]), int(attended_counts[i]), int(window_counts[i]),
+                                  int(window_attended[i]), int(current[ends[i]]), int(longest[i]),
+                                  int(missed[ends[i]]))
+            for i, start in enumerate(starts)
+        }
+
+    @staticmethod
+    def _run_lengths(hits, group_start, positions):
+        """Длина серии подряд идущих hits, заканчивающейся в каждой позиции"""
+        # Сброс: позиция без попадания; в начале группы серия отсчитывается от позиции перед ней
+        resets = np.where(~hits, positions, np.where(group_start, positions - 1, -1))
+        last_reset = np.maximum.accumulate(resets)
+        return np.where(hits, positions - last_reset, 0)
+
+    @staticmethod
+    def _compute_python(player_ids, flags, in_window):
+        groups = {}
+        for player_id, flag, window in zip(player_ids, flags, in_window):
+            groups.setdefault(player_id, []).append((flag, window))
+
+        result = {}
+        for player_id, events in groups.items():
+            player_flags = [flag for flag, _ in events]
+            current, longest, missed = streaks(player_flags)
+            result[player_id] = (len(events), sum(player_flags), sum(1 for _, window in events if window),
+                                 sum(1 for flag, window in events if flag and window), current, longest, missed)
+        return result
+
+    @classmethod
+    def build(cls, conn, weeks=8, compact=False):
+        """Строки отчета для соединения sqlite3 (например, снимка AnalyticsReplica)"""
+        events, date_column = events_table(compact)
+        rows = conn.execute(cls.QUERY.format(events=events, date=date_column),
+                            (window_start(weeks, compact),)).fetchall()
+        player_ids, flags, in_window = zip(*rows) if rows else ((), (), ())
+        stats = cls.compute(player_ids, flags, in_window)
+
+        report = []
+        for player_id, nickname, tag in conn.execute("SELECT id, nickname, tag FROM Players ORDER BY id"):
+            total, attended, window_total, window_attended, current, longest, missed = \
+                stats.get(player_id, (0, 0, 0, 0, 0, 0, 0))
+            report.append((
+                nickname, tag, total, attended,
+                round(100.0 * attended / total, 1) if total else None,
+                round(100.0 * window_attended / window_total, 1) if window_total else None,
+                current, longest, missed
+            ))
+        report.sort(key=lambda row: (row[5] is None, -(row[5] or 0), -row[3]))
+        return report
+
+
+class PlayerAttendance:
+    """Посещаемость одного игрока из кэша PlayerAttendance (соединение QtSql)
+
+    Устаревшая или отсутствующая строка кэша пересчитывается по истории
+    игрока (чтение по индексу (player_id, дата)) и записывается обратно.
+    """
+
+    CACHE_QUERY = """
+        SELECT total, attended, current_streak, longest_streak, missed_streak
+        FROM PlayerAttendance
+        WHERE player_id = ? AND stale = 0
+    """
+
+    WINDOW_QUERY = """
+        SELECT COUNT(*), COALESCE(SUM(participated), 0)
+        FROM {events}
+        WHERE player_id = ? AND {date} >= ?
+    """
+
+    def __init__(self, db, player_id, compact=False):
+        self.db = db
+        self.player_id = player_id
+        self.events, self.date_column = events_table(compact)
+        self.compact = compact
+
+        self.total = self.attended = 0
+        self.current_streak = self.longest_streak = self.missed_streak = 0
+        self._load()
+
+    def window_rate(self, weeks):
+        """Доля посещений за weeks последних недель (None — событий не было)"""
+        query = DatabaseManager.query(self.db)
+        query.prepare(self.WINDOW_QUERY.format(events=self.events, date=self.date_column))
+        query.addBindValue(self.player_id)
+        query.addBindValue(window_start(weeks, self.compact))
+        if not query.exec() or not query.next():
+            print(f"Ошибка расчета посещаемости: {query.lastError().text()}")
+            return None
+        total, attended = query.value(0), query.value(1)
+        return attended / total if total else None
+
+    def summary_text(self, weeks=8):
+        if not self.total:
+            return ""
+        rate = self.window_rate(weeks)
+        window = f"за {weeks} нед. {rate:.0%}, " if rate is not None else ""
+        return (f"{window}серия {self.current_streak}, лучшая {self.longest_streak}, "
+                f"пропусков подряд {self.missed_streak}")
+
+    def _load(self):
+        query = DatabaseManager.query(self.db)
+        query.prepare(self.CACHE_QUERY)
+        query.addBindValue(self.player_id)
+        if query.exec() and query.next():
+            (self.total, self.attended, self.current_streak,
+             self.longest_streak, self.missed_streak) = (query.value(i) for i in range(5))
+            return
+        self._recompute()
+
+    def _recompute(self):
+        """Пересчет строки кэша по всей истории игрока"""
+        query = DatabaseManager.query(self.db)
+        query.prepare(f"SELECT COALESCE(participated, 0) FROM {self.events} "
+                      f"WHERE player_id = ? ORDER BY {self.date_column}, id")
+        query.addBindValue(self.player_id)
+        if not query.exec():
+            print(f"Ошибка загрузки посещаемости: {query.lastError().text()}")
+            return
+
+        flags = []
+        while query.next():
+            flags.append(query.value(0))
+        self.total, self.attended = len(flags), sum(flags)
+        self.current_streak, self.longest_streak, self.missed_streak = streaks(flags)
+
+        save = DatabaseManager.query(self.db)
+        save.prepare(f"""
+            INSERT OR REPLACE INTO PlayerAttendance
+                (player_id, total, attended, current_streak, longest_streak, missed_streak, last_event, stale)
+            VALUES (?, ?, ?, ?, ?, ?, (SELECT MAX({self.date_column}) FROM {self.events} WHERE player_id = ?), 0)
+        """)
+        for value in (self.player_id, self.total, self.attended, self.current_streak,
+                      self.longest_streak, self.missed_streak, self.player_id):
+            save.addBindValue(value)
+        if not save.exec():
+            print(f"Ошибка сохранения посещаемости: {save.lastError().text()}")
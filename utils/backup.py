@@ -0,0 +1,298 @@
+import json
+import sqlite3
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+from pathlib import Path
+
+from PyQt6.QtCore import QObject, QTimer, pyqtSignal
+
+from config.cfg import ConnectionProfile
+
+
+class _TooManyRestarts(Exception):
+    """Копию перезапускали слишком часто (постоянная запись в источник)"""
+
+
+class BackupResult:
+    """Итог одного резервного копирования"""
+
+    def __init__(self, source, path=None):
+        self.source = source
+        self.path = path
+        self.started = datetime.now()
+        self.pages = 0
+        self.page_size = 0
+        self.steps = 0
+        self.restarts = 0
+        self.elapsed_ms = 0.0
+        # Время шагов, пока источник заблокирован на чтение (запись других соединений ждет)
+        self.max_pause_ms = 0.0
+        self.total_pause_ms = 0.0
+        self.integrity = None
+        self.error = None
+
+    @property
+    def ok(self):
+        return self.error is None and self.integrity == "ok"
+
+    @property
+    def size_bytes(self):
+        return self.pages * self.page_size
+
+    @property
+    def throughput_mb_s(self):
+        """Скорость копирования с учетом пауз между шагами"""
+        if not self.elapsed_ms:
+            return 0.0
+        return self.size_bytes / (1024 * 1024) / (self.elapsed_ms / 1000)
+
+
+class BackupManager(QObject):
+    """Онлайн-резервное копирование файлов БД через backup API SQLite
+
+    Копирование идет в фоновом потоке по pages_per_step страниц за шаг.
+    Блокировка чтения источника держится только внутри шага, а между шагами
+    поток засыпает на step_pause_ms, поэтому запись из окон приложения
+    (детали игрока, справочники) не ждет конца копирования. Если источник
+    изменился другим соединением, SQLite сам начинает копию заново.
+
+    Готовая копия проверяется PRAGMA integrity_check и только после этого
+    получает постоянное имя; хранится keep последних копий каждой БД.
+    Копирование запускается вручную (backup_now) или по расписанию.
+    """
+
+    progress = pyqtSignal(str, int, int)  # источник, осталось страниц, всего страниц
+    finished = pyqtSignal(object)  # BackupResult
+    failed = pyqtSignal(object)  # BackupResult с текстом ошибки
+
+    settings_path = "data/backup_settings.json"
+
+    DEFAULT_SETTINGS = {
+        "backup_dir": "backups",
+        "keep": 5,
+        "interval_minutes": 60,
+        "scheduled": False,
+        "pages_per_step": 256,
+        "step_pause_ms": 20,
+        "max_restarts": 3
+    }
+
+    # Сколько последних результатов держать для окна резервных копий
+    HISTORY_SIZE = 50
+
+    _instance = None
+
+    def __init__(self):
+        super().__init__()
+        self.settings = dict(self.DEFAULT_SETTINGS)
+        self.history = []
+        self.running = set()
+        self.sources = None  # функция, возвращающая пути БД для копирования по расписанию
+
+        self._executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="backup")
+        self._timer = QTimer(self)
+        self._timer.timeout.connect(self._on_schedule)
+
+        self.finished.connect(self._remember)
+        self.failed.connect(self._remember)
+        self.load_settings()
+
+    @classmethod
+    def instance(cls):
+        if cls._instance is None:
+            cls._instance = cls()
+        return cls._instance
+
+    def load_settings(self):
+        """Загрузка настроек из файла"""
+        file = Path(self.settings_path)
+        if not file.exists():
+            return
+        try:
+            data = json.loads(file.read_text(encoding="utf-8"))
+            self.settings.update({key: data[key] for key in self.DEFAULT_SETTINGS if key in data})
+        except (OSError, ValueError) as e:
+            print(f"Ошибка чтения настроек резервного копирования: {e}")
+
+    def save_settings(self):
+        """Сохранение настроек в файл"""
+        try:
+            file = Path(self.settings_path)
+            file.parent.mkdir(parents=True, exist_ok=True)
+            file.write_text(json.dumps(self.settings, ensure_ascii=False, indent=2), encoding="utf-8")
+        except OSError as e:
+            print(f"Ошибка сохранения настроек резервного копирования: {e}")
+
+    def start_schedule(self, interval_minutes=None):
+        """Включение копирования по расписанию"""
+        if interval_minutes is not None:
+            self.settings["interval_minutes"] = max(1, int(interval_minutes))
+        self.settings["scheduled"] = True
+        self._timer.start(self.settings["interval_minutes"] * 60 * 1000)
+
+    def stop_schedule(self):
+        """Выключение копирования по расписанию"""
+        self.settings["scheduled"] = False
+        self._timer.stop()
+
+    def apply_schedule(self):
+        """Запуск или остановка таймера по сохраненным настройкам"""
+        if self.settings["scheduled"]:
+            self.start_schedule()
+        else:
+            self.stop_schedule()
+
+    def backup_now(self, db_paths):
+        """Постановка копирования в очередь фонового потока
+
+        Args:
+            db_paths: Путь к файлу БД или список путей
+        """
+        if isinstance(db_paths, str):
+            db_paths = [db_paths]
+        for db_path in db_paths:
+            if db_path in self.running:
+                continue
+            self.running.add(db_path)
+            self._executor.submit(self._run, db_path, dict(self.settings))
+
+    def backups_of(self, db_path):
+        """Существующие копии БД, от новых к старым"""
+        return self._list_backups(self.settings["backup_dir"], db_path)
+
+    @staticmethod
+    def _list_backups(backup_dir, db_path):
+        # Имя копии: <имя БД>-ГГГГММДД-ЧЧММСС.db
+        pattern = f"{Path(db_path).stem}-{'[0-9]' * 8}-{'[0-9]' * 6}.db"
+        return sorted(Path(backup_dir).glob(pattern), reverse=True)
+
+    def shutdown(self):
+        """Остановка расписания; начатое копирование дописывается в фоне"""
+        self._timer.stop()
+        self._executor.shutdown(wait=False, cancel_futures=True)
+
+    def _on_schedule(self):
+        if self.sources is not None:
+            self.backup_now(self.sources())
+
+    def _remember(self, result):
+        self.running.discard(result.source)
+        self.history.append(result)
+        del self.history[:-self.HISTORY_SIZE]
+
+    def _run(self, db_path, settings):
+        folder = Path(settings["backup_dir"])
+        stamp = datetime.now().strftime("%Y%m%d-%H%M%S")
+        target = folder / f"{Path(db_path).stem}-{stamp}.db"
+        temp = target.with_suffix(".db.part")
+        result = BackupResult(db_path, target)
+
+        try:
+            if not Path(db_path).exists():
+                raise FileNotFoundError(f"Файл БД не найден: {db_path}")
+            folder.mkdir(parents=True, exist_ok=True)
+
+            started = time.perf_counter()
+            self._copy(db_path, temp, settings, result)
+            result.elapsed_ms = (time.perf_counter() - started) * 1000
+
+            # Копия получает постоянное имя только после проверки целостности
+            result.integrity = self._check_integrity(temp)
+            if result.integrity != "ok":
+                raise sqlite3.DatabaseError(f"Проверка целостности не пройдена: {result.integrity}")
+
+            temp.replace(target)
+            self._rotate(db_path, settings)
+        except Exception as e:
+            result.error = str(e)
+            print(f"Ошибка резервного копирования {db_path}: {e}")
+            temp.unlink(missing_ok=True)
+            self.failed.emit(result)
+            return
+
+        self.finished.emit(result)
+
+    def _copy(self, db_path, temp, settings, result):
+        """Пошаговое копирование с паузами между шагами
+
+        В режиме WAL копия читается из одного снимка (открытая транзакция
+        чтения): писатели ей не мешают, и она не начинается заново. В режиме
+        журнала отката каждое изменение другим соединением перезапускает
+        копию; после max_restarts перезапусков копия тоже читается из одного
+        снимка, а писатели ждут только ее окончания — иначе при постоянной
+        записи копирование не завершилось бы.
+        """
+        source = ConnectionProfile.active().connect(db_path, read_only=True)
+        try:
+            if source.execute("PRAGMA journal_mode").fetchone()[0].lower() == "wal":
+                self._pin_snapshot(source)
+
+            try:
+                self._backup_steps(source, db_path, temp, settings, result, stop_on_restarts=True)
+            except _TooManyRestarts:
+                self._pin_snapshot(source)
+                self._backup_steps(source, db_path, temp, settings, result, stop_on_restarts=False)
+        finally:
+            source.close()
+
+    @staticmethod
+    def _pin_snapshot(source):
+        """Открытие транзакции чтения: все шаги копии видят одно состояние БД"""
+        source.execute("BEGIN")
+        source.execute("SELECT COUNT(*) FROM sqlite_master").fetchone()
+
+    def _backup_steps(self, source, db_path, temp, settings, result, stop_on_restarts):
+        # Временный файл проверяется целиком после копирования, журнал ему не нужен
+        temp.unlink(missing_ok=True)
+        target = sqlite3.connect(str(temp))
+        target.execute("PRAGMA journal_mode = OFF")
+        pause = settings["step_pause_ms"] / 1000
+        max_restarts = settings["max_restarts"]
+        step_started = time.perf_counter()
+        previous_remaining = None
+
+        def on_step(status, remaining, total):
+            nonlocal step_started, previous_remaining
+            step_ms = (time.perf_counter() - step_started) * 1000
+            result.steps += 1
+            result.total_pause_ms += step_ms
+            result.max_pause_ms = max(result.max_pause_ms, step_ms)
+            result.pages = total
+
+            # Остаток вырос — источник изменили, SQLite начал копию заново
+            if previous_remaining is not None and remaining > previous_remaining:
+                result.restarts += 1
+                if stop_on_restarts and result.restarts > max_restarts:
+                    raise _TooManyRestarts()
+            previous_remaining = remaining
+            self.progress.emit(db_path, remaining, total)
+
+            # Между шагами блокировка источника снята: даем писать другим соединениям
+            time.sleep(pause)
+            step_started = time.perf_counter()
+
+        try:
+            source.backup(target, pages=settings["pages_per_step"], progress=on_step)
+            result.page_size = target.execute("PRAGMA page_size").fetchone()[0]
+            result.pages = target.execute("PRAGMA page_count").fetchone()[0]
+        finally:
+            target.close()
+
+    @staticmethod
+    def _check_integrity(path):
+        conn = sqlite3.connect(str(path))
+        try:
+            rows = conn.execute("PRAGMA integrity_check").fetchall()
+        finally:
+            conn.close()
+        return "\n".join(str(row[0]) for row in rows)
+
+    def _rotate(self, db_path, settings):
+        """Удаление копий сверх settings["keep"] (самые старые)"""
+        backups = self._list_backups(settings["backup_dir"], db_path)
+        for old in backups[max(1, settings["keep"]):]:
+            try:
+                old.unlink()
+            except OSError as e:
+                print(f"Ошибка удаления старой копии {old}: {e}")
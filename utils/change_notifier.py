@@ -0,0 +1,121 @@
+from PyQt6.QtCore import QObject, QTimer, pyqtSignal
+from PyQt6.QtSql import QSqlDatabase
+
+from utils.database import DatabaseManager
+
+
+class ChangeNotifier(QObject):
+    """Уведомления об изменениях, сделанных другими экземплярами приложения
+
+    Раз в interval_ms читается PRAGMA data_version своего соединения: это
+    счетчик в памяти SQLite, который меняется только после коммита другого
+    соединения, поэтому опрос не трогает таблицы. Когда он изменился,
+    из ChangeLog читаются записи после последнего увиденного seq (по
+    первичному ключу), и подписчики получают множество id игроков.
+
+    Опрос идет по собственному соединению (копии основного): на основном
+    часто остается недочитанный запрос (QSqlTableModel подгружает строки
+    порциями), и пока он открыт, соединение видит старый снимок БД —
+    data_version не меняется, и чужие изменения не замечаются.
+    """
+
+    players_changed = pyqtSignal(object)  # множество id игроков
+    # Изменений больше, чем имеет смысл перечитывать по одному — нужна полная перезагрузка
+    reload_required = pyqtSignal()
+
+    interval_ms = 500
+    MAX_CHANGES = 2000
+    CONNECTION_NAME = "change_notifier"
+
+    def __init__(self, db, parent=None):
+        super().__init__(parent)
+        self.db = db
+        self.conn = None  # собственное соединение для опроса
+        self.last_seq = 0
+        self._data_version = None
+        self._enabled = False
+
+        self._timer = QTimer(self)
+        self._timer.timeout.connect(self.poll)
+
+    def start(self):
+        """Начало отслеживания с текущего конца журнала"""
+        self._open_connection()
+        self._enabled = self.conn is not None and self._has_change_log()
+        if not self._enabled:
+            return
+        self.last_seq = self._scalar("SELECT COALESCE(MAX(seq), 0) FROM ChangeLog") or 0
+        self._data_version = self._scalar("PRAGMA data_version")
+        self._timer.start(self.interval_ms)
+
+    def stop(self):
+        self._timer.stop()
+        self._close_connection()
+
+    def set_database(self, db):
+        """Переключение на другое соединение (смена гильдии)"""
+        self.stop()
+        self.db = db
+        self.start()
+
+    def poll(self):
+        """Проверка счетчика версии и чтение новых записей журнала"""
+        version = self._scalar("PRAGMA data_version")
+        if version is None or version == self._data_version:
+            return
+        self._data_version = version
+
+        query = DatabaseManager.query(self.conn)
+        query.prepare("SELECT seq, player_id, table_name FROM ChangeLog WHERE seq > ? ORDER BY seq LIMIT ?")
+        query.addBindValue(self.last_seq)
+        query.addBindValue(self.MAX_CHANGES + 1)
+        if not query.exec():
+            print(f"Ошибка чтения журнала изменений: {query.lastError().text()}")
+            return
+
+        player_ids = set()
+        count = 0
+        classes_changed = False
+        while query.next():
+            count += 1
+            self.last_seq = query.value(0)
+            if query.value(1) is not None:
+                player_ids.add(query.value(1))
+            # Название класса показано в строках всех его игроков
+            classes_changed = classes_changed or query.value(2) == "Classes"
+
+        if count > self.MAX_CHANGES or classes_changed:
+            # Остаток журнала не нужен: полная перезагрузка покажет все сразу
+            self.last_seq = self._scalar("SELECT COALESCE(MAX(seq), 0) FROM ChangeLog") or self.last_seq
+            self.reload_required.emit()
+        elif player_ids:
+            self.players_changed.emit(player_ids)
+
+    def _open_connection(self):
+        """Отдельное соединение с тем же файлом БД и профилем, что у основного"""
+        self._close_connection()
+        conn = QSqlDatabase.cloneDatabase(self.db, self.CONNECTION_NAME)
+        if not conn.open():
+            print(f"Ошибка подключения для отслеживания изменений: {conn.lastError().text()}")
+            conn = None
+            QSqlDatabase.removeDatabase(self.CONNECTION_NAME)
+            return
+        DatabaseManager.apply_profile(conn)
+        self.conn = conn
+
+    def _close_connection(self):
+        if self.conn is None:
+            return
+        self.conn.close()
+        # removeDatabase требует, чтобы ссылок на соединение не осталось
+        self.conn = None
+        QSqlDatabase.removeDatabase(self.CONNECTION_NAME)
+
+    def _has_change_log(self):
+        return bool(self._scalar("SELECT COUNT(*) FROM sqlite_master WHERE type = 'table' AND name = 'ChangeLog'"))
+
+    def _scalar(self, query_text):
+        query = DatabaseManager.query(self.conn)
+        if query.exec(query_text) and query.next():
+            return query.value(0)
+        return None
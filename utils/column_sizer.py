@@ -0,0 +1,161 @@
+import json
+from pathlib import Path
+
+from PyQt6.QtCore import QAbstractProxyModel, Qt
+
+
+class ColumnWidthCache:
+    """Кэш ширин колонок по ключу вида "<окно>/<режим или таблица>"
+
+    Ширины хранятся в JSON-файле и переживают перезапуск приложения.
+    """
+
+    path = "data/column_widths.json"
+
+    _instance = None
+
+    def __init__(self):
+        self.widths = {}
+        self._dirty = False
+        self.load()
+
+    @classmethod
+    def instance(cls):
+        if cls._instance is None:
+            cls._instance = cls()
+        return cls._instance
+
+    def load(self):
+        """Загрузка ширин из файла"""
+        file = Path(self.path)
+        if not file.exists():
+            return
+        try:
+            data = json.loads(file.read_text(encoding="utf-8"))
+            self.widths = {key: {int(column): width for column, width in columns.items()}
+                           for key, columns in data.items()}
+        except (OSError, ValueError, AttributeError) as e:
+            print(f"Ошибка чтения ширин колонок: {e}")
+
+    def save(self):
+        """Сохранение ширин в файл (только если были изменения)"""
+        if not self._dirty:
+            return
+        try:
+            file = Path(self.path)
+            file.parent.mkdir(parents=True, exist_ok=True)
+            file.write_text(json.dumps(self.widths, ensure_ascii=False, indent=2), encoding="utf-8")
+            self._dirty = False
+        except OSError as e:
+            print(f"Ошибка сохранения ширин колонок: {e}")
+
+    def get(self, key):
+        return self.widths.get(key)
+
+    def put(self, key, widths):
+        if widths and self.widths.get(key) != widths:
+            self.widths[key] = dict(widths)
+            self._dirty = True
+
+
+class ColumnSizer:
+    """Подбор ширины колонок без обхода всех строк
+
+    В отличие от resizeColumnsToContents измеряются только заголовок,
+    ограниченная выборка строк и самые длинные значения, которые модель
+    отметила при загрузке (widest_values). Результат кэшируется по ключу,
+    поэтому стоимость не зависит от числа строк в таблице.
+    """
+
+    SAMPLE_ROWS = 100
+    MIN_WIDTH = 40
+    MAX_WIDTH = 350
+    PADDING = 16
+
+    @staticmethod
+    def fit_columns(table_view, key=None):
+        """Установка ширин колонок
+
+        Args:
+            table_view: QTableView
+            key: Ключ кэша; без ключа ширины только измеряются
+        """
+        model = table_view.model()
+        if model is None:
+            return
+
+        cache = ColumnWidthCache.instance()
+        widths = cache.get(key) if key else None
+        if widths is None:
+            widths = ColumnSizer.measure(table_view)
+        else:
+            # Кэш — нижняя граница; значения длиннее известных расширяют колонку
+            widths = dict(widths)
+            for column, width in ColumnSizer._widest_widths(table_view).items():
+                widths[column] = max(widths.get(column, 0), width)
+
+        for column, width in widths.items():
+            if column < model.columnCount():
+                table_view.setColumnWidth(column, width)
+
+        if key:
+            cache.put(key, widths)
+
+    @staticmethod
+    def measure(table_view):
+        """Измерение ширин по заголовку и выборке строк"""
+        model = table_view.model()
+        header = table_view.horizontalHeader()
+        metrics = table_view.fontMetrics()
+
+        widest = ColumnSizer._widest_widths(table_view)
+        rows = ColumnSizer._sample_rows(model.rowCount())
+
+        widths = {}
+        for column in range(model.columnCount()):
+            if table_view.isColumnHidden(column):
+                continue
+
+            width = header.sectionSizeFromContents(column).width()
+            for row in rows:
+                value = model.data(model.index(row, column), Qt.ItemDataRole.DisplayRole)
+                if value is not None:
+                    width = max(width, metrics.horizontalAdvance(str(value)) + ColumnSizer.PADDING)
+            width = max(width, widest.get(column, 0))
+
+            widths[column] = max(ColumnSizer.MIN_WIDTH, min(width, ColumnSizer.MAX_WIDTH))
+        return widths
+
+    @staticmethod
+    def remember(table_view, key):
+        """Сохранение текущих ширин (включая измененные пользователем) в кэш"""
+        model = table_view.model()
+        if model is None or not key:
+            return
+        widths = {column: table_view.columnWidth(column)
+                  for column in range(model.columnCount()) if not table_view.isColumnHidden(column)}
+        ColumnWidthCache.instance().put(key, widths)
+
+    @staticmethod
+    def _sample_rows(row_count):
+        """Первые строки и равномерная выборка по остальным"""
+        if row_count <= ColumnSizer.SAMPLE_ROWS:
+            return range(row_count)
+        head = ColumnSizer.SAMPLE_ROWS // 2
+        step = max(1, (row_count - head) // (ColumnSizer.SAMPLE_ROWS - head))
+        return list(range(head)) + list(range(head, row_count, step))[:ColumnSizer.SAMPLE_ROWS - head]
+
+    @staticmethod
+    def _widest_widths(table_view):
+        """Ширины самых длинных значений, отмеченных моделью при загрузке"""
+        model = table_view.model()
+        while isinstance(model, QAbstractProxyModel):
+            model = model.sourceModel()
+
+        widest_values = getattr(model, "widest_values", None)
+        if widest_values is None:
+            return {}
+
+        metrics = table_view.fontMetrics()
+        return {column: min(metrics.horizontalAdvance(text) + ColumnSizer.PADDING, ColumnSizer.MAX_WIDTH)
+                for column, text in widest_values().items()}
@@ -0,0 +1,77 @@
+from PyQt6.QtCore import QStringListModel, Qt
+from PyQt6.QtWidgets import QCompleter
+
+from data.sqlite.sort_keys import prefix_bounds
+from utils.database import DatabaseManager
+
+
+class PrefixCompleter(QCompleter):
+    """Автодополнение ников (и тегов) по индексу ключей сортировки
+
+    Подсказки не копируют список игроков в память: на каждое изменение
+    текста выполняется запрос по диапазону [префикс, префикс + максимальный
+    символ) индексированной колонки *_key (см. prefix_bounds), который
+    читает из индекса только первые MAX_SUGGESTIONS ключей. Поэтому
+    подсказки всегда соответствуют текущему состоянию БД — добавленные,
+    переименованные и удаленные игроки видны сразу, без перестроения.
+    """
+
+    MAX_SUGGESTIONS = 15
+
+    QUERY = """
+        SELECT {field}, {field}_key FROM Players
+        WHERE {field}_key >= ? AND {field}_key < ?
+        ORDER BY {field}_key
+        LIMIT ?
+    """
+
+    def __init__(self, line_edit, db, fields=("nickname",)):
+        """
+        Args:
+            line_edit: Поле ввода, к которому подключается автодополнение
+            db: Соединение QSqlDatabase
+            fields: Колонки Players с индексом ключа (nickname, tag)
+        """
+        super().__init__(line_edit)
+        self.db = db
+        self.fields = fields
+        self.suggestions = QStringListModel(self)
+
+        self.setModel(self.suggestions)
+        self.setCompletionMode(QCompleter.CompletionMode.UnfilteredPopupCompletion)
+        self.setCaseSensitivity(Qt.CaseSensitivity.CaseInsensitive)
+        line_edit.setCompleter(self)
+        # Подключается после setCompleter, чтобы список обновлялся уже после
+        # собственной реакции QCompleter на ввод
+        line_edit.textEdited.connect(self._update)
+
+    def _update(self, text):
+        """Обновление подсказок по введенному префиксу"""
+        prefix = text.strip()
+        values = self.lookup(prefix) if prefix else []
+        self.suggestions.setStringList(values)
+        if values and values != [prefix]:
+            self.complete()
+        else:
+            self.popup().hide()
+
+    def lookup(self, prefix):
+        """Первые MAX_SUGGESTIONS значений, начинающихся с prefix (без учета регистра)"""
+        start, end = prefix_bounds(prefix)
+        found = {}
+        for field in self.fields:
+            query = DatabaseManager.query(self.db)
+            query.prepare(self.QUERY.format(field=field))
+            query.addBindValue(start)
+            query.addBindValue(end)
+            query.addBindValue(self.MAX_SUGGESTIONS)
+            if not query.exec():
+                print(f"Ошибка автодополнения: {query.lastError().text()}")
+                continue
+            while query.next():
+                value = query.value(0)
+                if value and value not in found:
+                    found[value] = query.value(1)
+
+        # Списки по нику и тегу уже упорядочены; общий порядок — по тому же ключу
+        return sorted(found, key=found.get)[:self.MAX_SUGGESTIONS]
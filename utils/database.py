@@ -1,26 +1,69 @@
 from PyQt6.QtSql import QSqlDatabase, QSqlQueryModel, QSqlQuery, QSqlTableModel, QSqlRelationalTableModel, QSqlRelation, QSqlRelationalDelegate
 from PyQt6.QtWidgets import QMessageBox
 from PyQt6.QtCore import Qt
+from utils.query_stats import InstrumentedQuery, QueryStats
+from config.cfg import ConnectionProfile
 import sys
+import time
 
 
 class DatabaseManager:
     """Менеджер для работы с базой данных"""
 
+    # Файл БД активной гильдии; все операции с одной гильдией работают только с ним
+    active_db_path = 'data/ligma.db'
+
+    @staticmethod
+    def set_active_database(db_path):
+        """Выбор файла БД активной гильдии"""
+        DatabaseManager.active_db_path = db_path
+
     @staticmethod
-    def connect(db_path='data/ligma.db'):
-        """Подключение к базе данных"""
+    def connect(db_path=None):
+        """Подключение к базе данных (по умолчанию — БД активной гильдии)"""
+        db_path = db_path or DatabaseManager.active_db_path
         db = QSqlDatabase.addDatabase('QSQLITE')
         db.setDatabaseName(db_path)
         if not db.open():
             QMessageBox.critical(None, "Ошибка БД", "Не удалось подключиться к базе данных")
             sys.exit(1)
+        DatabaseManager.apply_profile(db)
         return db
 
+    @staticmethod
+    def apply_profile(db, profile=None):
+        """Применение профиля соединения (WAL, кэш, ожидание блокировок) к соединению QtSql"""
+        profile = profile or ConnectionProfile.active()
+        for statement in profile.statements():
+            query = QSqlQuery(db)
+            if not query.exec(statement):
+                print(f"Ошибка применения {statement}: {query.lastError().text()}")
+
+    @staticmethod
+    def get_connection():
+        """Уже открытое соединение по умолчанию (или новое подключение)"""
+        db = QSqlDatabase.database()
+        if db.isValid() and db.isOpen() and db.databaseName() == DatabaseManager.active_db_path:
+            return db
+        return DatabaseManager.connect()
+
+    @staticmethod
+    def table_exists(db, table_name):
+        """Проверка наличия таблицы в БД"""
+        query = InstrumentedQuery(db)
+        query.prepare("SELECT COUNT(*) FROM sqlite_master WHERE type = 'table' AND name = ?")
+        query.addBindValue(table_name)
+        return query.exec() and query.next() and query.value(0) > 0
+
+    @staticmethod
+    def query(db):
+        """Новый запрос, проходящий через общий инструментированный путь"""
+        return InstrumentedQuery(db)
+
     @staticmethod
     def execute_query(db, query_text, params=None):
         """Выполнение SQL-запроса с параметрами"""
-        query = QSqlQuery(db)
+        query = InstrumentedQuery(db)
         if params:
             query.prepare(query_text)
             for param in params:
@@ -30,37 +73,34 @@ class DatabaseManager:
 
     @staticmethod
     def create_query_model(db, query_text, params=None):
-        """Создание модели запроса"""
+        """Создание модели на основе SQL запроса"""
         model = QSqlQueryModel()
-        query = QSqlQuery(db)
 
+        started = time.perf_counter()
         if params:
+            query = QSqlQuery(db)
             query.prepare(query_text)
             for param in params:
                 query.addBindValue(param)
             query.exec()
+            model.setQuery(query)
         else:
-            query.exec(query_text)
-
-        model.setQuery(query)
-        return model
-
-    @staticmethod
-    def create_table_model(db, table_name):
-        """Создание простой табличной модели"""
-        model = QSqlTableModel(db=db)
-        model.setTable(table_name)
+            model.setQuery(query_text, db)
+        elapsed_ms = (time.perf_counter() - started) * 1000
 
-        model.select()
+        # Учитываются строки, загруженные моделью при первой выборке
+        QueryStats.instance().record(query_text, elapsed_ms, model.rowCount(), db, params)
         return model
 
     @staticmethod
-    def create_table_model(db, table_name, where_condition=None):
-        """Создание модели таблицы с опциональным WHERE условием"""
-        from PyQt6.QtSql import QSqlTableModel
-        from PyQt6.QtCore import Qt
+    def create_table_model(db, table_name, where_condition=None, sort=None, model_class=QSqlTableModel):
+        """Создание модели таблицы с опциональным WHERE условием
 
-        model = QSqlTableModel(db=db)
+        Args:
+            sort: Кортеж (колонка, порядок) для ORDER BY в SQL
+            model_class: Класс модели (QSqlTableModel или наследник)
+        """
+        model = model_class(db=db)
         model.setTable(table_name)
         model.setEditStrategy(QSqlTableModel.EditStrategy.OnFieldChange)
 
@@ -68,14 +108,17 @@ class DatabaseManager:
         if where_condition:
             model.setFilter(where_condition)
 
-        model.select()
+        if sort is not None:
+            model.setSort(*sort)
+
+        DatabaseManager.select_model(model, db)
         return model
 
     @staticmethod
-    def create_query_model(db, query):
-        """Создание модели на основе SQL запроса"""
-        from PyQt6.QtSql import QSqlQueryModel
-
-        model = QSqlQueryModel()
-        model.setQuery(query, db)
-        return model
\ No newline at end of file
+    def select_model(model, db=None):
+        """Выборка QSqlTableModel с учетом в статистике запросов"""
+        started = time.perf_counter()
+        ok = model.select()
+        elapsed_ms = (time.perf_counter() - started) * 1000
+        QueryStats.instance().record(model.selectStatement(), elapsed_ms, model.rowCount(), db or model.database())
+        return ok
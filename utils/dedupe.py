@@ -0,0 +1,251 @@
+import itertools
+import time
+
+from data.sqlite.attendance import events_table
+from data.sqlite.change_log import physical_table
+from data.sqlite.compact_schema import CompactSchemaMigration
+from data.sqlite.sort_keys import sort_key
+
+# Кириллические буквы, неотличимые на глаз от латинских (частый источник «двойников»)
+_CONFUSABLES = str.maketrans("авекмнорстухі", "abekmhopctyxi")
+
+
+def normalize(text):
+    """Нормализованный ник/тег: регистр, ё/е, похожие буквы, без пробелов и знаков"""
+    if not text:
+        return ""
+    return "".join(char for char in sort_key(text).translate(_CONFUSABLES) if char.isalnum())
+
+
+def edit_distance(left, right):
+    """Расстояние Левенштейна"""
+    if len(left) < len(right):
+        left, right = right, left
+    previous = list(range(len(right) + 1))
+    for i, left_char in enumerate(left, 1):
+        current = [i]
+        for j, right_char in enumerate(right, 1):
+            current.append(min(previous[j] + 1, current[j - 1] + 1, previous[j - 1] + (left_char != right_char)))
+        previous = current
+    return previous[-1]
+
+
+def _deletions(word, depth):
+    """Все строки, получаемые из word удалением не более depth символов"""
+    variants = frontier = {word}
+    for _ in range(depth):
+        frontier = {variant[:i] + variant[i + 1:] for variant in frontier for i in range(len(variant))}
+        variants = variants | frontier
+    return variants
+
+
+class DuplicateCandidate:
+    """Предложение слияния: игрок merge_id вливается в keep_id"""
+
+    def __init__(self, keep_id, merge_id, reason, distance=0):
+        self.keep_id = keep_id
+        self.merge_id = merge_id
+        self.reason = reason
+        self.distance = distance
+
+    def swapped(self):
+        return DuplicateCandidate(self.merge_id, self.keep_id, self.reason, self.distance)
+
+
+class DuplicateFinder:
+    """Поиск дублей игроков без попарного сравнения всех со всеми
+
+    Точные дубли — игроки с одинаковым хэшем нормализованного ника или
+    тега (см. normalize): группировка словарем за один проход.
+
+    Похожие ники ищутся по индексу удалений: для каждого ника в словарь
+    кладутся все варианты с удалением до k символов. Если расстояние
+    Левенштейна между двумя никами не больше k, у них найдется общий
+    вариант, поэтому кандидаты — только ники из одной ячейки словаря, и
+    точное расстояние считается лишь для них. Допустимое k зависит от
+    длины ника (одна правка на каждые LETTERS_PER_EDIT букв, не больше
+    max_distance), иначе короткие ники совпадали бы все со всеми. Ники,
+    отличающиеся только цифрами, похожими не считаются.
+
+    В паре остается игрок с большим числом отметок событий (при равенстве —
+    с меньшим id, то есть более старая запись).
+    """
+
+    LETTERS_PER_EDIT = 4
+
+    def __init__(self, conn):
+        self.conn = conn
+        self.compact = CompactSchemaMigration.is_compact(conn)
+        self.players = {}  # id -> (ник, тег)
+        self.elapsed_ms = 0.0
+
+    def find(self, max_distance=2):
+        """Кандидаты на слияние: сначала точные дубли, затем похожие ники"""
+        started = time.perf_counter()
+        self.players = {row[0]: (row[1], row[2]) for row in self.conn.execute("SELECT id, nickname, tag FROM Players")}
+        events, _ = events_table(self.compact)
+        self._events = dict(self.conn.execute(
+            f"SELECT player_id, COUNT(*) FROM {events} WHERE player_id IS NOT NULL GROUP BY player_id"))
+
+        candidates, seen = [], set()
+        for column, reason in ((0, "Совпадает ник"), (1, "Совпадает тег")):
+            for player_ids in self._exact_groups(column):
+                keep_id = min(player_ids, key=self._keep_order)
+                for merge_id in player_ids:
+                    self._add(candidates, seen, keep_id, merge_id, reason, 0)
+
+        for first, second, distance in self._similar_nicknames(max_distance):
+            pair = sorted((first, second), key=self._keep_order)
+            self._add(candidates, seen, pair[0], pair[1], "Похожий ник", distance)
+
+        self.elapsed_ms = (time.perf_counter() - started) * 1000
+        return candidates
+
+    def _keep_order(self, player_id):
+        return -self._events.get(player_id, 0), player_id
+
+    @staticmethod
+    def _add(candidates, seen, keep_id, merge_id, reason, distance):
+        pair = frozenset((keep_id, merge_id))
+        if keep_id != merge_id and pair not in seen:
+            seen.add(pair)
+            candidates.append(DuplicateCandidate(keep_id, merge_id, reason, distance))
+
+    def _exact_groups(self, column):
+        groups = {}
+        for player_id, values in self.players.items():
+            key = normalize(values[column])
+            if key:
+                groups.setdefault(key, []).append(player_id)
+        return [player_ids for player_ids in groups.values() if len(player_ids) > 1]
+
+    @staticmethod
+    def _letters(key):
+        return "".join(char for char in key if not char.isdigit())
+
+    def _similar_nicknames(self, max_distance):
+        """Пары игроков с близкими, но не совпадающими нормализованными никами"""
+        by_key = {}
+        for player_id, (nickname, _) in self.players.items():
+            key = normalize(nickname)
+            if key:
+                by_key.setdefault(key, []).append(player_id)
+
+        limits = {key: min(max_distance, len(key) // self.LETTERS_PER_EDIT) for key in by_key}
+        index = {}
+        for key, limit in limits.items():
+            if limit:
+                for variant in _deletions(key, limit):
+                    index.setdefault(variant, []).append(key)
+
+        checked = set()
+        for keys in index.values():
+            for left, right in itertools.combinations(keys, 2):
+                if (left, right) in checked:
+                    continue
+                checked.add((left, right))
+                if self._letters(left) == self._letters(right):
+                    continue  # отличаются только цифры: обычно разные аккаунты (Игрок1, Игрок2)
+                distance = edit_distance(left, right)
+                if distance <= min(limits[left], limits[right]):
+                    for first, second in itertools.product(by_key[left], by_key[right]):
+                        yield first, second, distance
+
+
+class PlayerMerger:
+    """Слияние игрока-дубля с основным в одной транзакции
+
+    Строки Activity и GuildContribution обоих игроков сводятся в одну
+    строку основного игрока: числовые показатели берутся максимальные
+    (дубли от повторного импорта несут те же значения, и сумма удвоила бы
+    их), роль — основного игрока, если она задана. Отметки событий
+    переносятся; если у обоих есть отметка за одну дату, остается одна,
+    с участием, если хоть один из двоих участвовал. У основного игрока
+    сохраняется наибольший уровень и самая ранняя дата вступления.
+    В компактной схеме запись идет в таблицы *_data.
+    """
+
+    MERGED_COLUMNS = {
+        "Activity": ("weekly_damage", "raid_participation", "weekly_crafts"),
+        "GuildContribution": ("resources_contributed", "help_count")
+    }
+
+    def __init__(self, conn):
+        self.conn = conn
+        self.compact = CompactSchemaMigration.is_compact(conn)
+
+    def merge(self, candidates):
+        """Слияние пар (основной id, id дубля); возвращает число слитых игроков"""
+        merged = set()
+        self.conn.execute("BEGIN IMMEDIATE")
+        try:
+            for keep_id, merge_id in candidates:
+                # Дубль мог уже влиться в другого игрока этой же пачкой
+                if keep_id in merged or merge_id in merged:
+                    continue
+                self._merge_pair(keep_id, merge_id)
+                merged.add(merge_id)
+            self.conn.commit()
+        except Exception:
+            self.conn.rollback()
+            raise
+        return len(merged)
+
+    def _merge_pair(self, keep_id, merge_id):
+        players = physical_table("Players", self.compact)
+        joined = "joined_day" if self.compact else "joined_date"
+        self.conn.execute(f"""
+            UPDATE {players}
+            SET level = (SELECT MAX(level) FROM {players} WHERE id IN (?, ?)),
+                {joined} = (SELECT MIN({joined}) FROM {players} WHERE id IN (?, ?))
+            WHERE id = ?
+        """, (keep_id, merge_id, keep_id, merge_id, keep_id))
+
+        rank = "rank_id" if self.compact else "leadership_rank"
+        self._merge_rows("Activity", self.MERGED_COLUMNS["Activity"], None, keep_id, merge_id)
+        self._merge_rows(physical_table("GuildContribution", self.compact),
+                         self.MERGED_COLUMNS["GuildContribution"], rank, keep_id, merge_id)
+        self._merge_events(keep_id, merge_id)
+
+        self.conn.execute("DELETE FROM PlayerAttendance WHERE player_id = ?", (merge_id,))
+        self.conn.execute("UPDATE PlayerAttendance SET stale = 1 WHERE player_id = ?", (keep_id,))
+        self.conn.execute(f"DELETE FROM {players} WHERE id = ?", (merge_id,))
+
+    def _merge_rows(self, table, columns, keep_column, keep_id, merge_id):
+        """Сведение строк обоих игроков в одну (самую раннюю) строку основного"""
+        target = self.conn.execute(f"""
+            SELECT id FROM {table} WHERE player_id IN (?, ?)
+            ORDER BY player_id = ? DESC, id LIMIT 1
+        """, (keep_id, merge_id, keep_id)).fetchone()
+        if target is None:
+            return
+
+        assignments = [f"{column} = (SELECT MAX({column}) FROM {table} WHERE player_id IN (?, ?))"
+                       for column in columns]
+        params = [value for _ in columns for value in (keep_id, merge_id)]
+        if keep_column:
+            assignments.append(f"""{keep_column} = (
+                SELECT {keep_column} FROM {table}
+                WHERE player_id IN (?, ?) AND {keep_column} IS NOT NULL
+                ORDER BY player_id = ? DESC, id LIMIT 1)""")
+            params += [keep_id, merge_id, keep_id]
+
+        self.conn.execute(f"UPDATE {table} SET player_id = ?, {', '.join(assignments)} WHERE id = ?",
+                          [keep_id, *params, target[0]])
+        self.conn.execute(f"DELETE FROM {table} WHERE player_id IN (?, ?) AND id <> ?",
+                          (keep_id, merge_id, target[0]))
+
+    def _merge_events(self, keep_id, merge_id):
+        """Перенос отметок событий с учетом ключа (player_id, дата)"""
+        events, date = events_table(self.compact)
+        self.conn.execute(f"""
+            UPDATE {events} SET participated = 1
+            WHERE player_id = ? AND COALESCE(participated, 0) = 0 AND {date} IN (
+                SELECT {date} FROM {events} WHERE player_id = ? AND participated = 1
+            )
+        """, (keep_id, merge_id))
+        self.conn.execute(f"""
+            DELETE FROM {events}
+            WHERE player_id = ? AND {date} IN (SELECT {date} FROM {events} WHERE player_id = ?)
+        """, (merge_id, keep_id))
+        self.conn.execute(f"UPDATE {events} SET player_id = ? WHERE player_id = ?", (keep_id, merge_id))
@@ -0,0 +1,113 @@
+import csv
+import re
+import time
+from pathlib import Path
+
+from data.sqlite.attendance import events_table
+from data.sqlite.compact_schema import CompactSchemaMigration, to_day_number
+
+
+class RecordResult:
+    """Итог записи события"""
+
+    def __init__(self):
+        self.present = 0
+        self.absent = 0
+        self.written = 0  # строк, которые реально изменились
+        self.unknown = []  # ники/теги, не найденные или неоднозначные
+        self.elapsed_ms = 0.0
+
+
+class EventRoster:
+    """Список участников события: ники или теги из вставки или файла"""
+
+    SEPARATORS = re.compile(r"[\r\n,;\t]+")
+
+    @classmethod
+    def parse(cls, text):
+        """Ники/теги по строкам (или через запятую, точку с запятой), без повторов"""
+        names = (name.strip() for name in cls.SEPARATORS.split(text))
+        return list(dict.fromkeys(name for name in names if name))
+
+    @classmethod
+    def read_file(cls, path):
+        """Список из текстового файла; в CSV берется первая колонка"""
+        path = Path(path)
+        with open(path, encoding="utf-8-sig", newline="") as file:
+            if path.suffix.lower() == ".csv":
+                return cls.parse("\n".join(row[0] for row in csv.reader(file) if row))
+            return cls.parse(file.read())
+
+
+class EventRecorder:
+    """Массовая запись посещения события
+
+    Все отметки пишутся одним executemany в одной транзакции: upsert по
+    уникальному ключу (player_id, дата) — повторная запись того же события
+    обновляет отметку, а не дублирует ее, и не трогает неизменившиеся
+    строки (журнал изменений и кэш посещаемости получают только реальные
+    изменения). В компактной схеме запись идет прямо в
+    EventParticipation_data: upsert через представление невозможен.
+    """
+
+    UPSERT = """
+        INSERT INTO {events} (player_id, {date}, participated) VALUES (?, ?, ?)
+        ON CONFLICT(player_id, {date}) DO UPDATE SET participated = excluded.participated
+        WHERE participated IS NOT excluded.participated
+    """
+
+    def __init__(self, conn):
+        self.conn = conn
+        self.compact = CompactSchemaMigration.is_compact(conn)
+
+    def resolve(self, names):
+        """Поиск игроков по никам и тегам без учета регистра
+
+        Returns:
+            tuple: (список id игроков, список ненайденных или неоднозначных имен)
+        """
+        lookup = {}
+        for player_id, nickname, tag in self.conn.execute("SELECT id, nickname, tag FROM Players"):
+            for name in {(nickname or "").casefold(), (tag or "").casefold()}:
+                lookup.setdefault(name, set()).add(player_id)
+
+        player_ids, unknown = [], []
+        for name in names:
+            matches = lookup.get(name.casefold(), ())
+            if len(matches) == 1:
+                player_ids.append(next(iter(matches)))
+            else:
+                unknown.append(name)
+        return list(dict.fromkeys(player_ids)), unknown
+
+    def record(self, event_date, player_ids, mark_absent=False):
+        """Запись события
+
+        Args:
+            event_date: Дата события (ISO, "yyyy-MM-dd")
+            player_ids: id присутствовавших игроков
+            mark_absent: Отметить остальных игроков гильдии как отсутствовавших
+        """
+        result = RecordResult()
+        started = time.perf_counter()
+        day = to_day_number(event_date) if self.compact else event_date
+        present = set(player_ids)
+        rows = [(player_id, day, 1) for player_id in present]
+        if mark_absent:
+            rows += [(row[0], day, 0) for row in self.conn.execute("SELECT id FROM Players")
+                     if row[0] not in present]
+        result.present = len(present)
+        result.absent = len(rows) - len(present)
+
+        events, date_column = events_table(self.compact)
+        self.conn.execute("BEGIN IMMEDIATE")
+        try:
+            cursor = self.conn.executemany(self.UPSERT.format(events=events, date=date_column), rows)
+            result.written = cursor.rowcount
+            self.conn.commit()
+        except Exception:
+            self.conn.rollback()
+            raise
+
+        result.elapsed_ms = (time.perf_counter() - started) * 1000
+        return result
@@ -0,0 +1,170 @@
+from PyQt6.QtCore import QAbstractTableModel, QModelIndex, Qt
+
+from utils.database import DatabaseManager
+
+
+class EventHistoryModel(QAbstractTableModel):
+    """Модель истории событий игрока с keyset-пагинацией
+
+    Страницы читаются по индексу (player_id, event_date) в порядке
+    (event_date DESC, id DESC). Следующая страница начинается строго после
+    последней загруженной пары (event_date, id), поэтому стоимость подгрузки
+    не зависит от глубины прокрутки. Сводная статистика посещаемости
+    считается оконными функциями в том же запросе, что и первая страница.
+    """
+
+    HEADERS = ["Дата", "Участие"]
+    PAGE_SIZE = 50
+
+    FIRST_PAGE_QUERY = """
+        SELECT
+            id,
+            event_date,
+            participated,
+            COUNT(*) OVER () as total_events,
+            SUM(participated) OVER () as attended_events,
+            MIN(event_date) OVER () as first_event
+        FROM EventParticipation
+        WHERE player_id = ?
+        ORDER BY event_date DESC, id DESC
+        LIMIT ?
+    """
+
+    NEXT_PAGE_QUERY = """
+        SELECT id, event_date, participated
+        FROM EventParticipation
+        WHERE player_id = ?
+          AND (event_date < ? OR (event_date = ? AND id < ?))
+        ORDER BY event_date DESC, id DESC
+        LIMIT ?
+    """
+
+    def __init__(self, db, player_id, page_size=PAGE_SIZE, first_page=None, parent=None):
+        super().__init__(parent)
+        self.db = db
+        self.player_id = player_id
+        self.page_size = page_size
+
+        self.rows = []  # [(id, event_date, participated)]
+        self.has_more = True
+        self.stats = {
+            'total': 0,
+            'attended': 0,
+            'rate': 0.0,
+            'first_event': None,
+            'last_event': None
+        }
+
+        if first_page is not None:
+            # Первая страница уже загружена (например, фоновой предзагрузкой)
+            rows, stats = first_page
+            self.stats.update(stats)
+            self._append_page(rows)
+        else:
+            self._load_first_page()
+
+    def rowCount(self, parent=QModelIndex()):
+        return 0 if parent.isValid() else len(self.rows)
+
+    def columnCount(self, parent=QModelIndex()):
+        return 0 if parent.isValid() else len(self.HEADERS)
+
+    def headerData(self, section, orientation, role=Qt.ItemDataRole.DisplayRole):
+        if role == Qt.ItemDataRole.DisplayRole and orientation == Qt.Orientation.Horizontal:
+            return self.HEADERS[section]
+        return None
+
+    def data(self, index, role=Qt.ItemDataRole.DisplayRole):
+        if not index.isValid() or role != Qt.ItemDataRole.DisplayRole:
+            return None
+
+        _, event_date, participated = self.rows[index.row()]
+        if index.column() == 0:
+            return event_date
+        return "Да" if participated else "Нет"
+
+    def canFetchMore(self, parent=QModelIndex()):
+        return not parent.isValid() and self.has_more
+
+    def fetchMore(self, parent=QModelIndex()):
+        """Подгрузка следующей страницы (вызывается представлением при прокрутке)"""
+        if parent.isValid() or not self.rows:
+            return
+
+        last_id, last_date, _ = self.rows[-1]
+        query = DatabaseManager.query(self.db)
+        query.prepare(self.NEXT_PAGE_QUERY)
+        for value in (self.player_id, last_date, last_date, last_id, self.page_size):
+            query.addBindValue(value)
+
+        if not query.exec():
+            print(f"Ошибка загрузки истории: {query.lastError().text()}")
+            self.has_more = False
+            return
+
+        page = []
+        while query.next():
+            page.append((query.value(0), query.value(1), query.value(2)))
+
+        self._append_page(page)
+
+    def _load_first_page(self):
+        """Первая страница вместе со сводной статистикой"""
+        query = DatabaseManager.query(self.db)
+        query.prepare(self.FIRST_PAGE_QUERY)
+        query.addBindValue(self.player_id)
+        query.addBindValue(self.page_size)
+
+        if not query.exec():
+            print(f"Ошибка загрузки истории: {query.lastError().text()}")
+            self.has_more = False
+            return
+
+        raw_rows = []
+        while query.next():
+            raw_rows.append(tuple(query.value(i) for i in range(6)))
+
+        rows, stats = self.split_first_page(raw_rows)
+        self.stats.update(stats)
+        self._append_page(rows)
+
+    @staticmethod
+    def split_first_page(raw_rows):
+        """Разбор результата FIRST_PAGE_QUERY на строки истории и статистику
+
+        Returns:
+            tuple: ([(id, event_date, participated)], stats)
+        """
+        rows = [tuple(row[:3]) for row in raw_rows]
+        if not raw_rows:
+            return rows, {}
+
+        first = raw_rows[0]
+        total = first[3] or 0
+        attended = first[4] or 0
+        stats = {
+            'total': total,
+            'attended': attended,
+            'rate': attended / total if total else 0.0,
+            'first_event': first[5],
+            'last_event': first[1]
+        }
+        return rows, stats
+
+    def _append_page(self, page):
+        """Добавление страницы в модель"""
+        self.has_more = len(page) == self.page_size
+        if not page:
+            return
+
+        first = len(self.rows)
+        self.beginInsertRows(QModelIndex(), first, first + len(page) - 1)
+        self.rows.extend(page)
+        self.endInsertRows()
+
+    def summary_text(self):
+        """Краткая сводка посещаемости для заголовка"""
+        if not self.stats['total']:
+            return "событий нет"
+        return (f"посещено {self.stats['attended']} из {self.stats['total']} "
+                f"({self.stats['rate']:.0%}), с {self.stats['first_event']} по {self.stats['last_event']}")
@@ -0,0 +1,261 @@
+import threading
+from collections import Counter
+import time
+from array import array
+from concurrent.futures import ThreadPoolExecutor
+
+from config.cfg import ConnectionProfile
+from utils.dedupe import normalize
+
+
+def trigrams(key):
+    """Триграммы ключа с позициями; отступы дают отдельные триграммы начала и конца слова"""
+    padded = f"  {key} "
+    return [(position, padded[position:position + 3]) for position in range(len(padded) - 2)]
+
+
+def bounded_distance(left, right, limit):
+    """Расстояние Левенштейна или limit + 1, если оно больше limit
+
+    Считается только полоса шириной 2 * limit + 1 вокруг диагонали, и
+    счет прерывается, как только вся строка таблицы превысила limit.
+    """
+    if abs(len(left) - len(right)) > limit:
+        return limit + 1
+    if len(left) < len(right):
+        left, right = right, left
+    too_far = limit + 1
+    previous = list(range(len(right) + 1))
+    for i in range(1, len(left) + 1):
+        low, high = max(1, i - limit), min(len(right), i + limit)
+        current = [too_far] * (len(right) + 1)
+        current[0] = i if i <= limit else too_far
+        left_char = left[i - 1]
+        for j in range(low, high + 1):
+            current[j] = min(previous[j] + 1, current[j - 1] + 1,
+                             previous[j - 1] + (left_char != right[j - 1]))
+        if min(current[low - 1:high + 1]) > limit:
+            return too_far
+        previous = current
+    return min(previous[-1], too_far)
+
+
+class FuzzyMatch:
+    """Найденный игрок: id, расстояние и поле, по которому он найден"""
+
+    def __init__(self, player_id, distance, field):
+        self.player_id = player_id
+        self.distance = distance
+        self.field = field
+
+
+class FuzzyIndex:
+    """Триграммный индекс ников и тегов для поиска с опечатками
+
+    Хранится в памяти: нормализованные ключи (см. dedupe.normalize) в
+    списке по id игрока и списки id игроков по триграммам (array, 4 байта
+    на запись). Поиск с допуском k правок (k растет с длиной запроса,
+    см. EDIT_THRESHOLDS):
+    каждая правка портит не больше трех триграмм, поэтому у подходящего
+    ключа общих с запросом триграмм не меньше, чем у запроса, минус 3k.
+    Списки разбиты по длине ключа и позиции триграммы в нем: правка
+    сдвигает триграммы не больше чем на k позиций, поэтому читаются только
+    списки с длиной и позицией в пределах k от запроса. Общие триграммы
+    считаются для всех игроков сразу через Counter, и только для прошедших
+    порог считается ограниченное расстояние Левенштейна.
+
+    Индекс строится в фоновом потоке по отдельному соединению и догоняет
+    БД по ChangeLog перед каждым поиском (чтение по первичному ключу после
+    последнего учтенного seq), поэтому новые и переименованные игроки
+    находятся сразу, кем бы они ни были записаны. Старые записи в
+    списках триграмм не удаляются, а отсеиваются проверкой ключа;
+    когда их становится больше REBUILD_STALE_SHARE, индекс перестраивается.
+    """
+
+    # Длина запроса, с которой допускается первая и вторая правка
+    EDIT_THRESHOLDS = (3, 8)
+    MAX_RESULTS = 100
+    REBUILD_STALE_SHARE = 0.2
+
+    _instance = None
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="fuzzy-index")
+        self._conn = None
+        self.db_path = None
+        self.seq = 0
+        self.ready = False
+        self.build_ms = 0.0
+        self._keys = []  # id игрока -> (ключ ника, ключ тега) или None
+        self._postings = {}  # (триграмма, длина ключа, позиция) -> array id игроков
+        self._stale = 0  # игроков, чьи старые триграммы остались в списках
+        self._rebuilding = False
+
+    @classmethod
+    def instance(cls):
+        if cls._instance is None:
+            cls._instance = cls()
+        return cls._instance
+
+    def build(self, db_path):
+        """Построение индекса для БД в фоне (при смене гильдии — заново)"""
+        with self._lock:
+            if db_path == self.db_path:
+                return
+            self.db_path = db_path
+            self.ready = False
+            self._rebuilding = True
+        self._executor.submit(self._build, db_path)
+
+    def shutdown(self):
+        self._executor.shutdown(wait=False, cancel_futures=True)
+        with self._lock:
+            self._close()
+
+    def search(self, text, limit=None):
+        """Игроки, чей ник или тег отличается от text не больше чем на k правок
+
+        Returns:
+            list: FuzzyMatch по возрастанию расстояния (None — индекс еще строится)
+        """
+        query = normalize(text)
+        with self._lock:
+            if not self.ready:
+                return None
+            if not query:
+                return []
+            self._catch_up()
+
+            limit_distance = sum(len(query) >= minimum for minimum in self.EDIT_THRESHOLDS)
+            query_grams = trigrams(query)
+            required = len(query_grams) - 3 * limit_distance
+
+            # Общая триграмма засчитывается, если и длина ключа, и позиция в нем
+            # отличаются от запроса не больше чем на k; подсчет идет в C через Counter
+            shared = Counter()
+            shifts = range(-limit_distance, limit_distance + 1)
+            for position, gram in query_grams:
+                for length_shift in shifts:
+                    for position_shift in shifts:
+                        shared.update(self._postings.get(
+                            (gram, len(query) + length_shift, position + position_shift), ()))
+
+            # Кандидаты по убыванию числа общих триграмм: у кандидата с count общими
+            # расстояние не меньше ceil((триграмм запроса - count) / 3), поэтому, когда
+            # набрано limit совпадений не хуже этой границы, остальных можно не проверять
+            limit = limit or self.MAX_RESULTS
+            candidates = sorted(((count, player_id) for player_id, count in shared.items() if count >= required),
+                                reverse=True)
+            matches = []
+            for count, player_id in candidates:
+                if len(matches) >= limit and matches[limit - 1].distance <= -(-(len(query_grams) - count) // 3):
+                    break
+                keys = self._keys[player_id]
+                if keys is None:
+                    continue
+                best = None
+                for field, key in zip(("nickname", "tag"), keys):
+                    distance = bounded_distance(query, key, limit_distance)
+                    if distance <= limit_distance and (best is None or distance < best.distance):
+                        best = FuzzyMatch(player_id, distance, field)
+                if best is not None:
+                    matches.append(best)
+                    if len(matches) >= limit:
+                        matches.sort(key=lambda match: (match.distance, match.player_id))
+                        del matches[limit:]
+
+        matches.sort(key=lambda match: (match.distance, match.player_id))
+        return matches
+
+    def _build(self, db_path):
+        try:
+            started = time.perf_counter()
+            conn = ConnectionProfile.active().connect(db_path, read_only=True, check_same_thread=False)
+            seq = conn.execute("SELECT COALESCE(MAX(seq), 0) FROM ChangeLog").fetchone()[0]
+            keys, postings = [], {}
+            for player_id, nickname, tag in conn.execute("SELECT id, nickname, tag FROM Players"):
+                self._add(keys, postings, player_id, nickname, tag)
+
+            with self._lock:
+                if db_path != self.db_path:
+                    conn.close()  # за время построения выбрали другую гильдию, ее индекс уже в очереди
+                    return
+                self._close()
+                self._conn, self.seq = conn, seq
+                self._keys, self._postings = keys, postings
+                self._stale = 0
+                self._rebuilding = False
+                self.build_ms = (time.perf_counter() - started) * 1000
+                self.ready = True
+        except Exception as e:
+            print(f"Ошибка построения индекса нечеткого поиска: {e}")
+            with self._lock:
+                self._rebuilding = False
+
+    def _rebuild(self):
+        """Построение заново в фоне; до замены поиск идет по текущему индексу"""
+        if not self._rebuilding:
+            self._rebuilding = True
+            self._executor.submit(self._build, self.db_path)
+
+    @staticmethod
+    def _add(keys, postings, player_id, nickname, tag):
+        """Добавление игрока в индекс"""
+        entry = (normalize(nickname), normalize(tag))
+        if player_id >= len(keys):
+            keys.extend([None] * (player_id + 1 - len(keys)))
+        keys[player_id] = entry
+
+        grams = set()
+        for key in entry:
+            if key:
+                grams.update((gram, len(key), position) for position, gram in trigrams(key))
+        for gram in grams:
+            ids = postings.get(gram)
+            if ids is None:
+                ids = postings[gram] = array("i")
+            ids.append(player_id)
+
+    def _catch_up(self):
+        """Учет игроков, добавленных, переименованных или удаленных после построения"""
+        compacted = self._conn.execute("SELECT compacted_seq FROM ChangeLogCompaction WHERE id = 1").fetchone()
+        if compacted is not None and compacted[0] > self.seq:
+            # Нужные записи журнала уже сжаты: индекс строится заново
+            self._rebuild()
+            return
+
+        changed = self._conn.execute("""
+            SELECT player_id, MAX(seq) FROM ChangeLog
+            WHERE seq > ? AND table_name = 'Players' AND player_id IS NOT NULL
+            GROUP BY player_id
+        """, (self.seq,)).fetchall()
+        if not changed:
+            return
+
+        self.seq = max(row[1] for row in changed)
+        player_ids = [row[0] for row in changed]
+        placeholders = ", ".join("?" for _ in player_ids)
+        current = {row[0]: row[1:] for row in self._conn.execute(
+            f"SELECT id, nickname, tag FROM Players WHERE id IN ({placeholders})", player_ids)}
+
+        for player_id in player_ids:
+            old = self._keys[player_id] if player_id < len(self._keys) else None
+            if player_id not in current:
+                if old is not None:
+                    self._keys[player_id] = None
+                    self._stale += 1
+                continue
+            nickname, tag = current[player_id]
+            if old == (normalize(nickname), normalize(tag)):
+                continue  # изменились другие поля игрока
+            self._stale += old is not None
+            self._add(self._keys, self._postings, player_id, nickname, tag)
+
+        if self._stale > self.REBUILD_STALE_SHARE * max(len(self._keys), 1):
+            self._rebuild()
+
+    def _close(self):
+        if self._conn is not None:
+            self._conn.close()
+            self._conn = None
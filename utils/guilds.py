@@ -0,0 +1,216 @@
+import heapq
+import json
+import sqlite3
+from concurrent.futures import ThreadPoolExecutor
+from itertools import islice
+from pathlib import Path
+
+from config.cfg import ConnectionProfile
+from data.sqlite.sort_keys import COLLATION_NAME, register_collation, sort_key
+
+
+class GuildRegistry:
+    """Реестр гильдий: каждая гильдия хранится в отдельном SQLite файле"""
+
+    DEFAULT_GUILD = "Ligma"
+    DEFAULT_PATH = "data/ligma.db"
+
+    def __init__(self, registry_path="data/guilds.json"):
+        self.registry_path = Path(registry_path)
+        self.guilds = {}
+        self.active = self.DEFAULT_GUILD
+        self.load()
+
+    def load(self):
+        """Загрузка реестра из файла (или создание реестра по умолчанию)"""
+        if self.registry_path.exists():
+            try:
+                data = json.loads(self.registry_path.read_text(encoding="utf-8"))
+                self.guilds = dict(data.get("guilds", {}))
+                self.active = data.get("active", self.DEFAULT_GUILD)
+            except (OSError, ValueError) as e:
+                print(f"Ошибка чтения реестра гильдий: {e}")
+
+        if not self.guilds:
+            self.guilds = {self.DEFAULT_GUILD: self.DEFAULT_PATH}
+        if self.active not in self.guilds:
+            self.active = next(iter(self.guilds))
+
+    def save(self):
+        """Сохранение реестра в файл"""
+        self.registry_path.parent.mkdir(parents=True, exist_ok=True)
+        data = {"active": self.active, "guilds": self.guilds}
+        self.registry_path.write_text(json.dumps(data, ensure_ascii=False, indent=2), encoding="utf-8")
+
+    def add_guild(self, name, db_path=None):
+        """Регистрация гильдии
+
+        Args:
+            name: Название гильдии
+            db_path: Путь к файлу БД (по умолчанию data/<slug>.db, см. default_path)
+
+        Raises:
+            ValueError: Пустое название, разделители пути в названии или
+                файл БД, который уже занят другой гильдией
+        """
+        name = name.strip()
+        if not name:
+            raise ValueError("Название гильдии не может быть пустым")
+        if "/" in name or "\\" in name:
+            raise ValueError("Название гильдии не может содержать символы / и \\")
+
+        if db_path is None:
+            db_path = self.default_path(name)
+        else:
+            owner = self._path_owner(db_path, name)
+            if owner is not None:
+                raise ValueError(f"Файл {db_path} уже используется гильдией '{owner}'")
+        self.guilds[name] = db_path
+        self.save()
+        return self.guilds[name]
+
+    def default_path(self, name):
+        """Файл БД новой гильдии: data/<slug>.db, не занятый другой гильдией
+
+        slug — название в нижнем регистре, где все, кроме букв и цифр,
+        заменено на "_" (так название не выводит путь за пределы data/).
+        При совпадении с файлом другой гильдии (например, "Ligma" и
+        data/ligma.db гильдии по умолчанию) добавляется номер: _2, _3...
+        """
+        slug = "".join(char if char.isalnum() else "_" for char in sort_key(name)).strip("_") or "guild"
+        candidate, number = f"data/{slug}.db", 1
+        while self._path_owner(candidate, name) is not None:
+            number += 1
+            candidate = f"data/{slug}_{number}.db"
+        return candidate
+
+    def _path_owner(self, db_path, name):
+        """Другая гильдия, зарегистрированная с тем же файлом БД, или None"""
+        resolved = Path(db_path).resolve()
+        for other, other_path in self.guilds.items():
+            if other != name and Path(other_path).resolve() == resolved:
+                return other
+        return None
+
+    def remove_guild(self, name):
+        """Удаление гильдии из реестра (файл БД не удаляется)"""
+        if name in self.guilds and len(self.guilds) > 1:
+            del self.guilds[name]
+            if self.active == name:
+                self.active = next(iter(self.guilds))
+            self.save()
+
+    def set_active(self, name):
+        """Выбор активной гильдии"""
+        if name not in self.guilds:
+            raise KeyError(f"Гильдия '{name}' не зарегистрирована")
+        self.active = name
+        self.save()
+
+    def get_path(self, name=None):
+        """Путь к файлу БД гильдии (по умолчанию — активной)"""
+        return self.guilds[name or self.active]
+
+    def names(self):
+        """Список названий гильдий"""
+        return list(self.guilds)
+
+
+class CrossGuildQuery:
+    """Параллельные запросы ко всем гильдиям с k-way слиянием результатов
+
+    Каждый шард опрашивается в своём потоке через собственное соединение
+    (только чтение), отсортированные выборки объединяются heapq.merge.
+    """
+
+    # Колонки, по которым допускается построение рейтинга
+    SORTABLE_COLUMNS = {
+        "weekly_damage": "COALESCE(a.weekly_damage, 0)",
+        "resources_contributed": "COALESCE(gc.resources_contributed, 0)",
+        "level": "p.level",
+        "raid_participation": "COALESCE(a.raid_participation, 0)"
+    }
+
+    HEADERS = ["Гильдия", "ID", "Никнейм", "Тег", "Класс", "Уровень", "Статус", "Значение"]
+
+    BASE_QUERY = """
+        SELECT
+            p.id,
+            p.nickname,
+            p.tag,
+            c.name as class_name,
+            p.level,
+            p.guild_status,
+            {value} as value
+        FROM Players p
+        LEFT JOIN Classes c ON p.class_id = c.id
+        LEFT JOIN Activity a ON p.id = a.player_id
+        LEFT JOIN GuildContribution gc ON p.id = gc.player_id
+        {where}
+        ORDER BY {order}
+        LIMIT ?
+    """
+
+    def __init__(self, registry, max_workers=None):
+        self.registry = registry
+        self.max_workers = max_workers
+
+    def top_players(self, column="weekly_damage", limit=50):
+        """Топ игроков по всем гильдиям по убыванию значения колонки"""
+        if column not in self.SORTABLE_COLUMNS:
+            raise ValueError(f"Недопустимая колонка для рейтинга: {column}")
+
+        value = self.SORTABLE_COLUMNS[column]
+        query = self.BASE_QUERY.format(value=value, where="", order=f"{value} DESC, p.id")
+        shards = self._fan_out(query, [limit])
+
+        merged = heapq.merge(*shards, key=lambda row: (-(row[7] or 0), row[0]))
+        return list(islice(merged, limit))
+
+    def search_players(self, text, limit=200):
+        """Поиск игроков по никнейму/тегу во всех гильдиях (сортировка по никнейму)"""
+        pattern = f"%{text.strip()}%"
+        query = self.BASE_QUERY.format(
+            value="p.level",
+            where="WHERE p.nickname LIKE ? OR p.tag LIKE ?",
+            order=f"p.nickname COLLATE {COLLATION_NAME}, p.id"
+        )
+        shards = self._fan_out(query, [pattern, pattern, limit])
+
+        # Слияние по тому же ключу, что и коллация шардов (регистр и ё не различаются)
+        merged = heapq.merge(*shards, key=lambda row: (sort_key(row[2]) or "", row[0]))
+        return list(islice(merged, limit))
+
+    def _fan_out(self, query, params):
+        """Выполнение запроса на каждом шарде параллельно"""
+        guilds = list(self.registry.guilds.items())
+        if not guilds:
+            return []
+
+        workers = self.max_workers or len(guilds)
+        with ThreadPoolExecutor(max_workers=workers) as executor:
+            futures = [
+                executor.submit(self._query_shard, name, path, query, params)
+                for name, path in guilds
+            ]
+            return [future.result() for future in futures]
+
+    @staticmethod
+    def _query_shard(guild_name, db_path, query, params):
+        """Запрос к одному шарду; строки дополняются названием гильдии"""
+        if not Path(db_path).exists():
+            print(f"Файл БД гильдии '{guild_name}' не найден: {db_path}")
+            return []
+
+        try:
+            conn = ConnectionProfile.active().connect(db_path, read_only=True)
+            register_collation(conn)
+            try:
+                rows = conn.execute(query, params).fetchall()
+            finally:
+                conn.close()
+        except sqlite3.Error as e:
+            print(f"Ошибка запроса к гильдии '{guild_name}': {e}")
+            return []
+
+        return [(guild_name,) + tuple(row) for row in rows]
@@ -0,0 +1,468 @@
+from PyQt6.QtCore import QAbstractTableModel, QModelIndex, Qt
+from PyQt6.QtSql import QSqlError
+
+from utils.database import DatabaseManager
+
+
+def diff_rows(old_rows, new_rows):
+    """Операции, превращающие old_rows в new_rows (строки сопоставляются по id в колонке 0)
+
+    Исчезнувшие строки удаляются, затем new_rows проходится по порядку:
+    совпавшая на месте строка обновляется только при изменении значений,
+    переместившаяся — переносится, новая — вставляется.
+
+    После position в модели стоят еще не размещенные старые строки в
+    исходном порядке, поэтому откуда переносить строку, считается по
+    словарю позиций и дереву Фенвика неразмещенных строк за O(log n),
+    без поиска по списку.
+    """
+    changes = []
+    old_by_id = {row[0]: row for row in old_rows}
+    new_ids = {row[0] for row in new_rows}
+
+    for position in range(len(old_rows) - 1, -1, -1):
+        if old_rows[position][0] not in new_ids:
+            changes.append(("remove", position))
+
+    kept = [row[0] for row in old_rows if row[0] in new_ids]
+    positions = {row_id: position for position, row_id in enumerate(kept)}
+    unplaced = _FenwickTree(len(kept))
+
+    for position, row in enumerate(new_rows):
+        row_id = row[0]
+        if row_id in positions:
+            kept_position = positions[row_id]
+            source = position + unplaced.prefix_sum(kept_position)
+            unplaced.add(kept_position, -1)
+            if source != position:
+                changes.append(("move", source, position))
+            if old_by_id[row_id] != row:
+                changes.append(("update", position, row))
+        else:
+            changes.append(("insert", position, row))
+
+    return changes
+
+
+class _FenwickTree:
+    """Счетчики с префиксными суммами за O(log n); изначально все равны 1"""
+
+    def __init__(self, size):
+        self.tree = [0] * (size + 1)
+        for index in range(1, size + 1):
+            self.tree[index] += 1
+            parent = index + (index & -index)
+            if parent <= size:
+                self.tree[parent] += self.tree[index]
+
+    def add(self, position, delta):
+        index = position + 1
+        while index < len(self.tree):
+            self.tree[index] += delta
+            index += index & -index
+
+    def prefix_sum(self, position):
+        """Сумма счетчиков строго до position"""
+        total = 0
+        while position > 0:
+            total += self.tree[position]
+            position -= position & -position
+        return total
+
+
+class SortColumn:
+    """Описание сортируемой колонки
+
+    Args:
+        expression: SQL-выражение сортировки
+        nullable: Может ли выражение быть NULL (тогда NULL-строки
+            читаются отдельной фазой, чтобы сравнения оставались индексными)
+        value_column: Номер колонки выборки со значением expression, если
+            сортировка идет по скрытому ключу, а не по самой колонке
+    """
+
+    def __init__(self, expression, nullable=False, value_column=None):
+        self.expression = expression
+        self.nullable = nullable
+        self.value_column = value_column
+
+
+class KeysetQueryModel(QAbstractTableModel):
+    """Модель только для чтения с сортировкой в SQL и keyset-пагинацией
+
+    Щелчок по заголовку превращается в ORDER BY <выражение>, <id>, а каждая
+    следующая страница начинается после последней загруженной пары
+    (значение, id) сравнением row value. При индексе по выражению сортировки
+    первая страница и каждая подгрузка стоят O(log n) независимо от размера
+    таблицы и глубины прокрутки.
+
+    NULL в SQLite меньше любых значений, поэтому для nullable-колонок
+    выборка идет в две фазы: при ASC сначала NULL-строки (по id), затем
+    значения; при DESC — наоборот.
+
+    Модель можно создать из готовых строк (initial_rows, например из снимка
+    прошлого запуска): тогда запросов при создании нет, а подгрузка
+    продолжается после последней из них.
+    """
+
+    def __init__(self, db, select_sql, id_expression, sort_columns, where="", params=None,
+                 sort_column=1, sort_order=Qt.SortOrder.AscendingOrder, page_size=200, parent=None,
+                 initial_rows=None, column_names=None):
+        super().__init__(parent)
+        self.db = db
+        self.select_sql = select_sql
+        self.id_expression = id_expression
+        self.sort_columns = sort_columns
+        self.where = where
+        self.params = list(params or [])
+        self.page_size = page_size
+
+        self.sort_column = sort_column
+        self.sort_order = sort_order
+
+        self.rows = []
+        self.column_names = []
+        self.headers = {}
+        self.widest = {}  # колонка -> самое длинное загруженное значение (для ColumnSizer)
+        self._error = QSqlError()
+
+        self._phases = []
+        self._cursor = None  # (значение, id) последней загруженной строки текущей фазы
+        self.generation = 0  # растет при каждой перезагрузке (для отбрасывания устаревших фоновых результатов)
+        self.data_tag = None  # метка версии БД, с которой загружены строки (заполняет владелец модели)
+
+        if initial_rows is not None:
+            self.rows = initial_rows
+            self.column_names = list(column_names or [])
+            self._resume_after(initial_rows[-1] if len(initial_rows) else None)
+        else:
+            self._reset_pages()
+
+    # --- Интерфейс QAbstractTableModel ---
+
+    def rowCount(self, parent=QModelIndex()):
+        return 0 if parent.isValid() else len(self.rows)
+
+    def columnCount(self, parent=QModelIndex()):
+        return 0 if parent.isValid() else len(self.column_names)
+
+    def data(self, index, role=Qt.ItemDataRole.DisplayRole):
+        if not index.isValid() or role not in (Qt.ItemDataRole.DisplayRole, Qt.ItemDataRole.EditRole):
+            return None
+        return self.rows[index.row()][index.column()]
+
+    def headerData(self, section, orientation, role=Qt.ItemDataRole.DisplayRole):
+        if orientation == Qt.Orientation.Horizontal and role == Qt.ItemDataRole.DisplayRole:
+            if section in self.headers:
+                return self.headers[section]
+            if section < len(self.column_names):
+                return self.column_names[section]
+        return super().headerData(section, orientation, role)
+
+    def setHeaderData(self, section, orientation, value, role=Qt.ItemDataRole.EditRole):
+        if orientation != Qt.Orientation.Horizontal:
+            return False
+        self.headers[section] = value
+        self.headerDataChanged.emit(orientation, section, section)
+        return True
+
+    def canFetchMore(self, parent=QModelIndex()):
+        return not parent.isValid() and bool(self._phases)
+
+    def fetchMore(self, parent=QModelIndex()):
+        if parent.isValid():
+            return
+
+        self.detach_rows()
+        page = []
+        while self._phases and len(page) < self.page_size:
+            fetched = self._fetch_phase(self.page_size - len(page))
+            if fetched is None:
+                break
+            page.extend(fetched)
+
+        if page:
+            first = len(self.rows)
+            self.beginInsertRows(QModelIndex(), first, first + len(page) - 1)
+            self.rows.extend(page)
+            self.endInsertRows()
+            self._track_widest(page)
+
+    def sort(self, column, order=Qt.SortOrder.AscendingOrder):
+        """Сортировка на стороне SQL (перезагрузка с первой страницы)
+
+        Повторная сортировка в том же порядке ничего не делает: так
+        включение сортировки в таблице не перечитывает уже показанные строки.
+        Для перечитывания — refresh().
+        """
+        if column not in self.sort_columns:
+            return
+        if (column, order) == (self.sort_column, self.sort_order):
+            return
+        self.sort_column = column
+        self.sort_order = order
+        self._reset_pages()
+
+    def widest_values(self):
+        """Самые длинные значения по колонкам среди загруженных строк"""
+        return dict(self.widest)
+
+    def lastError(self):
+        return self._error
+
+    def set_where(self, where, params=None):
+        """Смена условия отбора (перезагрузка с первой страницы)"""
+        self.where = where
+        self.params = list(params or [])
+        self._reset_pages()
+
+    def refresh(self):
+        """Перечитывание данных с текущей сортировкой"""
+        self._reset_pages()
+
+    def head_query(self, limit):
+        """Запрос первых limit строк в текущем порядке (совпадает с порядком постраничной загрузки)
+
+        Returns:
+            tuple: (текст запроса, параметры)
+        """
+        spec = self.sort_columns.get(self.sort_column)
+        direction = "DESC" if self.sort_order == Qt.SortOrder.DescendingOrder else "ASC"
+
+        # NULL при ASC идут первыми, при DESC — последними, как и фазы загрузки
+        if spec is not None:
+            order = f"{spec.expression} {direction}, {self.id_expression} {direction}"
+        else:
+            order = f"{self.id_expression} {direction}"
+        where_sql = f"WHERE {self.where}" if self.where else ""
+        return f"{self.select_sql} {where_sql} ORDER BY {order} LIMIT ?", self.params + [limit]
+
+    def apply_changes(self, changes):
+        """Применение отличий к загруженным строкам без перезагрузки модели
+
+        Args:
+            changes: Список операций ("remove", позиция), ("insert", позиция, строка),
+                ("move", откуда, куда) и ("update", позиция, строка) в порядке применения
+        """
+        self.detach_rows()
+        last_column = max(self.columnCount() - 1, 0)
+        touched = []
+
+        for change in changes:
+            kind, position = change[0], change[1]
+            if kind == "remove":
+                self.beginRemoveRows(QModelIndex(), position, position)
+                del self.rows[position]
+                self.endRemoveRows()
+            elif kind == "insert":
+                self.beginInsertRows(QModelIndex(), position, position)
+                self.rows.insert(position, change[2])
+                self.endInsertRows()
+                touched.append(change[2])
+            elif kind == "move":
+                target = change[2]
+                self.beginMoveRows(QModelIndex(), position, position, QModelIndex(), target)
+                self.rows.insert(target, self.rows.pop(position))
+                self.endMoveRows()
+            elif kind == "update":
+                self.rows[position] = change[2]
+                self.dataChanged.emit(self.index(position, 0), self.index(position, last_column))
+                touched.append(change[2])
+
+        self._track_widest(touched)
+        self._resume_after(self.rows[-1] if self.rows else None)
+
+    def refresh_rows(self, ids):
+        """Перечитывание строк с указанными id без перезагрузки модели
+
+        Измененная строка обновляется на месте или переезжает на новое место
+        по сортировке, удаленная (или больше не проходящая фильтр) убирается.
+        Новые строки вставляются, только если по сортировке попадают в уже
+        загруженный диапазон; остальные придут при прокрутке.
+        """
+        ids = set(ids)
+        if not ids:
+            return
+
+        fresh = self._select_ids(ids)
+        if fresh is None:
+            return
+
+        self.detach_rows()
+        boundary = self.rows[-1] if self.rows and self._phases else None
+        rows = [row for row in self.rows if row[0] not in ids]
+        for row in fresh:
+            if boundary is not None and self._precedes(boundary, row):
+                continue
+            position = next((i for i, other in enumerate(rows) if self._precedes(row, other)), len(rows))
+            rows.insert(position, row)
+
+        self.apply_changes(diff_rows(self.rows, rows))
+
+    def detach_rows(self):
+        """Копирование строк в собственный список модели
+
+        Строки из снимка читаются по требованию; после копирования источник
+        (файл снимка) можно закрыть.
+        """
+        if not isinstance(self.rows, list):
+            self.rows = list(self.rows)
+
+    def _track_widest(self, page):
+        for row in page:
+            for column, value in enumerate(row):
+                if value is not None:
+                    text = str(value)
+                    if len(text) > len(self.widest.get(column, "")):
+                        self.widest[column] = text
+
+    # --- Построение запросов ---
+
+    def _reset_pages(self):
+        self.beginResetModel()
+        self.rows = []
+        self._error = QSqlError()
+        self.generation += 1
+        self._resume_after(None)
+
+        self._load_column_names()
+        self.endResetModel()
+
+        # Первая страница загружается сразу, остальные — по прокрутке
+        self.fetchMore()
+
+    def _initial_phases(self):
+        spec = self.sort_columns.get(self.sort_column)
+        descending = self.sort_order == Qt.SortOrder.DescendingOrder
+        if spec is None:
+            return ["id"]
+        if not spec.nullable:
+            return ["value"]
+        return ["value", "null"] if descending else ["null", "value"]
+
+    def _resume_after(self, last_row):
+        """Фазы и курсор для продолжения загрузки после строки last_row (None — с начала)"""
+        self._phases = self._initial_phases()
+        self._cursor = None
+        if last_row is None:
+            return
+
+        spec = self.sort_columns.get(self.sort_column)
+        sort_value = self._sort_value(last_row, spec)
+        if spec is None:
+            phase = "id"
+        else:
+            phase = "null" if spec.nullable and sort_value is None else "value"
+        self._phases = self._phases[self._phases.index(phase):]
+        self._cursor = (sort_value, last_row[0])
+
+    def _sort_value(self, row, spec):
+        """Значение сортировки строки; берется из той же колонки, по которой сортируем"""
+        if spec is None:
+            return None
+        value_column = spec.value_column if spec.value_column is not None else self.sort_column
+        return row[value_column]
+
+    def _precedes(self, left, right):
+        """Идет ли строка left раньше right в текущем порядке (как ORDER BY выражение, id)"""
+        spec = self.sort_columns.get(self.sort_column)
+
+        def order_key(row):
+            if spec is None:
+                return (row[0],)
+            value = self._sort_value(row, spec)
+            # NULL в SQLite меньше любых значений
+            return (0, row[0]) if value is None else (1, value, row[0])
+
+        if self.sort_order == Qt.SortOrder.DescendingOrder:
+            return order_key(left) > order_key(right)
+        return order_key(left) < order_key(right)
+
+    def _select_ids(self, ids):
+        """Текущие строки выборки с указанными id (с учетом фильтра модели)"""
+        placeholders = ", ".join("?" * len(ids))
+        conditions = [f"{self.id_expression} IN ({placeholders})"]
+        if self.where:
+            conditions.insert(0, f"({self.where})")
+
+        query = DatabaseManager.query(self.db)
+        query.prepare(f"{self.select_sql} WHERE {' AND '.join(conditions)}")
+        for value in list(self.params) + list(ids):
+            query.addBindValue(value)
+        if not query.exec():
+            print(f"Ошибка перечитывания строк: {query.lastError().text()}")
+            return None
+
+        rows = []
+        column_count = query.record().count()
+        while query.next():
+            rows.append(tuple(query.value(i) for i in range(column_count)))
+        return rows
+
+    def _load_column_names(self):
+        """Имена колонок из пустой выборки"""
+        if self.column_names:
+            return
+        query = DatabaseManager.query(self.db)
+        if query.exec(f"SELECT * FROM ({self.select_sql}) LIMIT 0"):
+            record = query.record()
+            self.column_names = [record.fieldName(i) for i in range(record.count())]
+        else:
+            self._error = query.lastError()
+
+    def _fetch_phase(self, limit):
+        """Страница текущей фазы; при исчерпании фазы переходит к следующей"""
+        phase = self._phases[0]
+        spec = self.sort_columns.get(self.sort_column)
+        descending = self.sort_order == Qt.SortOrder.DescendingOrder
+        direction = "DESC" if descending else "ASC"
+        comparison = "<" if descending else ">"
+
+        conditions = [f"({self.where})"] if self.where else []
+        params = list(self.params)
+
+        if phase == "value":
+            expression = spec.expression
+            if spec.nullable:
+                conditions.append(f"{expression} IS NOT NULL")
+            if self._cursor is not None:
+                conditions.append(f"({expression}, {self.id_expression}) {comparison} (?, ?)")
+                params.extend(self._cursor)
+            order = f"{expression} {direction}, {self.id_expression} {direction}"
+        else:
+            expression = spec.expression if spec is not None else None
+            if phase == "null":
+                conditions.append(f"{expression} IS NULL")
+            if self._cursor is not None:
+                conditions.append(f"{self.id_expression} {comparison} ?")
+                params.append(self._cursor[1])
+            order = f"{self.id_expression} {direction}"
+
+        where_sql = f"WHERE {' AND '.join(conditions)}" if conditions else ""
+        query_text = f"{self.select_sql} {where_sql} ORDER BY {order} LIMIT ?"
+        params.append(limit)
+
+        query = DatabaseManager.query(self.db)
+        query.prepare(query_text)
+        for value in params:
+            query.addBindValue(value)
+
+        if not query.exec():
+            self._error = query.lastError()
+            print(f"Ошибка загрузки страницы: {self._error.text()}")
+            self._phases = []
+            return None
+
+        page = []
+        column_count = query.record().count()
+        while query.next():
+            page.append(tuple(query.value(i) for i in range(column_count)))
+
+        if page:
+            self._cursor = (self._sort_value(page[-1], spec), page[-1][0])
+
+        if len(page) < limit:
+            # Фаза исчерпана: следующая начинается с начала своего диапазона
+            self._phases.pop(0)
+            self._cursor = None
+        return page
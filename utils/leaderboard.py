@@ -0,0 +1,263 @@
+import json
+import time
+from datetime import date, datetime
+
+from config.cfg import Config
+
+
+class RefreshStats:
+    """Итог обновления кэша рейтинга"""
+
+    def __init__(self):
+        self.full = False
+        self.players = 0  # игроков с изменениями в журнале
+        self.classes = 0  # пересчитанных классов
+        self.rescored = 0
+        self.reranked = 0
+        self.week_closed = None
+        self.elapsed_ms = 0.0
+
+
+class Leaderboard:
+    """Составной рейтинг игроков с кэшем в таблице PlayerScores
+
+    Балл — взвешенная сумма показателей активности и вклада, каждый из
+    которых нормирован внутри класса через CUME_DIST() (доля игроков класса
+    с показателем не выше: лучший в классе получает 1, и класс из одного
+    игрока не обнуляется). Итог умножается на 100 и делится на сумму весов.
+    Веса берутся из раздела "score" config.json:
+        {"score": {"weights": {"weekly_damage": 3, "help_count": 1}}}
+
+    refresh() читает ChangeLog после последней обработанной записи и
+    пересчитывает только классы, где есть изменившиеся игроки (нормировка
+    зависит от всего класса), а места в гильдии обновляет одной оконной
+    выборкой по кэшу, записывая только строки, у которых место сдвинулось.
+    Полный пересчет — при первом запуске, смене весов или если нужные
+    записи журнала уже сжаты.
+
+    При переходе на новую неделю места фиксируются в ScoreHistory и
+    становятся previous_rank: изменение за неделю — previous_rank - rank.
+    """
+
+    METRICS = {
+        "weekly_damage": ("Activity", "Урон за неделю"),
+        "raid_participation": ("Activity", "Рейды"),
+        "weekly_crafts": ("Activity", "Крафт за неделю"),
+        "resources_contributed": ("GuildContribution", "Ресурсы"),
+        "help_count": ("GuildContribution", "Помощь")
+    }
+
+    DEFAULT_WEIGHTS = {
+        "weekly_damage": 0.35,
+        "raid_participation": 0.2,
+        "weekly_crafts": 0.1,
+        "resources_contributed": 0.2,
+        "help_count": 0.15
+    }
+
+    # Таблицы, изменения в которых влияют на балл или класс игрока
+    SOURCE_TABLES = ("Players", "Activity", "GuildContribution")
+
+    # При большем числе изменившихся игроков дешевле пересчитать всех
+    FULL_REFRESH_PLAYERS = 2000
+
+    # Сколько недель истории мест хранить
+    HISTORY_WEEKS = 12
+
+    HEADERS = ["Место", "±", "Никнейм", "Тег", "Класс", "Балл", "Место в классе"]
+
+    TOP_QUERY = """
+        SELECT s.rank, s.previous_rank - s.rank, p.nickname, p.tag, c.name, ROUND(s.score, 1), s.class_rank
+        FROM PlayerScores s
+        JOIN Players p ON p.id = s.player_id
+        LEFT JOIN Classes c ON c.id = s.class_id
+        ORDER BY s.rank
+        LIMIT ?
+    """
+
+    TOP_CLASS_QUERY = """
+        SELECT s.rank, s.previous_rank - s.rank, p.nickname, p.tag, c.name, ROUND(s.score, 1), s.class_rank
+        FROM PlayerScores s
+        JOIN Players p ON p.id = s.player_id
+        LEFT JOIN Classes c ON c.id = s.class_id
+        WHERE s.class_id = ?
+        ORDER BY s.class_rank
+        LIMIT ?
+    """
+
+    def __init__(self, weights=None):
+        configured = weights or Config().get("score", "weights", None) or self.DEFAULT_WEIGHTS
+        self.weights = {metric: float(configured[metric]) for metric in self.METRICS if configured.get(metric)}
+        if not self.weights:
+            print("Ошибка настроек рейтинга: все веса нулевые, используются веса по умолчанию")
+            self.weights = dict(self.DEFAULT_WEIGHTS)
+
+    @staticmethod
+    def current_week(day=None):
+        year, week, _ = (day or date.today()).isocalendar()
+        return f"{year}-W{week:02d}"
+
+    def refresh(self, conn, full=False, week=None):
+        """Обновление кэша по журналу изменений
+
+        Args:
+            conn: Соединение sqlite3 с БД гильдии
+            full: Пересчитать всех игроков
+            week: Текущая неделя (по умолчанию — по календарю)
+        """
+        stats = RefreshStats()
+        started = time.perf_counter()
+        week = week or self.current_week()
+        weights_key = json.dumps(self.weights, sort_keys=True)
+
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            state = conn.execute("SELECT seq, week, weights FROM ScoreState WHERE id = 1").fetchone()
+            max_seq = conn.execute("SELECT COALESCE(MAX(seq), 0) FROM ChangeLog").fetchone()[0]
+            compacted = conn.execute("SELECT compacted_seq FROM ChangeLogCompaction WHERE id = 1").fetchone()
+            stats.full = (full or state is None or state[2] != weights_key
+                          or (compacted is not None and state[0] < compacted[0]))
+
+            if state is not None and state[1] != week:
+                stats.week_closed = state[1]
+                self._close_week(conn, state[1])
+
+            player_ids = set() if stats.full else self._changed_players(conn, state[0])
+            stats.players = len(player_ids)
+            stats.full = stats.full or len(player_ids) > self.FULL_REFRESH_PLAYERS
+
+            if stats.full:
+                stats.rescored = self._rescore(conn, None, None)
+            elif player_ids:
+                class_ids = self._classes_of(conn, player_ids)
+                stats.classes = len(class_ids)
+                stats.rescored = self._rescore(conn, class_ids, player_ids)
+
+            if stats.full or stats.rescored or stats.week_closed:
+                stats.reranked = self._rerank(conn)
+
+            conn.execute("""
+                INSERT INTO ScoreState (id, seq, week, weights) VALUES (1, ?, ?, ?)
+                ON CONFLICT(id) DO UPDATE SET seq = excluded.seq, week = excluded.week, weights = excluded.weights
+            """, (max_seq, week, weights_key))
+            conn.commit()
+        except Exception:
+            conn.rollback()
+            raise
+
+        stats.elapsed_ms = (time.perf_counter() - started) * 1000
+        return stats
+
+    def top(self, conn, limit=20, class_id=None):
+        """Первые limit мест (в гильдии или в классе) из кэша"""
+        if class_id is None:
+            return conn.execute(self.TOP_QUERY, (limit,)).fetchall()
+        return conn.execute(self.TOP_CLASS_QUERY, (class_id, limit)).fetchall()
+
+    def _changed_players(self, conn, seq):
+        placeholders = ", ".join("?" for _ in self.SOURCE_TABLES)
+        return {row[0] for row in conn.execute(f"""
+            SELECT DISTINCT player_id FROM ChangeLog
+            WHERE seq > ? AND player_id IS NOT NULL AND table_name IN ({placeholders})
+        """, (seq, *self.SOURCE_TABLES))}
+
+    @staticmethod
+    def _classes_of(conn, player_ids):
+        """Классы, которые нужно пересчитать: текущие и прежние (из кэша) классы игроков"""
+        placeholders = ", ".join("?" for _ in player_ids)
+        ids = list(player_ids)
+        return {row[0] for row in conn.execute(f"""
+            SELECT class_id FROM Players WHERE id IN ({placeholders})
+            UNION
+            SELECT class_id FROM PlayerScores WHERE player_id IN ({placeholders})
+        """, ids + ids)}
+
+    def _rescore(self, conn, class_ids, player_ids):
+        """Пересчет баллов классов class_ids (None — всех); возвращает число строк"""
+        metrics = list(self.weights)
+        weighted = " + ".join(
+            f"? * CUME_DIST() OVER (PARTITION BY class_id ORDER BY {metric})" for metric in metrics)
+        # Параметры в порядке текста запроса: веса, сумма весов, время расчета, классы из WHERE
+        params = [self.weights[metric] for metric in metrics]
+        params += [sum(self.weights.values()), datetime.now().isoformat(timespec="seconds")]
+
+        where = ""
+        if class_ids is not None and not class_ids:
+            # Все изменившиеся игроки уже удалены (например, добавлен и удален
+            # между обновлениями): пересчитывать нечего, только убрать их из кэша
+            return self._remove_deleted(conn, player_ids)
+        if class_ids is not None:
+            known = [class_id for class_id in class_ids if class_id is not None]
+            conditions = [f"p.class_id IN ({', '.join('?' for _ in known)})"] if known else []
+            if None in class_ids:
+                conditions.append("p.class_id IS NULL")
+            where = "WHERE " + " OR ".join(conditions)
+            params += known
+
+        # Строки обновляются на месте, чтобы не потерять previous_rank
+        if class_ids is None:
+            removed = conn.execute("DELETE FROM PlayerScores WHERE player_id NOT IN (SELECT id FROM Players)").rowcount
+        else:
+            removed = self._remove_deleted(conn, player_ids)
+
+        cursor = conn.execute(f"""
+            INSERT INTO PlayerScores (player_id, class_id, score, computed_at)
+            SELECT player_id, class_id, 100.0 * ({weighted}) / ?, ?
+            FROM (
+                SELECT
+                    p.id as player_id,
+                    p.class_id,
+                    COALESCE(a.weekly_damage, 0) as weekly_damage,
+                    COALESCE(a.raid_participation, 0) as raid_participation,
+                    COALESCE(a.weekly_crafts, 0) as weekly_crafts,
+                    COALESCE(gc.resources_contributed, 0) as resources_contributed,
+                    COALESCE(gc.help_count, 0) as help_count
+                FROM Players p
+                LEFT JOIN Activity a ON a.player_id = p.id
+                LEFT JOIN GuildContribution gc ON gc.player_id = p.id
+                {where}
+            )
+            WHERE true
+            ON CONFLICT(player_id) DO UPDATE SET
+                class_id = excluded.class_id, score = excluded.score, computed_at = excluded.computed_at
+        """, params)
+        return cursor.rowcount + removed
+
+    @staticmethod
+    def _remove_deleted(conn, player_ids):
+        """Удаление из кэша игроков из player_ids, которых больше нет в Players"""
+        placeholders = ", ".join("?" for _ in player_ids)
+        return conn.execute(f"""
+            DELETE FROM PlayerScores
+            WHERE player_id IN ({placeholders}) AND player_id NOT IN (SELECT id FROM Players)
+        """, list(player_ids)).rowcount
+
+    @staticmethod
+    def _rerank(conn):
+        """Места в гильдии и в классе по кэшу; пишутся только сдвинувшиеся строки"""
+        return conn.execute("""
+            UPDATE PlayerScores
+            SET rank = ranked.rank, class_rank = ranked.class_rank
+            FROM (
+                SELECT
+                    player_id,
+                    RANK() OVER (ORDER BY score DESC) as rank,
+                    RANK() OVER (PARTITION BY class_id ORDER BY score DESC) as class_rank
+                FROM PlayerScores
+            ) as ranked
+            WHERE PlayerScores.player_id = ranked.player_id
+                AND (PlayerScores.rank IS NOT ranked.rank OR PlayerScores.class_rank IS NOT ranked.class_rank)
+        """).rowcount
+
+    def _close_week(self, conn, week):
+        """Фиксация мест на конец недели и перенос их в previous_rank"""
+        conn.execute("""
+            INSERT OR REPLACE INTO ScoreHistory (week, player_id, score, rank)
+            SELECT ?, player_id, score, rank FROM PlayerScores
+        """, (week,))
+        conn.execute("UPDATE PlayerScores SET previous_rank = rank")
+        conn.execute("""
+            DELETE FROM ScoreHistory WHERE week NOT IN (
+                SELECT DISTINCT week FROM ScoreHistory ORDER BY week DESC LIMIT ?
+            )
+        """, (self.HISTORY_WEEKS,))
@@ -0,0 +1,147 @@
+import sqlite3
+import threading
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+
+from config.cfg import ConnectionProfile
+from utils.event_history import EventHistoryModel
+from utils.reference_data import ReferenceData
+
+
+# Данные игрока для диалога детального просмотра (по одной строке на игрока)
+PLAYER_DETAILS_QUERY = f"""
+    SELECT
+        p.nickname,
+        p.tag,
+        p.class_id,
+        c.name as class_name,
+        p.level,
+        p.joined_date,
+        p.guild_status,
+        COALESCE(a.weekly_damage, 0) as weekly_damage,
+        COALESCE(a.raid_participation, 0) as raid_participation,
+        COALESCE(gc.leadership_rank, '{ReferenceData.DEFAULT_RANK}') as leadership_rank,
+        COALESCE(gc.resources_contributed, 0) as resources_contributed
+    FROM Players p
+    LEFT JOIN Classes c ON p.class_id = c.id
+    LEFT JOIN Activity a ON p.id = a.player_id
+    LEFT JOIN GuildContribution gc ON p.id = gc.player_id
+    WHERE p.id = ?
+"""
+
+PLAYER_DETAILS_FIELDS = [
+    "nickname", "tag", "class_id", "class_name", "level", "joined_date", "guild_status",
+    "weekly_damage", "raid_participation", "leadership_rank", "resources_contributed"
+]
+
+
+class PlayerDetailsCache:
+    """Ограниченный LRU-кэш данных игроков (ключ — id игрока)
+
+    Кэш потокобезопасен: заполняется фоновым потоком предзагрузки и читается
+    из GUI-потока. Каждое invalidate увеличивает версию, поэтому результат
+    предзагрузки, начатой до сохранения, не перезапишет свежие данные.
+    """
+
+    def __init__(self, max_size=64):
+        self.max_size = max_size
+        self._items = OrderedDict()
+        self._lock = threading.Lock()
+        self.version = 0
+
+    def get(self, player_id):
+        """Данные игрока из кэша или None"""
+        with self._lock:
+            details = self._items.get(player_id)
+            if details is not None:
+                self._items.move_to_end(player_id)
+            return details
+
+    def contains(self, player_id):
+        with self._lock:
+            return player_id in self._items
+
+    def put(self, player_id, details, version=None):
+        """Сохранение данных; устаревшая версия игнорируется"""
+        with self._lock:
+            if version is not None and version != self.version:
+                return
+            self._items[player_id] = details
+            self._items.move_to_end(player_id)
+            while len(self._items) > self.max_size:
+                self._items.popitem(last=False)
+
+    def invalidate(self, player_id=None):
+        """Сброс данных одного игрока или всего кэша"""
+        with self._lock:
+            self.version += 1
+            if player_id is None:
+                self._items.clear()
+            else:
+                self._items.pop(player_id, None)
+
+
+class PlayerPrefetcher:
+    """Фоновая предзагрузка данных игроков в PlayerDetailsCache
+
+    Работает в одном фоновом потоке через отдельное sqlite3-соединение
+    (соединения QtSql нельзя использовать вне GUI-потока).
+    """
+
+    def __init__(self, cache):
+        self.cache = cache
+        self._executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="prefetch")
+        self._pending = set()
+        self._lock = threading.Lock()
+
+    def prefetch(self, player_ids, db_path):
+        """Постановка игроков в очередь предзагрузки"""
+        with self._lock:
+            ids = [pid for pid in player_ids
+                   if pid is not None and pid not in self._pending and not self.cache.contains(pid)]
+            if not ids:
+                return
+            self._pending.update(ids)
+
+        self._executor.submit(self._load_batch, ids, db_path, self.cache.version)
+
+    def shutdown(self):
+        """Остановка фонового потока"""
+        self._executor.shutdown(wait=False, cancel_futures=True)
+
+    def _load_batch(self, player_ids, db_path, version):
+        try:
+            if not Path(db_path).exists():
+                return
+            conn = ConnectionProfile.active().connect(db_path, read_only=True)
+            try:
+                for player_id in player_ids:
+                    details = self.load_details(conn, player_id)
+                    if details is not None:
+                        self.cache.put(player_id, details, version)
+            finally:
+                conn.close()
+        except sqlite3.Error as e:
+            print(f"Ошибка предзагрузки игроков: {e}")
+        finally:
+            with self._lock:
+                self._pending.difference_update(player_ids)
+
+    @staticmethod
+    def load_details(conn, player_id):
+        """Чтение данных игрока и первой страницы истории через sqlite3
+
+        Returns:
+            dict или None: Данные в формате PlayerDetailDialog.fill_player_data
+        """
+        row = conn.execute(PLAYER_DETAILS_QUERY, (player_id,)).fetchone()
+        if row is None:
+            return None
+
+        details = dict(zip(PLAYER_DETAILS_FIELDS, row))
+
+        page = conn.execute(EventHistoryModel.FIRST_PAGE_QUERY,
+                            (player_id, EventHistoryModel.PAGE_SIZE)).fetchall()
+        details['history'] = EventHistoryModel.split_first_page(page)
+        return details
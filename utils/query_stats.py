@@ -0,0 +1,201 @@
+import logging
+import re
+import threading
+import time
+from logging.handlers import RotatingFileHandler
+from pathlib import Path
+
+from PyQt6.QtSql import QSqlQuery
+
+
+class StatementStats:
+    """Статистика по одной форме запроса"""
+
+    # Верхние границы корзин гистограммы задержек, мс
+    BUCKETS = [1, 2, 5, 10, 20, 50, 100, 200, 500, 1000, float("inf")]
+
+    def __init__(self, shape):
+        self.shape = shape
+        self.count = 0
+        self.total_ms = 0.0
+        self.max_ms = 0.0
+        self.rows = 0
+        self.histogram = [0] * len(self.BUCKETS)
+        self.plan = None
+
+    def add(self, elapsed_ms, rows):
+        self.count += 1
+        self.total_ms += elapsed_ms
+        self.max_ms = max(self.max_ms, elapsed_ms)
+        if rows is not None and rows >= 0:
+            self.rows += rows
+        for i, bound in enumerate(self.BUCKETS):
+            if elapsed_ms <= bound:
+                self.histogram[i] += 1
+                break
+
+    @property
+    def avg_ms(self):
+        return self.total_ms / self.count if self.count else 0.0
+
+    def percentile(self, fraction):
+        """Оценка перцентиля по гистограмме (верхняя граница корзины)"""
+        target = self.count * fraction
+        seen = 0
+        for bound, hits in zip(self.BUCKETS, self.histogram):
+            seen += hits
+            if seen >= target and hits:
+                return min(bound, self.max_ms)
+        return self.max_ms
+
+
+class QueryStats:
+    """Сбор статистики выполнения SQL-запросов
+
+    Запросы группируются по форме (литералы заменяются на ?). Для каждой
+    формы ведется гистограмма задержек и число строк; для запросов дольше
+    порога один раз снимается EXPLAIN QUERY PLAN, а сам запрос пишется
+    в ротируемый журнал медленных запросов.
+    """
+
+    slow_threshold_ms = 100
+    log_path = "logs/slow_queries.log"
+
+    _instance = None
+
+    def __init__(self):
+        self._stats = {}
+        self._lock = threading.Lock()
+        self._logger = None
+
+    @classmethod
+    def instance(cls):
+        if cls._instance is None:
+            cls._instance = cls()
+        return cls._instance
+
+    @staticmethod
+    def normalize(query_text):
+        """Приведение запроса к форме без литералов"""
+        shape = re.sub(r"'(?:[^']|'')*'", "?", query_text)
+        shape = re.sub(r"\b\d+(\.\d+)?\b", "?", shape)
+        shape = re.sub(r"\(\s*\?(\s*,\s*\?)+\s*\)", "(?, ...)", shape)
+        return re.sub(r"\s+", " ", shape).strip()
+
+    def record(self, query_text, elapsed_ms, rows=None, db=None, bound_values=None):
+        """Регистрация выполнения запроса"""
+        shape = self.normalize(query_text)
+        with self._lock:
+            stats = self._stats.get(shape)
+            if stats is None:
+                stats = self._stats[shape] = StatementStats(shape)
+            stats.add(elapsed_ms, rows)
+            need_plan = elapsed_ms >= self.slow_threshold_ms and stats.plan is None
+
+        if elapsed_ms >= self.slow_threshold_ms:
+            if need_plan and db is not None:
+                stats.plan = self._explain(db, query_text, bound_values)
+            self._log_slow(query_text, elapsed_ms, rows, stats.plan)
+
+    def add_rows(self, query_text, rows):
+        """Добавление числа строк выборки, прочитанной до конца"""
+        with self._lock:
+            stats = self._stats.get(self.normalize(query_text))
+            if stats is not None:
+                stats.rows += rows
+
+    def top(self, limit=20, key="total_ms"):
+        """Худшие формы запросов по выбранному показателю"""
+        with self._lock:
+            items = list(self._stats.values())
+        return sorted(items, key=lambda s: getattr(s, key), reverse=True)[:limit]
+
+    def reset(self):
+        with self._lock:
+            self._stats.clear()
+
+    @staticmethod
+    def _explain(db, query_text, bound_values=None):
+        """План выполнения запроса (EXPLAIN QUERY PLAN)"""
+        if not query_text.lstrip().upper().startswith(("SELECT", "WITH", "UPDATE", "DELETE", "INSERT")):
+            return None
+
+        query = QSqlQuery(db)
+        query.prepare(f"EXPLAIN QUERY PLAN {query_text}")
+        for value in bound_values or []:
+            query.addBindValue(value)
+        if not query.exec():
+            return f"Не удалось получить план: {query.lastError().text()}"
+
+        lines = []
+        while query.next():
+            lines.append(str(query.value(3)))
+        return "\n".join(lines)
+
+    def _log_slow(self, query_text, elapsed_ms, rows, plan):
+        """Запись в журнал медленных запросов"""
+        try:
+            if self._logger is None:
+                Path(self.log_path).parent.mkdir(parents=True, exist_ok=True)
+                logger = logging.getLogger("ligma.slow_queries")
+                logger.setLevel(logging.INFO)
+                logger.propagate = False
+                handler = RotatingFileHandler(self.log_path, maxBytes=1024 * 1024, backupCount=5, encoding="utf-8")
+                handler.setFormatter(logging.Formatter("%(asctime)s %(message)s"))
+                logger.addHandler(handler)
+                self._logger = logger
+
+            statement = re.sub(r"\s+", " ", query_text).strip()
+            message = f"{elapsed_ms:.1f} ms, rows={rows}: {statement}"
+            if plan:
+                plan_text = plan.replace("\n", "; ")
+                message += f"\n    plan: {plan_text}"
+            self._logger.info(message)
+        except OSError as e:
+            print(f"Ошибка записи журнала медленных запросов: {e}")
+
+
+class InstrumentedQuery(QSqlQuery):
+    """QSqlQuery, сообщающий время выполнения и число строк в QueryStats
+
+    Время фиксируется при exec(). Для выборок строки подсчитываются в next()
+    и добавляются в статистику, когда выборка прочитана до конца; для
+    изменяющих запросов используется numRowsAffected.
+    """
+
+    def __init__(self, db):
+        super().__init__(db)
+        self._db = db
+        self._query_text = None
+        self._rows = 0
+        self._counting = False
+
+    def exec(self, query_text=None):
+        started = time.perf_counter()
+        ok = super().exec() if query_text is None else super().exec(query_text)
+        elapsed_ms = (time.perf_counter() - started) * 1000
+
+        self._query_text = query_text if query_text is not None else self.lastQuery()
+        self._rows = 0
+        self._counting = ok and self.isSelect()
+
+        rows = None if not ok or self.isSelect() else self.numRowsAffected()
+        QueryStats.instance().record(self._query_text, elapsed_ms, rows, self._db, self._bound_values())
+        return ok
+
+    def next(self):
+        has_row = super().next()
+        if self._counting:
+            if has_row:
+                self._rows += 1
+            else:
+                self._counting = False
+                QueryStats.instance().add_rows(self._query_text, self._rows)
+        return has_row
+
+    def _bound_values(self):
+        try:
+            values = self.boundValues()
+            return list(values.values()) if isinstance(values, dict) else list(values)
+        except Exception:
+            return []
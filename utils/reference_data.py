@@ -0,0 +1,131 @@
+from PyQt6.QtCore import QObject, pyqtSignal
+from PyQt6.QtSql import QSqlDatabase
+
+from utils.database import DatabaseManager
+
+
+class ReferenceData(QObject):
+    """Общий для процесса кэш справочных данных (классы, статусы, роли)
+
+    Справочники читаются из БД один раз и дальше отдаются из памяти.
+    После изменения таблицы Classes кэш сбрасывается через invalidate(),
+    а подписчики получают сигнал changed.
+    """
+
+    changed = pyqtSignal()
+
+    DEFAULT_STATUS = "Активен"
+    DEFAULT_RANK = "Участник"
+
+    STATUSES = ["Активен", "Неактивен", "В отпуске", "Заморожен", "Исключен"]
+    RANKS = ["Лидер", "Заместитель", "Офицер", "Участник", "Новичок"]
+
+    # Таблицы, изменение которых требует сброса кэша
+    CACHED_TABLES = ("Classes",)
+
+    _instance = None
+
+    def __init__(self):
+        super().__init__()
+        self._classes = None
+        self._statuses = None
+        self._ranks = None
+
+    @classmethod
+    def instance(cls):
+        """Единственный экземпляр кэша"""
+        if cls._instance is None:
+            cls._instance = cls()
+        return cls._instance
+
+    def invalidate(self):
+        """Сброс кэша и уведомление подписчиков"""
+        self._classes = None
+        self._statuses = None
+        self._ranks = None
+        self.changed.emit()
+
+    def classes(self, db=None):
+        """Список классов [(id, name)], отсортированный по названию"""
+        if self._classes is None:
+            self._load(db)
+        return self._classes
+
+    def class_names(self, db=None):
+        """Список названий классов"""
+        return [name for _, name in self.classes(db)]
+
+    def statuses(self, db=None):
+        """Статусы в гильдии: известные значения и встречающиеся в БД"""
+        if self._statuses is None:
+            self._load(db)
+        return self._statuses
+
+    def ranks(self, db=None):
+        """Роли в руководстве: известные значения и встречающиеся в БД"""
+        if self._ranks is None:
+            self._load(db)
+        return self._ranks
+
+    def _load(self, db=None):
+        """Загрузка всех справочников (один раз до следующего invalidate)"""
+        db = db or QSqlDatabase.database()
+        self._classes = []
+        self._statuses = list(self.STATUSES)
+        self._ranks = list(self.RANKS)
+
+        if not db.isOpen():
+            print("База данных не открыта")
+            return
+
+        query = DatabaseManager.query(db)
+        if query.exec("SELECT id, name FROM Classes ORDER BY name"):
+            while query.next():
+                if query.value(1):
+                    self._classes.append((query.value(0), query.value(1)))
+        else:
+            print(f"Ошибка загрузки классов: {query.lastError().text()}")
+
+        # Значения, которые уже есть в БД, но отсутствуют в стандартных списках
+        extra_values = [
+            ("SELECT DISTINCT guild_status FROM Players", self._statuses),
+            ("SELECT DISTINCT leadership_rank FROM GuildContribution", self._ranks)
+        ]
+        for query_text, values in extra_values:
+            if query.exec(query_text):
+                while query.next():
+                    value = query.value(0)
+                    if value and value not in values:
+                        values.append(value)
+
+    def fill_class_combo(self, combo, all_item=None, with_ids=True):
+        """Заполнение комбобокса классами из кэша
+
+        Args:
+            combo: QComboBox
+            all_item: Текст пункта "все" в начале списка (если нужен)
+            with_ids: Сохранять id класса в userData элемента
+        """
+        combo.clear()
+        if all_item:
+            combo.addItem(all_item)
+        for class_id, class_name in self.classes():
+            if with_ids:
+                combo.addItem(class_name, class_id)
+            else:
+                combo.addItem(class_name)
+
+    def fill_status_combo(self, combo, all_item=None):
+        """Заполнение комбобокса статусами"""
+        self._fill_text_combo(combo, self.statuses(), all_item)
+
+    def fill_rank_combo(self, combo, all_item=None):
+        """Заполнение комбобокса ролями"""
+        self._fill_text_combo(combo, self.ranks(), all_item)
+
+    @staticmethod
+    def _fill_text_combo(combo, values, all_item=None):
+        combo.clear()
+        if all_item:
+            combo.addItem(all_item)
+        combo.addItems(values)
@@ -0,0 +1,423 @@
+import sqlite3
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+from itertools import islice
+from pathlib import Path
+
+from PyQt6.QtCore import QObject, pyqtSignal
+
+from config.cfg import Config, ConnectionProfile
+from data.sqlite.change_log import TRACKED_TABLES, compact_change_log
+
+
+class SqliteReplicaTarget:
+    """Реплика в отдельном файле SQLite
+
+    Таблицы реплики повторяют логические таблицы источника (в компактной
+    схеме — колонки представлений, а не *_data) без внешних ключей: строки
+    пачки применяются в порядке журнала, а не в порядке зависимостей.
+    Отметка синхронизации хранится в самой реплике (ReplicaState) и
+    меняется в той же транзакции, что и строки, поэтому повтор пачки после
+    сбоя ничего не ломает.
+
+    Другая целевая БД (например, MariaDB) подключается классом с теми же
+    методами: ensure_table, checkpoint, apply, replace_all, rows, close.
+    """
+
+    STATE = """
+        CREATE TABLE IF NOT EXISTS ReplicaState (
+            source TEXT PRIMARY KEY,
+            seq INTEGER NOT NULL,
+            synced_at TEXT
+        )
+    """
+
+    def __init__(self, path):
+        self.path = Path(path)
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self.conn = ConnectionProfile.active().connect(str(self.path))
+        self.conn.execute(self.STATE)
+        self.conn.commit()
+
+    def ensure_table(self, table, columns):
+        """Создание таблицы реплики и недостающих колонок
+
+        Args:
+            columns: Список (имя, объявленный тип) из PRAGMA table_info источника
+        """
+        definitions = {name: "INTEGER PRIMARY KEY" if name == "id" else declared for name, declared in columns}
+        existing = [row[1] for row in self.conn.execute(f"PRAGMA table_info({table})")]
+        if not existing:
+            self.conn.execute(f"CREATE TABLE {table} ("
+                              + ", ".join(f"{name} {declared}" for name, declared in definitions.items()) + ")")
+        else:
+            for name, declared in definitions.items():
+                if name not in existing:
+                    self.conn.execute(f"ALTER TABLE {table} ADD COLUMN {name} {declared}")
+        self.conn.commit()
+
+    def checkpoint(self, source):
+        """Последний примененный seq журнала источника (None — реплика не заполнена)"""
+        row = self.conn.execute("SELECT seq FROM ReplicaState WHERE source = ?", (source,)).fetchone()
+        return row[0] if row else None
+
+    def apply(self, source, changes, seq):
+        """Применение пачки изменений одной транзакцией
+
+        Args:
+            changes: {таблица: (колонки, строки для вставки/замены, id для удаления)}
+            seq: Отметка журнала, до которой реплика будет актуальна (None — не менять)
+        """
+        with self.conn:
+            for table, (columns, rows, deleted_ids) in changes.items():
+                if rows:
+                    placeholders = ", ".join("?" for _ in columns)
+                    self.conn.executemany(
+                        f"INSERT OR REPLACE INTO {table} ({', '.join(columns)}) VALUES ({placeholders})", rows)
+                if deleted_ids:
+                    self.conn.executemany(f"DELETE FROM {table} WHERE id = ?", [(row_id,) for row_id in deleted_ids])
+            if seq is not None:
+                self._set_checkpoint(source, seq)
+
+    def replace_all(self, source, tables):
+        """Очистка таблиц перед полным копированием (отметка сбрасывается)"""
+        with self.conn:
+            for table in tables:
+                self.conn.execute(f"DELETE FROM {table}")
+            self.conn.execute("DELETE FROM ReplicaState WHERE source = ?", (source,))
+
+    def rows(self, table, columns):
+        """Строки таблицы по возрастанию id (для проверки)"""
+        return self.conn.execute(f"SELECT {', '.join(columns)} FROM {table} ORDER BY id")
+
+    def close(self):
+        self.conn.close()
+
+    def _set_checkpoint(self, source, seq):
+        self.conn.execute("""
+            INSERT INTO ReplicaState (source, seq, synced_at) VALUES (?, ?, ?)
+            ON CONFLICT(source) DO UPDATE SET seq = excluded.seq, synced_at = excluded.synced_at
+        """, (source, seq, datetime.now().isoformat(timespec="seconds")))
+
+
+class SyncResult:
+    """Итог одной синхронизации"""
+
+    def __init__(self, source, replica):
+        self.source = source
+        self.replica = replica
+        self.full_copy = False
+        self.from_seq = None
+        self.to_seq = None
+        self.batches = 0
+        self.upserted = 0
+        self.deleted = 0
+        self.compacted = 0
+        self.elapsed_ms = 0.0
+        self.verification = None
+        self.error = None
+
+    @property
+    def ok(self):
+        return self.error is None and (self.verification is None or self.verification.ok)
+
+
+class VerifyResult:
+    """Итог сравнения реплики с источником
+
+    mismatches: {таблица: {"missing": [...], "extra": [...], "different": [...]}}
+    (id строк, не больше MAX_IDS в каждом списке); counts — число
+    сравненных строк (без еще не перенесенных изменений)
+    """
+
+    MAX_IDS = 20
+
+    def __init__(self):
+        self.counts = {}  # таблица -> (строк в источнике, строк в реплике)
+        self.mismatches = {}
+
+    @property
+    def ok(self):
+        return not self.mismatches
+
+    def add(self, table, kind, row_id):
+        ids = self.mismatches.setdefault(table, {"missing": [], "extra": [], "different": []})[kind]
+        if len(ids) < self.MAX_IDS:
+            ids.append(row_id)
+
+    def summary(self):
+        if self.ok:
+            return "реплика совпадает с источником"
+        return "; ".join(f"{table}: " + ", ".join(f"{kind} {ids}" for kind, ids in kinds.items() if ids)
+                         for table, kinds in self.mismatches.items())
+
+
+class ReplicaSync:
+    """Перенос изменений из БД гильдии в реплику по журналу ChangeLog
+
+    Первая синхронизация (или реплика, отставшая сильнее сжатого журнала)
+    копирует таблицы целиком и запоминает seq журнала на момент копии.
+    Дальше читаются записи журнала после отметки пачками по batch_size:
+    изменения одной строки внутри пачки схлопываются, строка читается из
+    источника в текущем виде и заменяет строку реплики (или удаляется, если
+    ее в источнике уже нет). Поэтому пачку можно применить повторно —
+    результат тот же. Пачка и новая отметка пишутся в реплику одной
+    транзакцией; после нее отметка дублируется в SyncCheckpoint источника,
+    чтобы сжатие журнала не удалило то, что реплика еще не забрала.
+    """
+
+    BATCH_SIZE = 500
+    # Ограничение числа параметров в одном запросе SQLite
+    IN_CHUNK = 500
+
+    def __init__(self, db_path, target, batch_size=None, replica_name=None):
+        self.db_path = str(db_path)
+        self.target = target
+        self.batch_size = batch_size or self.BATCH_SIZE
+        self.replica_name = replica_name or str(getattr(target, "path", "replica"))
+        self.source_name = Path(db_path).name
+        self._columns = {}
+
+    def sync(self, compact=False, keep_log=10000):
+        """Синхронизация реплики; compact — сжать журнал после нее"""
+        result = SyncResult(self.db_path, self.replica_name)
+        started = time.perf_counter()
+        conn = ConnectionProfile.active().connect(self.db_path)
+        try:
+            self._prepare_tables(conn)
+            checkpoint = self.target.checkpoint(self.source_name)
+            result.from_seq = checkpoint
+            if checkpoint is None or checkpoint < self._compacted_seq(conn):
+                checkpoint = self._full_copy(conn, result)
+            result.to_seq = self._ship_changes(conn, checkpoint, result)
+            self._record_checkpoint(conn, result.to_seq)
+            if compact:
+                result.compacted = compact_change_log(conn, keep_log)
+        finally:
+            conn.close()
+        result.elapsed_ms = (time.perf_counter() - started) * 1000
+        return result
+
+    def verify(self):
+        """Построчное сравнение всех таблиц реплики с источником
+
+        Строки, изменившиеся в источнике после отметки реплики (их еще не
+        перенесли), не сравниваются: источник читается одной транзакцией
+        вместе с журналом, так что запись во время проверки не дает ложных
+        расхождений.
+        """
+        result = VerifyResult()
+        conn = ConnectionProfile.active().connect(self.db_path, read_only=True)
+        try:
+            self._prepare_tables(conn, create=False)
+            conn.execute("BEGIN")
+            pending = {}
+            checkpoint = self.target.checkpoint(self.source_name) or 0
+            for table, row_id in conn.execute("SELECT table_name, row_id FROM ChangeLog WHERE seq > ?",
+                                              (checkpoint,)):
+                pending.setdefault(table, set()).add(row_id)
+
+            for table, columns in self._columns.items():
+                names = [name for name, _ in columns]
+                skip = pending.get(table, set())
+                source_rows = (row for row in conn.execute(f"SELECT {', '.join(names)} FROM {table} ORDER BY id")
+                               if row[0] not in skip)
+                replica_rows = (row for row in self.target.rows(table, names) if row[0] not in skip)
+                result.counts[table] = self._compare(table, source_rows, replica_rows, result)
+            conn.execute("COMMIT")
+        finally:
+            conn.close()
+        return result
+
+    def _prepare_tables(self, conn, create=True):
+        """Колонки логических таблиц источника; таблицы реплики под них"""
+        self._columns = {}
+        for table in TRACKED_TABLES:
+            columns = [(row[1], row[2]) for row in conn.execute(f"PRAGMA table_info({table})")
+                       if row[1] not in ("nickname_key", "tag_key")]
+            if not columns:
+                continue
+            self._columns[table] = columns
+            if create:
+                self.target.ensure_table(table, columns)
+
+    @staticmethod
+    def _compacted_seq(conn):
+        row = conn.execute("SELECT compacted_seq FROM ChangeLogCompaction WHERE id = 1").fetchone()
+        return row[0] if row else 0
+
+    def _full_copy(self, conn, result):
+        """Полное копирование таблиц; возвращает seq журнала, с которого продолжать
+
+        Отметка берется в той же транзакции чтения, что и строки: изменения,
+        сделанные во время копирования, придут следующими пачками.
+        """
+        result.full_copy = True
+        self.target.replace_all(self.source_name, self._columns)
+        conn.execute("BEGIN")
+        try:
+            seq = conn.execute("SELECT COALESCE(MAX(seq), 0) FROM ChangeLog").fetchone()[0]
+            for table, columns in self._columns.items():
+                names = [name for name, _ in columns]
+                cursor = conn.execute(f"SELECT {', '.join(names)} FROM {table} ORDER BY id")
+                while rows := cursor.fetchmany(self.batch_size):
+                    self.target.apply(self.source_name, {table: (names, rows, [])}, None)
+                    result.upserted += len(rows)
+                    result.batches += 1
+        finally:
+            conn.execute("COMMIT")
+        # Отметка ставится только после всех строк: прерванная копия начнется заново
+        self.target.apply(self.source_name, {}, seq)
+        return seq
+
+    def _ship_changes(self, conn, checkpoint, result):
+        """Перенос записей журнала после checkpoint; возвращает новую отметку"""
+        while True:
+            entries = conn.execute(
+                "SELECT seq, table_name, row_id FROM ChangeLog WHERE seq > ? ORDER BY seq LIMIT ?",
+                (checkpoint, self.batch_size)).fetchall()
+            if not entries:
+                return checkpoint
+
+            touched = {}
+            for _, table, row_id in entries:
+                if table in self._columns:
+                    touched.setdefault(table, set()).add(row_id)
+
+            changes = {}
+            for table, ids in touched.items():
+                names = [name for name, _ in self._columns[table]]
+                rows = self._select_rows(conn, table, names, sorted(ids))
+                deleted = ids - {row[0] for row in rows}
+                changes[table] = (names, rows, sorted(deleted))
+                result.upserted += len(rows)
+                result.deleted += len(deleted)
+
+            checkpoint = entries[-1][0]
+            self.target.apply(self.source_name, changes, checkpoint)
+            result.batches += 1
+
+    def _select_rows(self, conn, table, names, ids):
+        # id всегда первая колонка таблиц журнала
+        rows = []
+        iterator = iter(ids)
+        while chunk := list(islice(iterator, self.IN_CHUNK)):
+            placeholders = ", ".join("?" for _ in chunk)
+            rows += conn.execute(f"SELECT {', '.join(names)} FROM {table} WHERE id IN ({placeholders})",
+                                 chunk).fetchall()
+        return rows
+
+    def _record_checkpoint(self, conn, seq):
+        try:
+            # IMMEDIATE: блокировка записи берется сразу и ждет busy_timeout,
+            # а не падает на повышении чтения до записи
+            conn.execute("BEGIN IMMEDIATE")
+            conn.execute("""
+                INSERT INTO SyncCheckpoint (replica, seq, synced_at) VALUES (?, ?, ?)
+                ON CONFLICT(replica) DO UPDATE SET seq = excluded.seq, synced_at = excluded.synced_at
+            """, (self.replica_name, seq, datetime.now().isoformat(timespec="seconds")))
+            conn.commit()
+        except sqlite3.Error as e:
+            conn.rollback()
+            # Без отметки в источнике журнал просто не сожмется дальше прежнего
+            print(f"Ошибка сохранения отметки синхронизации: {e}")
+
+    @staticmethod
+    def _compare(table, source_rows, replica_rows, result):
+        """Слияние двух упорядоченных по id потоков строк"""
+        source_count = replica_count = 0
+        source_row = next(source_rows, None)
+        replica_row = next(replica_rows, None)
+        while source_row is not None or replica_row is not None:
+            if replica_row is None or (source_row is not None and source_row[0] < replica_row[0]):
+                result.add(table, "missing", source_row[0])
+                source_row, source_count = next(source_rows, None), source_count + 1
+            elif source_row is None or replica_row[0] < source_row[0]:
+                result.add(table, "extra", replica_row[0])
+                replica_row, replica_count = next(replica_rows, None), replica_count + 1
+            else:
+                if tuple(source_row) != tuple(replica_row):
+                    result.add(table, "different", source_row[0])
+                source_row, source_count = next(source_rows, None), source_count + 1
+                replica_row, replica_count = next(replica_rows, None), replica_count + 1
+        return source_count, replica_count
+
+
+class ReplicaSyncManager(QObject):
+    """Синхронизация реплик БД гильдий в фоновом потоке
+
+    Реплика каждой БД — файл с тем же именем в папке из раздела "replica"
+    config.json:
+        {"replica": {"dir": "replicas", "batch_size": 500, "verify": true,
+                     "compact": true, "keep_log": 10000}}
+    """
+
+    finished = pyqtSignal(object)  # SyncResult
+    failed = pyqtSignal(object)  # SyncResult с текстом ошибки
+
+    DEFAULT_SETTINGS = {
+        "dir": "replicas",
+        "batch_size": ReplicaSync.BATCH_SIZE,
+        "verify": True,
+        "compact": True,
+        "keep_log": 10000
+    }
+
+    _instance = None
+
+    def __init__(self):
+        super().__init__()
+        self.settings = dict(self.DEFAULT_SETTINGS)
+        self.settings.update(Config().get("replica"))
+        self.running = set()
+        self._executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="replica")
+
+    @classmethod
+    def instance(cls):
+        if cls._instance is None:
+            cls._instance = cls()
+        return cls._instance
+
+    def replica_path(self, db_path):
+        return Path(self.settings["dir"]) / Path(db_path).name
+
+    def sync_now(self, db_paths):
+        """Постановка синхронизации в очередь фонового потока
+
+        Args:
+            db_paths: Путь к файлу БД или список путей
+        """
+        if isinstance(db_paths, str):
+            db_paths = [db_paths]
+        for db_path in db_paths:
+            if db_path in self.running:
+                continue
+            self.running.add(db_path)
+            self._executor.submit(self._run, db_path, dict(self.settings))
+
+    def shutdown(self):
+        self._executor.shutdown(wait=False, cancel_futures=True)
+
+    def _run(self, db_path, settings):
+        replica = self.replica_path(db_path)
+        result = SyncResult(db_path, str(replica))
+        target = None
+        try:
+            target = SqliteReplicaTarget(replica)
+            sync = ReplicaSync(db_path, target, settings["batch_size"], str(replica))
+            result = sync.sync(settings["compact"], settings["keep_log"])
+            if settings["verify"]:
+                result.verification = sync.verify()
+        except Exception as e:
+            result.error = str(e)
+            print(f"Ошибка синхронизации реплики {db_path}: {e}")
+        finally:
+            if target is not None:
+                target.close()
+            self.running.discard(db_path)
+
+        if result.ok:
+            self.finished.emit(result)
+        else:
+            self.failed.emit(result)
@@ -0,0 +1,230 @@
+import json
+import mmap
+import os
+import struct
+import zlib
+from collections.abc import Sequence
+from concurrent.futures import ThreadPoolExecutor
+from itertools import islice
+from pathlib import Path
+
+from PyQt6.QtCore import QObject, pyqtSignal
+
+from config.cfg import ConnectionProfile
+from utils.keyset_model import diff_rows
+
+
+class SnapshotRows(Sequence):
+    """Строки снимка, декодируемые из отображенного в память файла по требованию
+
+    При открытии окна декодируются только строки, которые таблица
+    действительно рисует, а не весь список.
+    """
+
+    OFFSET = struct.Struct("<Q")
+
+    def __init__(self, mapping, count, offsets_start):
+        self._mapping = mapping
+        self._count = count
+        self._offsets_start = offsets_start
+        self._data_start = offsets_start + self.OFFSET.size * (count + 1)
+        self._decoded = {}
+
+    def __len__(self):
+        return self._count
+
+    def __getitem__(self, index):
+        if isinstance(index, slice):
+            return [self[i] for i in range(*index.indices(self._count))]
+        if index < 0:
+            index += self._count
+        if not 0 <= index < self._count:
+            raise IndexError(index)
+
+        row = self._decoded.get(index)
+        if row is None:
+            start = self._data_start + self._offset(index)
+            end = self._data_start + self._offset(index + 1)
+            row = tuple(json.loads(self._mapping[start:end].decode("utf-8")))
+            self._decoded[index] = row
+        return row
+
+    def _offset(self, index):
+        return self.OFFSET.unpack_from(self._mapping, self._offsets_start + self.OFFSET.size * index)[0]
+
+
+class RosterSnapshot:
+    """Снимок последнего показанного списка игроков для быстрого старта
+
+    Формат файла: заголовок (сигнатура, версия, длина метаданных),
+    метаданные в JSON, таблица смещений строк и сами строки (JSON в UTF-8).
+    Файл отображается в память, строки читаются по смещениям.
+
+    Снимок помечен меткой версии файла БД (change_tag): если при запуске она
+    совпадает, строки снимка точны и сверка не нужна.
+    """
+
+    MAGIC = b"LGRS"
+    VERSION = 1
+    HEADER = struct.Struct("<4sHI")  # сигнатура, версия формата, длина метаданных
+
+    # Сколько строк сохранять (остальные подгружаются при прокрутке, как обычно)
+    MAX_ROWS = 5000
+
+    def __init__(self, meta, rows, mapping):
+        self.tag = meta.get("tag")
+        self.mode = meta.get("mode")
+        self.sort_column, self.sort_order = meta.get("sort", (1, 0))
+        self.column_names = meta.get("columns", [])
+        self.query_hash = meta.get("query")
+        self.rows = rows
+        self._mapping = mapping
+
+    @staticmethod
+    def path_for(db_path):
+        """Файл снимка рядом с файлом БД гильдии"""
+        return str(Path(db_path).with_suffix(".roster"))
+
+    @staticmethod
+    def query_hash_of(query_text):
+        return zlib.crc32(query_text.encode("utf-8"))
+
+    @staticmethod
+    def change_tag(db_path):
+        """Метка версии файла БД
+
+        Счетчик изменений из заголовка файла SQLite (растет при каждой
+        записывающей транзакции) плюс размер и время изменения файла БД
+        и WAL-журнала, записи в который счетчик не меняют.
+        """
+        try:
+            with open(db_path, "rb") as file:
+                header = file.read(100)
+        except OSError:
+            return None
+
+        tag = [int.from_bytes(header[24:28], "big") if len(header) >= 28 else 0]
+        for path in (db_path, f"{db_path}-wal"):
+            try:
+                stat = os.stat(path)
+                tag += [stat.st_size, stat.st_mtime_ns]
+            except OSError:
+                tag += [0, 0]
+        return tag
+
+    @classmethod
+    def load(cls, path):
+        """Открытие снимка (None, если файла нет или он поврежден)"""
+        if not Path(path).exists():
+            return None
+
+        mapping = None
+        try:
+            with open(path, "rb") as file:
+                mapping = mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ)
+
+            magic, version, meta_length = cls.HEADER.unpack_from(mapping, 0)
+            if magic != cls.MAGIC or version != cls.VERSION:
+                mapping.close()
+                return None
+
+            meta = json.loads(mapping[cls.HEADER.size:cls.HEADER.size + meta_length].decode("utf-8"))
+            rows = SnapshotRows(mapping, meta["rows"], cls.HEADER.size + meta_length)
+            return cls(meta, rows, mapping)
+        except (OSError, ValueError, KeyError, struct.error) as e:
+            print(f"Ошибка чтения снимка списка: {e}")
+            if mapping is not None:
+                mapping.close()
+            return None
+
+    @classmethod
+    def save(cls, path, tag, mode, sort, column_names, rows, query_text):
+        """Запись снимка (через временный файл, чтобы не оставить недописанный)
+
+        Args:
+            sort: (колонка, порядок сортировки как int)
+        """
+        rows = list(islice(rows, cls.MAX_ROWS))
+        blobs = [json.dumps(list(row), ensure_ascii=False, default=str).encode("utf-8") for row in rows]
+
+        meta = json.dumps({
+            "tag": tag,
+            "mode": mode,
+            "sort": list(sort),
+            "columns": list(column_names),
+            "query": cls.query_hash_of(query_text),
+            "rows": len(rows)
+        }, ensure_ascii=False).encode("utf-8")
+
+        offsets = [0]
+        for blob in blobs:
+            offsets.append(offsets[-1] + len(blob))
+
+        temp_path = f"{path}.tmp"
+        try:
+            with open(temp_path, "wb") as file:
+                file.write(cls.HEADER.pack(cls.MAGIC, cls.VERSION, len(meta)))
+                file.write(meta)
+                file.write(struct.pack(f"<{len(offsets)}Q", *offsets))
+                file.write(b"".join(blobs))
+            os.replace(temp_path, path)
+        except OSError as e:
+            print(f"Ошибка сохранения снимка списка: {e}")
+
+    @staticmethod
+    def remove(path):
+        """Удаление снимка (следующий запуск — обычная загрузка)"""
+        try:
+            Path(path).unlink(missing_ok=True)
+        except OSError as e:
+            print(f"Ошибка удаления снимка списка: {e}")
+
+    def close(self):
+        """Освобождение отображения файла (строки должны быть уже скопированы)"""
+        if self._mapping is not None:
+            self._mapping.close()
+            self._mapping = None
+
+
+class RosterReconciler(QObject):
+    """Фоновая сверка строк снимка с БД
+
+    Работает в одном фоновом потоке через отдельное sqlite3-соединение
+    (соединения QtSql нельзя использовать вне GUI-потока). Результат —
+    список отличий (diff_rows) для KeysetQueryModel.apply_changes, который доставляется
+    в GUI-поток сигналом reconciled.
+    """
+
+    reconciled = pyqtSignal(object, object, object)  # отличия, метка версии БД, токен запроса
+    failed = pyqtSignal(str, object)
+
+    def __init__(self, parent=None):
+        super().__init__(parent)
+        self._executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="reconcile")
+
+    def start(self, db_path, query_text, params, rows, token=None):
+        """Постановка сверки в очередь
+
+        Args:
+            rows: Строки, показанные сейчас (в порядке запроса query_text)
+            token: Произвольное значение, возвращаемое вместе с результатом
+        """
+        self._executor.submit(self._run, db_path, query_text, list(params), rows, token)
+
+    def shutdown(self):
+        """Остановка фонового потока"""
+        self._executor.shutdown(wait=False, cancel_futures=True)
+
+    def _run(self, db_path, query_text, params, rows, token):
+        try:
+            # Метка снимается до чтения: изменения во время чтения дадут расхождение при следующей сверке
+            tag = RosterSnapshot.change_tag(db_path)
+            conn = ConnectionProfile.active().connect(db_path, read_only=True)
+            try:
+                fresh = [tuple(row) for row in conn.execute(query_text, params)]
+            finally:
+                conn.close()
+            self.reconciled.emit(diff_rows(list(rows), fresh), tag, token)
+        except Exception as e:
+            print(f"Ошибка сверки снимка списка: {e}")
+            self.failed.emit(str(e), token)
@@ -0,0 +1,169 @@
+import json
+import time
+from datetime import datetime
+
+
+class SavedSearch:
+    """Сохраненный поиск (строка SavedSearches)"""
+
+    def __init__(self, search_id, name, mode, params, query, result_seq=None, result_count=None, refreshed_at=None):
+        self.id = search_id
+        self.name = name
+        self.mode = mode
+        self.params = params
+        self.query = query
+        self.result_seq = result_seq
+        self.result_count = result_count
+        self.refreshed_at = refreshed_at
+
+
+class RunStats:
+    """Итог выполнения сохраненного поиска"""
+
+    def __init__(self):
+        self.cached = False  # результат взят из кэша без запросов к данным
+        self.full = False
+        self.players = 0  # игроков с изменениями в журнале, перепроверенных запросом
+        self.count = 0
+        self.elapsed_ms = 0.0
+
+
+class SavedSearchStore:
+    """Именованные поиски с кэшем результата
+
+    Поиск хранится вместе со скомпилированным запросом id игроков, а его
+    результат — в SavedSearchResults с seq ChangeLog, на котором он
+    посчитан. run() сравнивает этот seq с журналом:
+      - изменений нет — результат берется из кэша как есть;
+      - изменились строки нескольких игроков — запрос выполняется только
+        для них (id IN (...)), и их строки результата заменяются;
+      - иначе (первый запуск, изменился сам запрос, изменения без игрока,
+        например в справочнике классов, нужные записи журнала сжаты или
+        изменившихся игроков слишком много) — полный пересчет.
+
+    Запрос компилируется заново при каждом запуске функцией compile_query
+    (параметры формы -> SQL): условия посещаемости считают окно от текущей
+    даты, и на следующий день запрос, а с ним и результат, меняется.
+    """
+
+    # При большем числе изменившихся игроков дешевле пересчитать всех
+    FULL_REFRESH_PLAYERS = 2000
+
+    COLUMNS = "id, name, mode, params, query, result_seq, result_count, refreshed_at"
+
+    def __init__(self, conn):
+        self.conn = conn
+
+    def list(self):
+        """Все сохраненные поиски по имени"""
+        return [self._from_row(row) for row in self.conn.execute(
+            f"SELECT {self.COLUMNS} FROM SavedSearches ORDER BY name")]
+
+    def get(self, search_id):
+        row = self.conn.execute(f"SELECT {self.COLUMNS} FROM SavedSearches WHERE id = ?", (search_id,)).fetchone()
+        return self._from_row(row) if row is not None else None
+
+    def save(self, name, params, query):
+        """Сохранение поиска (поиск с тем же именем заменяется); возвращает его id"""
+        self.conn.execute("BEGIN IMMEDIATE")
+        try:
+            row = self.conn.execute("SELECT id FROM SavedSearches WHERE name = ?", (name,)).fetchone()
+            if row is not None:
+                self.conn.execute("DELETE FROM SavedSearchResults WHERE search_id = ?", (row[0],))
+            self.conn.execute("""
+                INSERT INTO SavedSearches (name, mode, params, query) VALUES (?, ?, ?, ?)
+                ON CONFLICT(name) DO UPDATE SET
+                    mode = excluded.mode, params = excluded.params, query = excluded.query,
+                    result_seq = NULL, result_count = NULL, refreshed_at = NULL
+            """, (name, params['mode'], json.dumps(params, ensure_ascii=False), query))
+            search_id = self.conn.execute("SELECT id FROM SavedSearches WHERE name = ?", (name,)).fetchone()[0]
+            self.conn.commit()
+        except Exception:
+            self.conn.rollback()
+            raise
+        return search_id
+
+    def delete(self, search_id):
+        self.conn.execute("BEGIN IMMEDIATE")
+        try:
+            self.conn.execute("DELETE FROM SavedSearchResults WHERE search_id = ?", (search_id,))
+            self.conn.execute("DELETE FROM SavedSearches WHERE id = ?", (search_id,))
+            self.conn.commit()
+        except Exception:
+            self.conn.rollback()
+            raise
+
+    def run(self, search_id, compile_query):
+        """Актуализация результата поиска
+
+        Args:
+            search_id: id сохраненного поиска
+            compile_query: Функция (параметры формы) -> запрос id игроков
+        """
+        stats = RunStats()
+        started = time.perf_counter()
+
+        self.conn.execute("BEGIN IMMEDIATE")
+        try:
+            search = self.get(search_id)
+            if search is None:
+                raise ValueError(f"сохраненный поиск {search_id} не найден")
+            query = compile_query(search.params)
+            max_seq = self.conn.execute("SELECT COALESCE(MAX(seq), 0) FROM ChangeLog").fetchone()[0]
+            compacted = self.conn.execute("SELECT compacted_seq FROM ChangeLogCompaction WHERE id = 1").fetchone()
+            stats.full = (search.result_seq is None or query != search.query or max_seq < search.result_seq
+                          or (compacted is not None and search.result_seq < compacted[0]))
+
+            player_ids = set()
+            if not stats.full and max_seq > search.result_seq:
+                player_ids, unbound = self._changed_players(search.result_seq)
+                stats.players = len(player_ids)
+                stats.full = unbound or len(player_ids) > self.FULL_REFRESH_PLAYERS
+
+            if stats.full:
+                self.conn.execute("DELETE FROM SavedSearchResults WHERE search_id = ?", (search_id,))
+                self.conn.execute(f"INSERT INTO SavedSearchResults (search_id, player_id) "
+                                  f"SELECT DISTINCT ?, id FROM ({query})", (search_id,))
+            elif player_ids:
+                placeholders = ", ".join("?" for _ in player_ids)
+                ids = list(player_ids)
+                self.conn.execute(f"DELETE FROM SavedSearchResults "
+                                  f"WHERE search_id = ? AND player_id IN ({placeholders})", [search_id, *ids])
+                self.conn.execute(f"INSERT INTO SavedSearchResults (search_id, player_id) "
+                                  f"SELECT DISTINCT ?, id FROM ({query}) WHERE id IN ({placeholders})",
+                                  [search_id, *ids])
+            else:
+                stats.cached = True
+
+            if stats.cached:
+                stats.count = search.result_count
+                self.conn.rollback()
+            else:
+                stats.count = self.conn.execute("SELECT COUNT(*) FROM SavedSearchResults WHERE search_id = ?",
+                                                (search_id,)).fetchone()[0]
+                self.conn.execute("""
+                    UPDATE SavedSearches SET query = ?, result_seq = ?, result_count = ?, refreshed_at = ?
+                    WHERE id = ?
+                """, (query, max_seq, stats.count, datetime.now().isoformat(timespec="seconds"), search_id))
+                self.conn.commit()
+        except Exception:
+            self.conn.rollback()
+            raise
+
+        stats.elapsed_ms = (time.perf_counter() - started) * 1000
+        return stats
+
+    def _changed_players(self, seq):
+        """Игроки с изменениями после seq и признак изменений, не привязанных к игроку"""
+        player_ids, unbound = set(), False
+        for (player_id,) in self.conn.execute("SELECT DISTINCT player_id FROM ChangeLog WHERE seq > ?", (seq,)):
+            if player_id is None:
+                unbound = True
+            else:
+                player_ids.add(player_id)
+        return player_ids, unbound
+
+    @staticmethod
+    def _from_row(row):
+        search_id, name, mode, params, query, result_seq, result_count, refreshed_at = row
+        return SavedSearch(search_id, name, mode, json.loads(params), query, result_seq, result_count, refreshed_at)
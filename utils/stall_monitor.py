@@ -0,0 +1,171 @@
+import functools
+import inspect
+import json
+import logging
+import sys
+import threading
+import time
+import traceback
+from datetime import datetime
+from logging.handlers import RotatingFileHandler
+from pathlib import Path
+
+from PyQt6.QtCore import QObject, QTimer
+
+from utils.query_stats import StatementStats
+
+
+class StallMonitor(QObject):
+    """Детектор зависаний цикла событий Qt
+
+    Таймер в GUI-потоке обновляет метку времени каждые interval_ms и
+    заодно измеряет опоздание срабатывания (задержку цикла событий).
+    Вспомогательный поток проверяет метку: если она не обновлялась дольше
+    threshold_ms, снимается Python-стек GUI-потока и вместе с активной
+    операцией главного окна записывается в журнал зависаний.
+    """
+
+    interval_ms = 50
+    threshold_ms = 300
+    log_path = "logs/stalls.log"
+
+    _instance = None
+
+    def __init__(self):
+        super().__init__()
+        self.latency = StatementStats("event_loop")
+        self.stall_count = 0
+
+        self._operations = []
+        self._gui_thread_id = None
+        self._last_beat = time.monotonic()
+        self._timer = None
+        self._thread = None
+        self._stop_event = threading.Event()
+        self._logger = None
+
+    @classmethod
+    def instance(cls):
+        if cls._instance is None:
+            cls._instance = cls()
+        return cls._instance
+
+    def start(self):
+        """Запуск (вызывать из GUI-потока после создания QApplication)"""
+        if self._thread is not None:
+            return
+
+        self._gui_thread_id = threading.get_ident()
+        self._last_beat = time.monotonic()
+
+        self._timer = QTimer(self)
+        self._timer.timeout.connect(self._heartbeat)
+        self._timer.start(self.interval_ms)
+
+        self._stop_event.clear()
+        self._thread = threading.Thread(target=self._watch, name="stall-monitor", daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        """Остановка мониторинга"""
+        if self._timer is not None:
+            self._timer.stop()
+        self._stop_event.set()
+        self._thread = None
+
+    def push_operation(self, name):
+        self._operations.append(name)
+
+    def pop_operation(self):
+        if self._operations:
+            self._operations.pop()
+
+    def current_operations(self):
+        return list(self._operations)
+
+    def _heartbeat(self):
+        """Срабатывание таймера в GUI-потоке"""
+        now = time.monotonic()
+        lateness_ms = (now - self._last_beat) * 1000 - self.interval_ms
+        self.latency.add(max(0.0, lateness_ms), None)
+        self._last_beat = now
+
+    def _watch(self):
+        """Цикл вспомогательного потока"""
+        stall_started = None
+        stall_report = None
+        while not self._stop_event.wait(self.interval_ms / 1000):
+            blocked_ms = (time.monotonic() - self._last_beat) * 1000
+
+            if blocked_ms > self.threshold_ms and stall_started is None:
+                stall_started = self._last_beat
+                stall_report = self._capture(blocked_ms)
+                self.stall_count += 1
+                self._write(stall_report)
+            elif blocked_ms <= self.threshold_ms and stall_started is not None:
+                # Цикл событий ожил: записываем итоговую длительность зависания
+                self._write({
+                    "event": "recovered",
+                    "time": datetime.now().isoformat(timespec="milliseconds"),
+                    "operation": stall_report["operation"],
+                    "duration_ms": round((self._last_beat - stall_started) * 1000)
+                })
+                stall_started = None
+                stall_report = None
+
+    def _capture(self, blocked_ms):
+        """Снимок стека GUI-потока"""
+        frame = sys._current_frames().get(self._gui_thread_id)
+        stack = traceback.format_stack(frame) if frame is not None else []
+        operations = self.current_operations()
+        return {
+            "event": "stall",
+            "time": datetime.now().isoformat(timespec="milliseconds"),
+            "blocked_ms": round(blocked_ms),
+            "operation": operations[-1] if operations else None,
+            "operations": operations,
+            "stack": [line.rstrip() for line in stack]
+        }
+
+    def _write(self, report):
+        """Запись отчета в журнал (одна JSON-строка на событие)"""
+        try:
+            if self._logger is None:
+                Path(self.log_path).parent.mkdir(parents=True, exist_ok=True)
+                logger = logging.getLogger("ligma.stalls")
+                logger.setLevel(logging.INFO)
+                logger.propagate = False
+                handler = RotatingFileHandler(self.log_path, maxBytes=1024 * 1024, backupCount=5, encoding="utf-8")
+                handler.setFormatter(logging.Formatter("%(message)s"))
+                logger.addHandler(handler)
+                self._logger = logger
+            self._logger.info(json.dumps(report, ensure_ascii=False))
+        except OSError as e:
+            print(f"Ошибка записи журнала зависаний: {e}")
+
+
+def tracked_operation(name):
+    """Декоратор: помечает метод как операцию для отчетов о зависаниях
+
+    Лишние аргументы сигналов Qt (например, checked у clicked) отбрасываются,
+    чтобы обертка вызывала метод с тем же числом аргументов, что и без нее.
+    """
+    def decorator(func):
+        parameters = list(inspect.signature(func).parameters.values())
+        has_varargs = any(p.kind == p.VAR_POSITIONAL for p in parameters)
+        max_args = len([p for p in parameters if p.kind in (p.POSITIONAL_ONLY, p.POSITIONAL_OR_KEYWORD)])
+
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            if not has_varargs:
+                args = args[:max_args]
+            monitor = StallMonitor.instance()
+            monitor.push_operation(name)
+            try:
+                return func(*args, **kwargs)
+            finally:
+                monitor.pop_operation()
+
+        return wrapper
+
+    return decorator
@@ -3,18 +3,27 @@ from PyQt6.QtWidgets import QMessageBox
 from PyQt6.QtCore import QSortFilterProxyModel, Qt
 from datetime import datetime
 
+from utils.column_sizer import ColumnSizer
+
 
 class TableManager:
     """Менеджер для работы с таблицами"""
 
     @staticmethod
-    def setup_table_view(table_view, model, hide_id=True):
-        """Стандартная настройка TableView"""
+    def setup_table_view(table_view, model, hide_id=True, sort=None, width_key=None):
+        """Стандартная настройка TableView
+
+        Args:
+            sort: Начальная сортировка (колонка, порядок) для индикатора заголовка
+            width_key: Ключ кэша ширин колонок (см. ColumnSizer)
+        """
         table_view.setModel(model)
-        table_view.resizeColumnsToContents()
+        if sort is not None:
+            table_view.horizontalHeader().setSortIndicator(*sort)
         table_view.setSortingEnabled(True)
         if hide_id:
             table_view.setColumnHidden(0, True)
+        ColumnSizer.fit_columns(table_view, width_key)
 
 
 class MessageHelper:
@@ -230,9 +239,30 @@ class FilterHelper:
 
 
 class MultiFieldFilterProxyModel(QSortFilterProxyModel):
-    def __init__(self, parent=None):
+    def __init__(self, parent=None, server_sort=False):
         super().__init__(parent)
         self.filters = {}  # ключ: номер колонки, значение: фильтр (строка)
+        self.server_sort = server_sort  # сортировка выполняется исходной моделью (ORDER BY)
+        self.sort_key_columns = {}  # колонка -> колонка с ее ключом сортировки в исходной модели
+        self.ranking = {}  # id строки (колонка 0) -> место в результатах нечеткого поиска
+
+    def sort(self, column, order=Qt.SortOrder.AscendingOrder):
+        """Сортировка по колонке
+
+        При server_sort запрос на сортировку передается исходной модели,
+        которая перечитывает данные с ORDER BY; сам прокси порядок не меняет
+        и не сортирует в памяти только уже загруженные строки.
+        Сортировка по заголовку отменяет порядок нечеткого поиска.
+        """
+        if self.ranking:
+            self.set_ranking({})
+        if not self.server_sort:
+            super().sort(column, order)
+            return
+
+        source = self.sourceModel()
+        if source is not None and column >= 0:
+            source.sort(self.sort_key_columns.get(column, column), order)
 
     def set_filters(self, filters: dict):
         """Установка фильтров для множественных колонок
@@ -248,6 +278,23 @@ class MultiFieldFilterProxyModel(QSortFilterProxyModel):
         self.filters = {}
         self.invalidateFilter()
 
+    def set_ranking(self, ranking):
+        """Порядок строк по месту в результатах поиска (пустой словарь — порядок исходной модели)
+
+        Результатов немного, поэтому они сортируются в самом прокси.
+        """
+        self.ranking = ranking
+        QSortFilterProxyModel.sort(self, 0 if ranking else -1)
+
+    def lessThan(self, left, right):
+        if not self.ranking:
+            return super().lessThan(left, right)
+        model = self.sourceModel()
+        missing = len(self.ranking)
+        left_id = model.data(model.index(left.row(), 0))
+        right_id = model.data(model.index(right.row(), 0))
+        return self.ranking.get(left_id, missing) < self.ranking.get(right_id, missing)
+
     def filterAcceptsRow(self, source_row, source_parent):
         """Проверка соответствия строки фильтрам"""
         if not self.filters:
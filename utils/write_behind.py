@@ -0,0 +1,162 @@
+from PyQt6.QtCore import Qt, QTimer, pyqtSignal
+from PyQt6.QtGui import QColor
+from PyQt6.QtSql import QSqlTableModel, QSqlDatabase
+
+from utils.database import DatabaseManager
+
+
+class WriteBehindTableModel(QSqlTableModel):
+    """QSqlTableModel с отложенной записью правок в ячейках
+
+    Правки не уходят в БД сразу (как при OnFieldChange, где каждая ячейка —
+    отдельный UPDATE, коммит и перевыборка), а копятся в памяти: повторные
+    правки одной ячейки схлопываются в последнее значение. Накопленное
+    записывается одной транзакцией по таймеру, при уходе фокуса из таблицы
+    или при закрытии окна (flush()). Записанные значения остаются в модели
+    без перевыборки до следующего select().
+
+    Состояние строки показывается в вертикальном заголовке: ✎ — ждет
+    записи, ✓ — записана, ! — ошибка записи (текст во всплывающей подсказке).
+    """
+
+    flushed = pyqtSignal(int)
+    flush_failed = pyqtSignal(str)
+
+    FLUSH_DELAY_MS = 1500
+
+    PENDING = "pending"
+    COMMITTED = "committed"
+    FAILED = "failed"
+
+    STATE_MARKERS = {PENDING: "✎", COMMITTED: "✓", FAILED: "!"}
+    STATE_COLORS = {PENDING: QColor(255, 245, 200), FAILED: QColor(255, 215, 215)}
+
+    def __init__(self, parent=None, db=QSqlDatabase()):
+        super().__init__(parent, db)
+        self.overlay = {}  # (строка, колонка) -> значение, показываемое вместо выборки
+        self.pending = {}  # строка -> {колонка: значение}, еще не записанное в БД
+        self.row_states = {}
+        self.row_errors = {}
+
+        self._timer = QTimer(self)
+        self._timer.setSingleShot(True)
+        self._timer.timeout.connect(self.flush)
+
+    def data(self, index, role=Qt.ItemDataRole.DisplayRole):
+        if index.isValid():
+            key = (index.row(), index.column())
+            if role in (Qt.ItemDataRole.DisplayRole, Qt.ItemDataRole.EditRole) and key in self.overlay:
+                return self.overlay[key]
+            if role == Qt.ItemDataRole.BackgroundRole:
+                color = self.STATE_COLORS.get(self.row_states.get(index.row()))
+                if color is not None:
+                    return color
+        return super().data(index, role)
+
+    def setData(self, index, value, role=Qt.ItemDataRole.EditRole):
+        if not index.isValid() or role != Qt.ItemDataRole.EditRole:
+            return False
+        if value == self.data(index, Qt.ItemDataRole.EditRole):
+            return True
+
+        row = index.row()
+        self.overlay[(row, index.column())] = value
+        self.pending.setdefault(row, {})[index.column()] = value
+        self._set_state(row, self.PENDING)
+        self.dataChanged.emit(index, index, [Qt.ItemDataRole.DisplayRole, Qt.ItemDataRole.EditRole])
+
+        # Каждая новая правка откладывает запись: быстрый ввод не прерывается
+        self._timer.start(self.FLUSH_DELAY_MS)
+        return True
+
+    def headerData(self, section, orientation, role=Qt.ItemDataRole.DisplayRole):
+        if orientation == Qt.Orientation.Vertical:
+            state = self.row_states.get(section)
+            if state is not None and role == Qt.ItemDataRole.DisplayRole:
+                return f"{section + 1} {self.STATE_MARKERS[state]}"
+            if state == self.FAILED and role == Qt.ItemDataRole.ToolTipRole:
+                return self.row_errors.get(section)
+        return super().headerData(section, orientation, role)
+
+    def has_pending(self):
+        return bool(self.pending)
+
+    def flush(self):
+        """Запись накопленных правок одной транзакцией
+
+        Returns:
+            bool: True, если правки записаны (или их не было)
+        """
+        self._timer.stop()
+        if not self.pending:
+            return True
+
+        batch, self.pending = self.pending, {}
+        db = self.database()
+        if not db.transaction():
+            return self._fail(batch, {}, db.lastError().text())
+
+        errors = {}
+        for row, columns in batch.items():
+            assignments = ", ".join(f'"{self.record().fieldName(column)}" = ?' for column in columns)
+            query = DatabaseManager.query(db)
+            query.prepare(f'UPDATE "{self.tableName()}" SET {assignments} WHERE id = ?')
+            for value in columns.values():
+                query.addBindValue(value)
+            query.addBindValue(super().data(self.index(row, self.record().indexOf("id"))))
+            if not query.exec():
+                errors[row] = query.lastError().text()
+
+        if errors or not db.commit():
+            db.rollback()
+            return self._fail(batch, errors, db.lastError().text())
+
+        for row in batch:
+            self.row_errors.pop(row, None)
+            self._set_state(row, self.COMMITTED)
+        self.flushed.emit(len(batch))
+        return True
+
+    def select(self):
+        """Перевыборка; несохраненные правки предварительно записываются
+
+        Если записать их не удалось, перевыборка не выполняется: правки,
+        их отметки и тексты ошибок остаются в модели, возвращается False.
+        """
+        if self.pending and not self.flush():
+            return False
+        self._timer.stop()
+        self.overlay.clear()
+        self.pending.clear()
+        self.row_states.clear()
+        self.row_errors.clear()
+        return super().select()
+
+    def selectRow(self, row):
+        """Перечитывание одной строки из БД (строка с несохраненными правками не трогается)"""
+        if row in self.pending:
+            return False
+        for column in range(self.columnCount()):
+            self.overlay.pop((row, column), None)
+        self.row_states.pop(row, None)
+        self.row_errors.pop(row, None)
+        return super().selectRow(row)
+
+    def _fail(self, batch, errors, fallback_text):
+        """Откат: правки остаются в ожидании, строки помечаются ошибкой"""
+        for row, columns in batch.items():
+            self.pending[row] = columns
+            self.row_errors[row] = errors.get(row, fallback_text)
+            self._set_state(row, self.FAILED)
+
+        message = next(iter(errors.values()), fallback_text)
+        print(f"Ошибка записи правок: {message}")
+        self.flush_failed.emit(message)
+        return False
+
+    def _set_state(self, row, state):
+        self.row_states[row] = state
+        self.headerDataChanged.emit(Qt.Orientation.Vertical, row, row)
+        last_column = self.columnCount() - 1
+        if last_column >= 0:
+            self.dataChanged.emit(self.index(row, 0), self.index(row, last_column), [Qt.ItemDataRole.BackgroundRole])